@@ -146,5 +146,29 @@ Karim Bahgat (2020)
 
 __version__ = "0.3.0"
 
-from .canvas import Canvas, load
-from .graph import LineGraph
+import sys
+
+from .canvas import Canvas, Gradient, Pattern, load
+from .displaylist import DisplayList
+
+# Only imported when first used, to keep importing pyagg fast
+_LAZY = {"TiledCanvas": "tiled",
+         "render_tiles": "parallel",
+         "LineGraph": "graph"}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _LAZY:
+            import importlib
+            module = importlib.import_module("." + _LAZY[name], __name__)
+            value = globals()[name] = getattr(module, name)
+            return value
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY))
+else:
+    # no module level __getattr__ before python 3.7
+    from .tiled import TiledCanvas
+    from .parallel import render_tiles
+    from .graph import LineGraph
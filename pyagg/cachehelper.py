@@ -0,0 +1,89 @@
+"""
+Small helpers for caching repeated computations, such as parsed
+distances and loaded fonts.
+Mostly used internally.
+"""
+
+from collections import OrderedDict
+
+
+
+class LRUCache:
+    """
+    A bounded mapping that discards the least recently used items
+    once it holds more than maxsize items, or optionally once the
+    items take up more than maxbytes of memory. Keeps count of cache
+    hits and misses.
+    """
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._nbytes = dict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key and marks it as recently used,
+        or returns default if key is not in the cache.
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value, nbytes=0):
+        """
+        Adds a value to the cache, discarding the least recently
+        used items if the cache is full. The memory size of the value
+        in bytes should be given if the cache has a maxbytes limit.
+        """
+        items = self._items
+        if key in items:
+            del items[key]
+            self.nbytes -= self._nbytes.pop(key, 0)
+        items[key] = value
+        if nbytes:
+            self._nbytes[key] = nbytes
+            self.nbytes += nbytes
+        maxbytes = self.maxbytes
+        while len(items) > self.maxsize or (maxbytes is not None and self.nbytes > maxbytes):
+            oldkey,_ = items.popitem(last=False)
+            self.nbytes -= self._nbytes.pop(oldkey, 0)
+
+    def clear(self):
+        """
+        Empties the cache and resets the hit and miss counters.
+        """
+        self._items.clear()
+        self._nbytes.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        Returns a dictionary with the current number of items, maxsize,
+        memory size in bytes, maxbytes, hits, misses, and hit rate of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self._items),
+                "maxsize": self.maxsize,
+                "bytes": self.nbytes,
+                "maxbytes": self.maxbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitrate": self.hits / float(lookups) if lookups else 0.0}
+
@@ -9,19 +9,11 @@ Defines the PyAgg Canvas class, where most of the PyAgg functinoality is defined
 from __future__ import division
 
 # Import dependencies
+# PIL.ImageOps, ImageMath, ImageEnhance, ImageTk and Tkinter are only imported
+# by the methods that use them, to keep importing pyagg fast
 import PIL, PIL.Image, PIL.ImageDraw, PIL.ImageFont
-import PIL.ImageOps, PIL.ImageChops, PIL.ImageMath, PIL.ImageEnhance
 import aggdraw
 
-# Tkinter related
-try:
-    # try
-    import Tkinter as tk
-    import PIL.ImageTk
-except:
-    # Tkinter not available on this platform
-    pass
-
 # Import builtins
 import sys, os
 import struct
@@ -31,15 +23,24 @@ import traceback
 import warnings
 import textwrap
 import math
+import functools
+import time
 import gc # garbage collection
+from array import array
 
 # Import submodules
 PYAGGFOLDER = os.path.split(__file__)[0]
 from . import affine
 from . import units
 from . import bboxhelper
+from . import cachehelper
+from . import colorhelper
+from . import displaylist
 from . import fonthelper
-from . import gridinterp
+from . import geomhelper
+from . import gradienthelper
+from . import labelhelper
+from . import patternhelper
 
 ##############################
 # Determine OS and bitsystem
@@ -59,6 +60,35 @@ try:
 except:
     zip_longest = itertools.zip_longest
 
+##############################
+# Process-wide cache of rendered text labels, see Canvas.draw_text()
+# Holds the coverage masks of unrotated labels and the images of rotated labels
+LABELCACHE = cachehelper.LRUCache(maxsize=4096, maxbytes=64*1024*1024)
+
+# Process-wide cache of gradient lookup tables, see Gradient.lut()
+GRADIENTLUTS = cachehelper.LRUCache(maxsize=256)
+
+# Process-wide cache of hatch patterns, see Pattern.hatch()
+PATTERNS = cachehelper.LRUCache(maxsize=256, maxbytes=16*1024*1024)
+
+# Smallest pixel width and height of the repeated tile kept by each pattern, see Pattern.image()
+PATTERNBLOCK = 128
+
+# Margin around cached labels for glyphs that extend outside their advance box
+LABELMARGIN = 0.5
+
+# Image adjustments done with lookup tables, which wait to be applied together, see Canvas.flush()
+ADJUSTOPS = set(["brightness", "contrast", "invert", "transparency"])
+
+# Methods that queue text, which can be drawn together in a single batch
+TEXTOPS = set(["draw_text"])
+
+# Image modes whose bands can be adjusted with lookup tables
+LUTMODES = ("L", "LA", "RGB", "RGBA")
+
+# Most image colors used to find the mean of an adjusted image without applying the adjustments
+MAXCOLORS = 65536
+
 
     
 
@@ -96,6 +126,170 @@ def _floatrange(start, end, interval):
             yield cur
             cur -= interval
 
+def _get_numpy(obj):
+    # return the numpy module if obj is a numpy array, otherwise None
+    # ...numpy is never imported here, only used if the caller already did
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(obj, np.ndarray):
+        return np
+
+def _affine_transform(transform, coords):
+    # applies affine coefficients to many coordinates at once
+    a,b,c,d,e,f = transform
+    np = _get_numpy(coords)
+    if np:
+        coords = np.asarray(coords, dtype=float)
+        xys = coords.reshape((-1,2))
+        xs,ys = xys[:,0],xys[:,1]
+        result = np.empty(xys.shape)
+        result[:,0] = xs*a + ys*b + c
+        result[:,1] = xs*d + ys*e + f
+        return result.reshape(coords.shape)
+    if len(coords) and hasattr(coords[0], "__iter__"):
+        coords = [xory for xy in coords for xory in xy]
+    xs,ys = coords[0::2],coords[1::2]
+    result = [0.0] * (len(xs) * 2)
+    result[0::2] = [x*a + y*b + c for x,y in zip(xs,ys)]
+    result[1::2] = [x*d + y*e + f for x,y in zip(xs,ys)]
+    if isinstance(coords, array):
+        result = array("d", result)
+    return result
+
+def _grid_positions(vmin, vmax, interval, start):
+    # multiples of the interval from the start value that fall between vmin and vmax
+    if interval <= 0:
+        raise Exception("Grid interval must be positive, not %s" % interval)
+    first = int(math.ceil((vmin - start) / float(interval)))
+    last = int(math.floor((vmax - start) / float(interval)))
+    return [start + i * interval for i in range(first, last + 1)]
+
+def _on_grid(value, interval, start):
+    # whether the value is a multiple of the interval from the start value
+    steps = (value - start) / float(interval)
+    return abs(steps - round(steps)) < 1e-9
+
+def _ring_area(ring):
+    # signed area of a ring, positive if counterclockwise in a y-up coordinate system
+    area = 0.0
+    prevx,prevy = ring[-1][0],ring[-1][1]
+    for p in ring:
+        x,y = p[0],p[1]
+        area += prevx*y - x*prevy
+        prevx,prevy = x,y
+    return area / 2.0
+
+def _outline_pen(options):
+    # reuse the ready-made pen of a precompiled style
+    pen = getattr(options, "pen", None)
+    if pen is None:
+        pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+    return pen
+
+def _fill_brush(options):
+    # reuse the ready-made brush of a precompiled style
+    brush = getattr(options, "brush", None)
+    if brush is None:
+        brush = aggdraw.Brush(options["fillcolor"])
+    return brush
+
+def _line_pen(options):
+    # reuse the ready-made line pen of a precompiled style
+    pen = getattr(options, "linepen", None)
+    if pen is None:
+        pen = aggdraw.Pen(options["fillcolor"], options["fillsize"])
+    return pen
+
+def _recordable(method):
+    # records calls to the method while the canvas is recording, see Canvas.start_recording()
+    # only the outermost call is recorded, not any calls it makes to other recordable methods
+    # ...also applies any pending image adjustments before all other methods
+    # ...and draws any queued text before all other drawing, see Canvas.flush()
+    name = method.__name__
+    always = name in displaylist.COORDSPACEOPS
+    adjusts = name in ADJUSTOPS
+    keepstext = always or name in TEXTOPS
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._adjustments is not None and not adjusts:
+            self._apply_adjustments()
+        if self._textqueue and not keepstext:
+            self._flush_text()
+        recorder = self._recorder
+        if recorder is None or self._recording_depth:
+            return method(self, *args, **kwargs)
+        if name in displaylist.SHAPEOPS and "fillcolor" not in kwargs and "style" not in kwargs:
+            # same random color every time it is replayed
+            kwargs["fillcolor"] = tuple([random.randrange(0,255) for _ in range(3)])
+        recorder.record(name, args, kwargs)
+        if not (recorder.draw or always):
+            return
+        self._recording_depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._recording_depth -= 1
+    return wrapper
+
+def _float32(value):
+    # rounds to single precision, as used by PIL when blending images
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+def _blend_lut(base, factor):
+    # the lookup table of PIL's Image.blend() between a constant base value and each value,
+    # the same as the PIL.ImageEnhance brightness (base 0) and contrast (base mean) enhancers
+    factor = _float32(factor)
+    lut = []
+    for v in range(256):
+        v = _float32(base + _float32(factor * (v - base)))
+        lut.append(0 if v <= 0 else int(v) if v < 256 else 255)
+    return lut
+
+def _wrap_text(text, fontwidth, boxwidth):
+    # wraps text to the box width, or returns None if not even a single character fits on each line
+    widthratio = fontwidth / float(boxwidth)
+    wraplength = int( len(text) / widthratio ) if widthratio else len(text)
+    if wraplength < 1:
+        return None
+    return textwrap.wrap(text, width=wraplength)
+
+def _fit_textsize(fontlocation, text, boxwidth, boxheight):
+    # predicts the biggest font size where the text wrapped to the box width fits
+    # inside the box height, by scaling the text size measured at a reference font size,
+    # and then verifies it with the actual font, usually with only a single font load.
+    # returns the font and wrapped text lines.
+    refwidth,refheight = fonthelper.load_font(fontlocation, size=fonthelper.REFSIZE).getsize(text)
+    widthperpt = max(refwidth, 1) / float(fonthelper.REFSIZE)
+    heightperpt = max(refheight, 1) / float(fonthelper.REFSIZE)
+
+    # the biggest size for a given number of lines is limited either by the box height
+    # or by the text not fitting on that many lines, so try more lines until the box
+    # height alone limits the size to less than the best size so far
+    size = 1
+    lines = 1
+    while boxheight / (lines * heightperpt) >= size + 1:
+        cursize = int(min(boxheight / (lines * heightperpt), lines * boxwidth / widthperpt))
+        while cursize > size:
+            textlines = _wrap_text(text, cursize * widthperpt, boxwidth)
+            if textlines is not None and len(textlines) <= lines:
+                size = cursize
+                break
+            cursize -= 1
+        lines += 1
+
+    # rounding of the actual glyph sizes may make it slightly too big
+    while True:
+        font = fonthelper.load_font(fontlocation, size=size)
+        fontwidth, fontheight = font.getsize(text)
+        textlines = _wrap_text(text, fontwidth, boxwidth)
+        if size <= 1 or (textlines is not None and fontheight * len(textlines) <= boxheight):
+            return font, textlines or [text]
+        size -= 1
+
+def _floor(value):
+    # the whole pixel containing a position, unlike int() also for negative values
+    # so that positions stay the same when the coordinate system is offset by whole pixels
+    return int(math.floor(value))
+
 def _anchor_offset(x, y, anchor, size):
     # update to post-rotate anchor
     itemwidth,itemheight = size
@@ -103,13 +297,13 @@ def _anchor_offset(x, y, anchor, size):
         pass
     else:
         if "n" in anchor:
-            y = int(y + itemheight/2.0)
+            y = _floor(y + itemheight/2.0)
         elif "s" in anchor:
-            y = int(y - itemheight/2.0)
+            y = _floor(y - itemheight/2.0)
         if "e" in anchor:
-            x = int(x - itemwidth/2.0)
+            x = _floor(x - itemwidth/2.0)
         elif "w" in anchor:
-            x = int(x + itemwidth/2.0)
+            x = _floor(x + itemwidth/2.0)
     return x,y
 
 class _Line:
@@ -289,8 +483,20 @@ class _Line:
         """
         return -(self.x1*self.y2 - self.x2*self.y1)
 
-class Gradient:
+class Gradient(object):
+    """
+    A color gradient that interpolates evenly between a list of rgb or rgba color stops.
+    Its lookup tables are computed once for each size and number of steps, and shared by
+    all gradients with the same color stops, so repeatedly coloring with a gradient only
+    has to look up the colors.
+
+    Parameters:
+
+    - *colorstops*: A list of rgb or rgba color tuples, or another Gradient instance.
+    """
     def __init__(self, colorstops):
+        if isinstance(colorstops, Gradient):
+            colorstops = colorstops.colorstops
         self.colorstops = colorstops
 
     def interp(self, steps=100):
@@ -341,6 +547,326 @@ class Gradient:
 
         return colors
 
+    def lut(self, steps=None, size=256):
+        """
+        Returns a lookup table of rgba color tuples from the start to the end of the gradient.
+
+        Parameters:
+
+        - *steps* (optional): If given, the gradient is divided into this many bands of
+            uniform color. Defaults to None, a smooth gradient.
+        - *size* (optional): The number of colors in the lookup table. Defaults to 256.
+        """
+        return self._table(steps, size)[1]
+
+    def lut_bytes(self, steps=None, size=256):
+        """
+        Returns the same lookup table as lut(), as a bytes string of 4 rgba
+        values per color, eg for use as a PIL palette or numpy array.
+        """
+        return self._table(steps, size)[0]
+
+    def map(self, values, vmin=None, vmax=None, steps=None, size=1024):
+        """
+        Colors many values at once, by scaling each value from vmin to vmax to
+        a position in the gradient and looking up its color.
+
+        Parameters:
+
+        - *values*: The values to color. Can be a numpy array, which returns a uint8 numpy array
+            with an additional dimension of 4 rgba values, where any NaN values are transparent.
+            Can also be a single band PIL image, which returns an RGBA image of the same size.
+            Otherwise a sequence of numbers, which returns a list of rgba color tuples.
+        - *vmin* (optional): The value at the start of the gradient. Defaults to the smallest value.
+        - *vmax* (optional): The value at the end of the gradient. Defaults to the largest value.
+        - *steps* (optional): If given, the gradient is divided into this many bands of uniform color.
+        - *size* (optional): The number of colors in the lookup table that values are rounded to.
+            Defaults to 1024. PIL images always use 256.
+        """
+        if isinstance(values, PIL.Image.Image):
+            img = values
+            if vmin is None or vmax is None:
+                lo,hi = img.getextrema()
+                vmin = lo if vmin is None else vmin
+                vmax = hi if vmax is None else vmax
+            scale = 255.0 / (vmax - vmin) if vmax != vmin else 0
+            positions = img.convert("F").point(lambda v: v * scale + (0.5 - vmin * scale)).convert("L")
+            return gradienthelper.colorize(positions, self.lut(steps))
+
+        np = _get_numpy(values)
+        if np is not None:
+            if vmin is None:
+                vmin = np.nanmin(values)
+            if vmax is None:
+                vmax = np.nanmax(values)
+            scale = (size - 1.0) / (vmax - vmin) if vmax != vmin else 0
+            positions = (np.asarray(values, dtype=np.float64) - vmin) * scale + 0.5
+            np.clip(positions, 0, size - 1, out=positions)
+            missing = np.isnan(positions)
+            hasmissing = missing.any()
+            if hasmissing:
+                positions[missing] = 0
+            table = np.frombuffer(self.lut_bytes(steps, size), dtype=np.uint8).reshape(size, 4)
+            colors = table[positions.astype(np.intp)]
+            if hasmissing:
+                colors[missing] = 0
+            return colors
+
+        values = list(values)
+        if not values:
+            return []
+        if vmin is None:
+            vmin = min(values)
+        if vmax is None:
+            vmax = max(values)
+        scale = (size - 1.0) / (vmax - vmin) if vmax != vmin else 0
+        table = self.lut(steps, size)
+        last = size - 1
+        return [table[min(last, max(0, int((value - vmin) * scale + 0.5)))] for value in values]
+
+    def _table(self, steps, size):
+        # the (bytes, colors) of a lookup table, computed once for each color stops, steps and size
+        stops = tuple(tuple(int(v) for v in color) + (255,) * (4 - len(color))
+                      for color in self.colorstops)
+        key = (stops, steps or None, size)
+        table = GRADIENTLUTS.get(key)
+        if table is None:
+            if len(stops) == 1:
+                stops = stops * 2
+            segments = len(stops) - 1
+            values = bytearray()
+            for i in range(size):
+                if steps:
+                    # each band has the color at its own position among evenly spaced bands
+                    band = min(steps - 1, i * steps // size)
+                    t = band / float(steps - 1) if steps > 1 else 0.0
+                else:
+                    t = i / float(size - 1) if size > 1 else 0.0
+                x = t * segments
+                j = min(int(x), segments - 1)
+                f = x - j
+                a,b = stops[j],stops[j+1]
+                values.extend(int(a[k] + (b[k] - a[k]) * f + 0.5) for k in range(4))
+            colors = tuple(tuple(values[i:i+4]) for i in range(0, len(values), 4))
+            table = (bytes(values), colors)
+            GRADIENTLUTS.put(key, table)
+        return table
+
+    def fill(self, kind="linear", angle=0, steps=None):
+        """
+        Returns a picture fill of the gradient, for use as the fillcolor of shapes
+        like draw_polygon() and draw_box().
+
+        Parameters:
+
+        - *kind* (optional): Either "linear" (default) for a gradient across the shape,
+            or "radial" for a gradient from the center of the shape to its farthest corner.
+        - *angle* (optional): The direction of a linear gradient in degrees clockwise from
+            left to right. Defaults to 0.
+        - *steps* (optional): The number of bands of uniform color, see lut().
+        """
+        if kind not in ("linear", "radial"):
+            raise Exception("Gradient fill must be linear or radial, not %r" % kind)
+        colors = self.lut(steps)
+        def picture(width, height):
+            size = (max(1, width), max(1, height))
+            center = size[0] / 2.0, size[1] / 2.0
+            if kind == "radial":
+                positions = gradienthelper.radial_positions(size, center, math.hypot(*center))
+            else:
+                dx,dy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+                extent = (abs(dx) * size[0] + abs(dy) * size[1]) / 2.0
+                start = center[0] - dx * extent, center[1] - dy * extent
+                end = center[0] + dx * extent, center[1] + dy * extent
+                positions = gradienthelper.linear_positions(size, start, end)
+            return from_image(gradienthelper.colorize(positions, colors))
+        return picture
+
+class Pattern(object):
+    """
+    A repeating texture for filling shapes, eg hatching, which can be given as the
+    fillcolor or fillmask of draw_polygon() and draw_geojson(). The tile is only rendered
+    once, and is repeated from the upper left corner of the canvas, so that the pattern
+    lines up across neighbouring shapes. Shapes filled with the same pattern in
+    draw_geojson_collection() are all filled at once.
+
+    Parameters:
+
+    - *tile*: A PIL image or Canvas to repeat, or a function taking a width and height
+        and returning a Canvas of that size.
+    - *size* (optional): The pixel width and height to render the tile function at.
+        Required if the tile is a function.
+    """
+    def __init__(self, tile, size=None):
+        if hasattr(tile, "__call__") and not isinstance(tile, Canvas):
+            if not size:
+                raise Exception("The size of a pattern tile function must be given")
+            tile = tile(*size)
+        if isinstance(tile, Canvas):
+            tile = tile.get_image()
+        self.tile = tile.convert("RGBA")
+        self._tiled = None
+
+    @classmethod
+    def hatch(cls, kind="diagonal", color=(0,0,0), spacing=8, linewidth=1, background=None):
+        """
+        Returns a standard hatch pattern. The same pattern is returned for the same
+        arguments, so that its tile is only rendered once.
+
+        Parameters:
+
+        - *kind* (optional): The hatch pattern, one of "horizontal", "vertical", "diagonal" (default)
+            for lines going up to the right, "backdiagonal" for lines going down to the right,
+            "cross", "diagonalcross", or "dots".
+        - *color* (optional): The color of the lines or dots. Defaults to black.
+        - *spacing* (optional): The pixel distance between lines or dots. Defaults to 8.
+        - *linewidth* (optional): The pixel width of the lines, or diameter of the dots. Defaults to 1.
+        - *background* (optional): The color between the lines, defaults to transparent.
+        """
+        key = (cls, kind, tuple(color) if isinstance(color, list) else color, spacing, linewidth,
+               tuple(background) if isinstance(background, list) else background)
+        pattern = PATTERNS.get(key)
+        if pattern is None:
+            pattern = cls(patternhelper.hatch_tile(kind, color, spacing, linewidth, background))
+            PATTERNS.put(key, pattern, nbytes=pattern.nbytes)
+        return pattern
+
+    @property
+    def nbytes(self):
+        """
+        The approximate memory size in bytes of the tile and the repeated tile kept by the pattern.
+        """
+        tilewidth,tileheight = self.tile.size
+        blockwidth,blockheight = self._block_size()
+        return 4 * (tilewidth * tileheight + blockwidth * blockheight)
+
+    def image(self, x, y, width, height):
+        """
+        Returns an "RGBA" image of the pattern within a pixel region of the canvas.
+
+        Parameters:
+
+        - *x*: The pixel x-coordinate of the upper left corner of the region.
+        - *y*: The pixel y-coordinate of the upper left corner of the region.
+        - *width*: The pixel width of the region.
+        - *height*: The pixel height of the region.
+        """
+        tilewidth,tileheight = self.tile.size
+        x,y = x % tilewidth, y % tileheight
+        # only a small block of whole tiles is kept, so that the memory held by
+        # cached patterns does not grow with the regions they have filled
+        tiled = self._tiled
+        if tiled is None:
+            tiled = self._tiled = patternhelper.tile_image(self.tile, self._block_size())
+        if tiled.size[0] < x + width or tiled.size[1] < y + height:
+            tiled = patternhelper.tile_image(tiled, (x + width, y + height))
+        return tiled.crop((x, y, x + width, y + height))
+
+    def _block_size(self):
+        # the whole number of tiles that covers at least PATTERNBLOCK pixels
+        tilewidth,tileheight = self.tile.size
+        return (tilewidth * int(math.ceil(PATTERNBLOCK / float(tilewidth))),
+                tileheight * int(math.ceil(PATTERNBLOCK / float(tileheight))))
+
+    def __call__(self, width, height):
+        # the pattern as a picture fill function
+        return from_image(self.image(0, 0, width, height))
+
+    def __getstate__(self):
+        # the repeated pattern is not pickled, only the tile
+        state = self.__dict__.copy()
+        state["_tiled"] = None
+        return state
+
+# Options that give drawing sizes, see Style.to_options()
+SIZEOPTIONS = ("fillsize", "fillwidth", "fillheight", "outlinewidth")
+
+class Style(object):
+    """
+    Precompiled drawing options, as created by Canvas.make_style(). Holds the
+    drawing sizes already converted to pixels along with ready-made aggdraw
+    pens and brushes, so that the same style can be reused by thousands of
+    draw calls without parsing the options again. Any draw method accepts it
+    via the style option. Styles are immutable.
+
+    The resolved options can be looked up like a dictionary, eg style["fillsize"].
+
+    Attributes:
+
+    - *pen*:
+        The aggdraw pen for drawing outlines, or None if there is no outlinecolor.
+    - *brush*:
+        The aggdraw brush for filling shapes, or None if there is no fillcolor.
+    - *linepen*:
+        The aggdraw pen for drawing simple lines with the fillcolor and fillsize,
+        or None if there is no fillcolor.
+    - *rawoptions*:
+        The original unparsed options used to create the style.
+    - *statekey*:
+        The canvas state (ppi, default unit, size, and coordinate space) that the
+        sizes were parsed for.
+    """
+    __slots__ = ("_options", "rawoptions", "statekey", "pen", "brush", "linepen")
+
+    def __init__(self, options, rawoptions, statekey):
+        _set = object.__setattr__
+        _set(self, "_options", options)
+        _set(self, "rawoptions", rawoptions)
+        _set(self, "statekey", statekey)
+        fillcolor,outlinecolor = options["fillcolor"],options["outlinecolor"]
+        if fillcolor and hasattr(fillcolor, "__call__"):
+            # picture fill, cannot be made into a brush
+            fillcolor = None
+        _set(self, "pen", aggdraw.Pen(outlinecolor, options["outlinewidth"]) if outlinecolor else None)
+        _set(self, "brush", aggdraw.Brush(fillcolor) if fillcolor else None)
+        _set(self, "linepen", aggdraw.Pen(fillcolor, options["fillsize"]) if fillcolor else None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Style objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Style objects are immutable")
+
+    def __repr__(self):
+        return "Style(%s)" % ", ".join("%s=%r" % item for item in sorted(self.rawoptions.items()))
+
+    def __getitem__(self, key):
+        return self._options[key]
+
+    def __contains__(self, key):
+        return key in self._options
+
+    def __iter__(self):
+        return iter(self._options)
+
+    def get(self, key, default=None):
+        return self._options.get(key, default)
+
+    def keys(self):
+        return self._options.keys()
+
+    def items(self):
+        return self._options.items()
+
+    def to_options(self, resolve_sizes=False):
+        """
+        Returns the original options used to create the style as a new dictionary,
+        with any random default colors as decided by the style, so that they can be
+        used to recreate the same style.
+
+        Parameters:
+
+        - *resolve_sizes* (optional): If True, the sizes are given in pixels as parsed by
+            the style, instead of in their original units. Defaults to False.
+        """
+        options = dict(self.rawoptions)
+        keys = ("fillcolor", "outlinecolor")
+        if resolve_sizes:
+            keys += SIZEOPTIONS
+        for key in keys:
+            options[key] = self._options[key]
+        return options
+
 
 
 
@@ -354,6 +880,9 @@ class Canvas:
 
     Attributes:
 
+    - *img*:
+        The PIL image of the canvas. Any pending brightness, contrast, invert, or
+        transparency adjustments are applied when it is read. 
     - *width*:
         Pixel width of canvas image
     - *height*:
@@ -377,7 +906,7 @@ class Canvas:
         A list of 6 floats representing the affine transform
         coefficients used to transform input coordinates to the drawing coordinate system. 
     """
-    def __init__(self, width=None, height=None, background=None, mode="RGBA", ppi=300, preset=None):
+    def __init__(self, width=None, height=None, background=None, mode="RGBA", ppi=300, preset=None, defer_text=True):
         """
         Creates a new blank canvas image. 
 
@@ -406,6 +935,11 @@ class Canvas:
         - *preset* (optional):
             Automatically sets the width and height options based on a template.
             Valid values are: "A4"
+        - *defer_text* (optional):
+            If True (default), consecutive text is drawn in a single batch just before
+            the next drawing that is not text, or when the image is next read, so the
+            result is the same as drawing each text immediately, see flush(). If False,
+            each text is drawn immediately. 
         """
         # maybe use image size preset
         if not (width and height):
@@ -451,6 +985,24 @@ class Canvas:
         # by default, interpret all sizes in % of width
         self.default_unit = "%w"
 
+        # remember precompiled styles, see make_style()
+        self._styles = cachehelper.LRUCache(maxsize=1024)
+        self._styles_statekey = None
+
+        # count features skipped or clipped outside the view, see draw_geojson()
+        self.cullstats = {"drawn":0, "culled":0, "clipped":0}
+
+        # text waiting to be drawn on top of the other drawing, see flush()
+        self.defer_text = defer_text
+        self._textqueue = []
+
+        # not recording any drawing, see start_recording()
+        self._recorder = None
+        self._recording_depth = 0
+
+        # lookup tables of each band waiting to be applied to the image, see _adjust()
+        self._adjustments = None
+
         # maybe also have default general drawingoptions
         # ...
 
@@ -467,7 +1019,8 @@ class Canvas:
         gc.collect()
 
     def copy(self):
-        newcanvas = Canvas(100, 100)
+        self.flush()
+        newcanvas = Canvas(100, 100, defer_text=self.defer_text)
         newcanvas.img = self.img.copy()
         newcanvas.background = self.background
         newcanvas.ppi = self.ppi
@@ -478,6 +1031,19 @@ class Canvas:
         newcanvas.update_drawer_img()
         return newcanvas
 
+    @property
+    def img(self):
+        # the canvas image, with any pending adjustments applied first, see _adjust()
+        if self._adjustments is not None:
+            self._apply_adjustments()
+        return self._img
+
+    @img.setter
+    def img(self, img):
+        # a new image replaces the pixels that any pending adjustments were meant for
+        self._img = img
+        self._adjustments = None
+
     @property
     def width(self):
         return self.drawer.size[0]
@@ -495,6 +1061,7 @@ class Canvas:
 
     # Image operations
 
+    @_recordable
     def resize(self, width, height, lock_ratio=False, fit=True):
         """
         Resize canvas image to new width and height in pixels or other units,
@@ -516,8 +1083,9 @@ class Canvas:
         - In addition to changing the original instance, this method returns
             the new instance to allow for linked method calls. 
         """
+        import PIL.ImageOps
         # Resize image
-        self.drawer.flush()
+        self.flush()
         width = units.parse_dist(width,
                                  ppi=self.ppi,
                                  default_unit="px",
@@ -573,6 +1141,7 @@ class Canvas:
         self.custom_space(*newbbox, lock_ratio=False)
         return self
 
+    @_recordable
     def rotate(self, degrees, expand=True):
         """
         Rotate the canvas image in degree angles,
@@ -588,7 +1157,7 @@ class Canvas:
         - In addition to changing the original instance, this method returns
             the new instance to allow for linked method calls. 
         """
-        self.drawer.flush()
+        self.flush()
         self.img = self.img.rotate(degrees, PIL.Image.BICUBIC, expand=expand)
         self.update_drawer_img()
         # Somehow update the drawtransform/coordspace to follow the image change operation
@@ -618,6 +1187,7 @@ class Canvas:
 ##        """
 ##        pass
 
+    @_recordable
     def flip(self, xflip=True, yflip=False):
         """
         Flip the canvas image horizontally or vertically (center-anchored),
@@ -633,7 +1203,7 @@ class Canvas:
         - In addition to changing the original instance, this method returns
             the new instance to allow for linked method calls. 
         """
-        self.drawer.flush()
+        self.flush()
         img = self.img
         if xflip: img = img.transpose(PIL.Image.FLIP_LEFT_RIGHT)
         if yflip: img = img.transpose(PIL.Image.FLIP_TOP_BOTTOM)
@@ -657,6 +1227,7 @@ class Canvas:
         self.update_drawer_img()
         return self
 
+    @_recordable
     def move(self, xmove, ymove):
         """
         Move/offset the canvas image in pixels or other units,
@@ -686,7 +1257,7 @@ class Canvas:
                                  canvassize=[self.width,self.height],
                                  coordsize=[self.coordspace_width,self.coordspace_height])
         # paste self on blank at offset pixel coords
-        self.drawer.flush()
+        self.flush()
         blank = PIL.Image.new(self.img.mode, self.img.size, None)
         blank.paste(self.img, (int(xmove), int(ymove)))
         self.img = blank
@@ -722,6 +1293,7 @@ class Canvas:
         self.update_drawer_img()
         return self
 
+    @_recordable
     def paste(self, image, xy=(0,0), bbox=None, lock_ratio=True, fit=True, anchor="nw", outlinewidth=None, outlinecolor="black"):
         """
         Paste a PIL image or PyAgg canvas
@@ -746,7 +1318,7 @@ class Canvas:
             the new instance to allow for linked method calls.
         """
         self.drawer.flush()
-        if isinstance(image, Canvas): image = image.img
+        if isinstance(image, Canvas): image = image.get_image()
         
         if bbox:
             x1,y1,x2,y2 = bbox
@@ -767,50 +1339,15 @@ class Canvas:
             xy = xleft,ytop
             
         elif xy:
-            # Parse xy location from any type of unit to pixels
-            x,y = xy
-            x = units.parse_dist(x,
-                                 ppi=self.ppi,
-                                 default_unit="px",
-                                 canvassize=[self.width,self.height],
-                                 coordsize=[self.coordspace_width,self.coordspace_height])
-            y = units.parse_dist(y,
-                                 ppi=self.ppi,
-                                 default_unit="px",
-                                 canvassize=[self.width,self.height],
-                                 coordsize=[self.coordspace_width,self.coordspace_height])
-            
-            # Anchor
-            width,height = image.size
-            anchor = anchor.lower()
-            if anchor == "center":
-                x = int(x - width/2.0)
-                y = int(y - height/2.0)
-            else:
-                x = int(x - width/2.0)
-                y = int(y - height/2.0)
-                if "n" in anchor:
-                    y = int(y + height/2.0)
-                elif "s" in anchor:
-                    y = int(y - height/2.0)
-                if "e" in anchor:
-                    x = int(x - width/2.0)
-                elif "w" in anchor:
-                    x = int(x + width/2.0)
-            xy = (x,y)
-            bbox = [x,y,x+width,y+height]
+            xy = self._paste_xy(image, xy, anchor)
+            bbox = [xy[0], xy[1], xy[0]+image.size[0], xy[1]+image.size[1]]
 
             # NOTE: potential bug here if opposite axis directions
             # which happes when drawing the outline below
             # ...
 
         ###
-        if image.mode == "RGBA":
-            pasted = PIL.Image.new("RGBA", self.img.size)
-            pasted.paste(image, xy) # reframes the image so has the same size as the background image
-            self.img = PIL.Image.alpha_composite(self.img, pasted) # possibly slower but correctly blends the transparencies of both imgs
-            #self.img.paste(image, xy, image) # paste using self as transparency mask (PROBLEM: forces transparency of pasted image, so cuts through solid colors in the background image)
-        else: self.img.paste(image, xy)
+        self._paste_image(image, xy)
             
         # apply
         self.update_drawer_img()
@@ -821,6 +1358,83 @@ class Canvas:
         
         return self
 
+    @_recordable
+    def paste_many(self, items, anchor="nw"):
+        """
+        Paste many PIL images or PyAgg canvases onto the Canvas at once, 
+        only updating the drawer once at the end.
+
+        Parameters:
+
+        - *items*: A sequence of (image, xy) pairs, where image is a PIL image or PyAgg canvas
+            and xy is the location to paste it, same as for paste(). 
+        - *anchor*: What part of each image to anchor at its xy point, same as for paste(). 
+
+        Returns:
+        
+        - In addition to changing the original instance, this method returns
+            the new instance to allow for linked method calls.
+        """
+        self.drawer.flush()
+        for image,xy in items:
+            if isinstance(image, Canvas): image = image.get_image()
+            self._paste_image(image, self._paste_xy(image, xy, anchor))
+
+        # apply
+        self.update_drawer_img()
+
+        return self
+
+    def _paste_xy(self, image, xy, anchor):
+        # parse xy location from any type of unit to pixels
+        x,y = xy
+        x = units.parse_dist(x,
+                             ppi=self.ppi,
+                             default_unit="px",
+                             canvassize=[self.width,self.height],
+                             coordsize=[self.coordspace_width,self.coordspace_height])
+        y = units.parse_dist(y,
+                             ppi=self.ppi,
+                             default_unit="px",
+                             canvassize=[self.width,self.height],
+                             coordsize=[self.coordspace_width,self.coordspace_height])
+        
+        # anchor
+        width,height = image.size
+        anchor = anchor.lower()
+        x = int(x - width/2.0)
+        y = int(y - height/2.0)
+        if anchor != "center":
+            if "n" in anchor:
+                y = int(y + height/2.0)
+            elif "s" in anchor:
+                y = int(y - height/2.0)
+            if "e" in anchor:
+                x = int(x - width/2.0)
+            elif "w" in anchor:
+                x = int(x + width/2.0)
+        return x,y
+
+    def _paste_image(self, image, xy):
+        # composites the image onto the canvas image, only within the area that it covers,
+        # blending the transparencies of both images
+        x,y = xy
+        if image.mode == "RGBA" and self.img.mode == "RGBA":
+            width,height = self.img.size
+            left,top = max(x, 0),max(y, 0)
+            right,bottom = min(x + image.size[0], width),min(y + image.size[1], height)
+            if left >= right or top >= bottom:
+                return
+            box = (left, top, right, bottom)
+            overlay = image.crop((left - x, top - y, right - x, bottom - y))
+            self.img.paste(PIL.Image.alpha_composite(self.img.crop(box), overlay), box)
+        elif image.mode == "RGBA":
+            # the canvas has no transparency, so the image transparency is only a mask
+            self.img.paste(image, (x,y), image)
+        else:
+            self.img.paste(image, (x,y))
+
+    @_recordable
     def crop(self, xmin, ymin, xmax, ymax):
         """
         Crop the canvas image to a bounding box defined in pixel coordinates,
@@ -843,7 +1457,7 @@ class Canvas:
         - In addition to changing the original instance, this method returns
             the new instance to allow for linked method calls.
         """
-        self.drawer.flush()
+        self.flush()
 
         # ensure old and zoom axes go in same directions
         xleft, ybottom, xright, ytop = xmin,ymin,xmax,ymax
@@ -895,6 +1509,46 @@ class Canvas:
         self.drawer = aggdraw.Draw(self.img)
         self.drawer.settransform(self.coordspace_transform)
 
+    def _adjust(self, colorlut=None, alphalut=None):
+        # adds lookup tables for the color and alpha bands to any pending adjustments,
+        # so that chained adjustments are applied together in a single pass over the image
+        # when it is next needed, see _apply_adjustments()
+        if self._adjustments is None:
+            self.flush()
+            self._adjustments = [list(range(256)) for _ in self._img.getbands()]
+        for i,band in enumerate(self._img.getbands()):
+            lut = alphalut if band == "A" else colorlut
+            if lut is not None:
+                self._adjustments[i] = [lut[v] for v in self._adjustments[i]]
+
+    def _adjusted_mean(self):
+        # the mean grayscale value of the image with any pending adjustments, the same as
+        # PIL's contrast enhancer, computed from the image colors if there are not too many
+        luts = self._adjustments
+        colors = self._img.getcolors(MAXCOLORS) if luts else None
+        if colors is None:
+            if luts:
+                self._apply_adjustments()
+            else:
+                self.flush()
+            hist = self.img.convert("L").histogram()
+            total = sum(count * v for v,count in enumerate(hist))
+        else:
+            total = 0
+            for count,color in colors:
+                if self._img.mode in ("L", "LA"):
+                    gray = luts[0][color[0]]
+                else:
+                    r,g,b = [lut[v] for lut,v in zip(luts, color[:3])]
+                    gray = (r * 19595 + g * 38470 + b * 7471 + 0x8000) >> 16
+                total += count * gray
+        return int(total / float(self.width * self.height) + 0.5)
+
+    def _apply_adjustments(self):
+        # applies all pending adjustments to the image, see _adjust()
+        luts = self._adjustments
+        self.img = self._img.point([v for lut in luts for v in lut])
+        self.update_drawer_img()
 
 
 
@@ -904,34 +1558,50 @@ class Canvas:
 
     # Color quality
 
+    @_recordable
     def brightness(self, factor):
-        self.drawer.flush()
+        if self._img.mode in LUTMODES:
+            self._adjust(_blend_lut(0, factor))
+            return self
+        import PIL.ImageEnhance
+        self.flush()
         self.img = PIL.ImageEnhance.Brightness(self.img).enhance(factor)
         self.update_drawer_img()
         return self
 
+    @_recordable
     def contrast(self, factor):
-        self.drawer.flush()
+        if self._img.mode in LUTMODES:
+            self._adjust(_blend_lut(self._adjusted_mean(), factor))
+            return self
+        import PIL.ImageEnhance
+        self.flush()
         self.img = PIL.ImageEnhance.Contrast(self.img).enhance(factor)
         self.update_drawer_img()
         return self
 
+    @_recordable
     def blur(self, factor):
-        self.drawer.flush()
+        import PIL.ImageEnhance
+        self.flush()
         factor = 1 - factor # input is 0-1, PIL expects 0-1.
         self.img = PIL.ImageEnhance.Sharpness(self.img).enhance(factor)
         self.update_drawer_img()
         return self
 
+    @_recordable
     def sharpen(self, factor):
-        self.drawer.flush()
+        import PIL.ImageEnhance
+        self.flush()
         factor += 1 # input is 0-1, PIL expects 1-2.
         self.img = PIL.ImageEnhance.Sharpness(self.img).enhance(factor)
         self.update_drawer_img()
         return self
 
+    @_recordable
     def equalize(self):
-        self.drawer.flush()
+        import PIL.ImageOps
+        self.flush()
         oldmode = self.img.mode
         if not self.img.mode == "RGB":
             self.img = self.img.convert("RGB")
@@ -941,107 +1611,65 @@ class Canvas:
             self.img = self.img.convert(oldmode)
         return self
 
+    @_recordable
     def invert(self):
-        self.drawer.flush()
+        if self._img.mode in LUTMODES:
+            # only the colors, not the transparency
+            self._adjust([255 - v for v in range(256)])
+            return self
+        import PIL.ImageOps
+        self.flush()
         self.img = PIL.ImageOps.invert(self.img)
         self.update_drawer_img()
         return self
         
+    @_recordable
     def transparency(self, alpha):
-        self.drawer.flush()
+        if isinstance(alpha, int) and self._img.mode in ("LA", "RGBA"):
+            self._adjust(alphalut=[alpha] * 256)
+            return self
+        self.flush()
 ##        blank = PIL.Image.new(self.img.mode, self.img.size, None)
 ##        self.img = blank.paste(self.img, (0,0), alpha)
         self.img.putalpha(alpha)
         self.update_drawer_img()
         return self
 
-    def transparent_color(self, color, alpha=0, tolerance=0):
+    @_recordable
+    def transparent_color(self, color, alpha=0, tolerance=0, metric="average"):
         # make all specified color values transparent (alpha)
         # ...alternatively with a tolerance for almost matching colors
-        self.drawer.flush()
-        
-        if tolerance == 0:
-            image = self.img.convert("RGBA")
-            r,g,b,a = image.split()
-            red_mask = r.point(lambda px: alpha if px == color[0] else 255, "L")
-            green_mask = g.point(lambda px: alpha if px == color[1] else 255, "L")
-            blue_mask = b.point(lambda px: alpha if px == color[2] else 255, "L")
-            all_mask = PIL.ImageMath.eval("convert(r | g | b, 'L')", r=red_mask, g=green_mask, b=blue_mask)
-            image.putalpha(all_mask)
-        else:
-            image = self.img.convert("RGBA")
-            r,g,b,a = image.split()
-            tolerance = 255 * tolerance
-            def diff(a, b):
-                # absolute positive diff
-                if a >= b:
-                    _diff = a - b
-                else:
-                    _diff = b - a
-                return _diff 
-            red_diff = r.point(lambda px: diff(px,color[0]), "L")
-            green_diff = g.point(lambda px: diff(px,color[1]), "L")
-            blue_diff = b.point(lambda px: diff(px,color[2]), "L")
-            avg_diff = PIL.ImageMath.eval("convert((r+g+b) / 3.0, 'L')",
-                                          r=red_diff, g=green_diff, b=blue_diff)
-            all_mask = avg_diff.point(lambda px: alpha if px <= tolerance else 255)
-            image.putalpha(all_mask)
-
-            # from: http://stackoverflow.com/questions/765736/using-pil-to-make-all-white-pixels-transparent
-##            def distance(a, b):
-##                return (a[0] - b[0]) * (a[0] - b[0]) + (a[1] - b[1]) * (a[1] - b[1]) + (a[2] - b[2]) * (a[2] - b[2])
-##            image = self.img.convert("RGBA")
-##            red, green, blue, alpha = image.split()
-##            image.putalpha(PIL.ImageMath.eval("""convert(((((t - d(c, (r, g, b))) >> 31) + 1) ^ 1) * a, 'L')""",
-##                t=tolerance, d=distance, c=color, r=red, g=green, b=blue, a=alpha))
-            
+        # ...measured as the average, euclidean, or largest channel difference (metric)
+        self.flush()
+        image = self.img.convert("RGBA")
+        mask = colorhelper.color_mask(image, color, tolerance, metric)
+        # other pixels keep their existing transparency
+        alphaband = image.getchannel("A")
+        alphaband.paste(alpha, (0,0)+image.size, mask)
+        image.putalpha(alphaband)
         self.img = image
         self.update_drawer_img()
         return self
 
-    def replace_color(self, color, newcolor, tolerance=0):
+    @_recordable
+    def replace_color(self, color, newcolor, tolerance=0, metric="average"):
         # replace all specified color values with another color
         # ...alternatively with a tolerance for almost matching colors
-        self.drawer.flush()
-        
-        if tolerance == 0:
-            image = self.img.convert("RGBA")
-            r,g,b,a = image.split()
-            red_mask = r.point(lambda px: 255 if px == color[0] else 0, "L")
-            green_mask = g.point(lambda px: 255 if px == color[1] else 0, "L")
-            blue_mask = b.point(lambda px: 255 if px == color[2] else 0, "L")
-            all_mask = PIL.ImageMath.eval("convert(r & g & b, 'L')", r=red_mask, g=green_mask, b=blue_mask)
-            #image.putalpha(all_mask)
-        else:
-            image = self.img.convert("RGBA")
-            r,g,b,a = image.split()
-            tolerance = 255 * tolerance # tolerance is 0-1
-            def diff(a, b):
-                # absolute positive diff
-                if a >= b:
-                    _diff = a - b
-                else:
-                    _diff = b - a
-                return _diff 
-            red_diff = r.point(lambda px: diff(px,color[0]), "L")
-            green_diff = g.point(lambda px: diff(px,color[1]), "L")
-            blue_diff = b.point(lambda px: diff(px,color[2]), "L")
-            avg_diff = PIL.ImageMath.eval("convert((r+g+b) / 3.0, 'L')",
-                                          r=red_diff, g=green_diff, b=blue_diff)
-            all_mask = avg_diff.point(lambda px: 255 if px <= tolerance else 0)
-            #image.putalpha(all_mask)
-
-        newimg = image #PIL.Image.new("RGB", image.size, newcolor)
-        newimg.paste(newcolor, (0,0), all_mask)
-
-        self.img = newimg
+        # ...measured as the average, euclidean, or largest channel difference (metric)
+        self.flush()
+        image = self.img.convert("RGBA")
+        mask = colorhelper.color_mask(image, color, tolerance, metric)
+        image.paste(newcolor, (0,0)+image.size, mask)
+        self.img = image
         self.update_drawer_img()
         return self
 
+    @_recordable
     def color_tint(self, color):
+        import PIL.ImageOps
         # add rgb color to each pixel
         # from: http://stackoverflow.com/questions/12251896/colorize-image-while-preserving-transparency-with-pil
-        self.drawer.flush()
+        self.flush()
         r, g, b, alpha = self.img.split()
         gray = PIL.ImageOps.grayscale(self.img)
         result = PIL.ImageOps.colorize(gray, (0, 0, 0, 0), color) 
@@ -1050,30 +1678,20 @@ class Canvas:
         self.update_drawer_img()
         return self
 
+    @_recordable
     def color_remap(self, gradient):
         # convert to grayscale and recolor based on input gradient
         # experimental...
-        self.drawer.flush()
-        colors = Gradient(gradient).interp(256)
-
-        # put into palette
-        mode = self.img.mode
-        rgbs = ((rgb[0],rgb[1],rgb[2]) for rgb in colors)
-        plt = [spec for rgb in rgbs for spec in rgb]
-        if mode == "RGBA":
-            r,g,b,a = self.img.split()
-        self.img = self.img.convert("L")
-        self.img.putpalette(plt)
-        self.img = self.img.convert("RGBA")
-        # put alpha into the palette
-        if mode == "RGBA" and len(colors[0]) == 4:
-            alphas = [rgb[3] for rgb in colors]
-            gradalpha = self.img.convert("L").point(lut=alphas)
+        from PIL import ImageChops
+        self.flush()
+        colors = Gradient(gradient).lut()
+        remapped = gradienthelper.colorize(self.img.convert("L"), colors)
+        if self.img.mode == "RGBA":
             # gradient alpha can only lessen the original alpha
-            a = PIL.ImageMath.eval('min(a1,a2)', a1=a, a2=gradalpha).convert('L')
-        # apply gradient transparancy to the paletted img
-        if mode == "RGBA":
-            self.img.putalpha(a)
+            remapped.putalpha(ImageChops.darker(self.img.getchannel("A"), remapped.getchannel("A")))
+        else:
+            remapped.putalpha(255)
+        self.img = remapped
         self.update_drawer_img()
 
 ##        self.percent_space()
@@ -1085,45 +1703,61 @@ class Canvas:
             
         return self
 
-    def draw_gradient(self, line, gradient, width, steps=100, **options):
+    @_recordable
+    def draw_gradient(self, line, gradient, width, steps=None, **options):
+        """
+        Draws a line filled with a color gradient that runs along it from its first to
+        its last point. The gradient colors are looked up for every pixel at once, so
+        drawing takes the same time regardless of the number of steps.
+
+        Parameters:
+
+        - *line*: A sequence of two or more xy points. Two points draw a straight gradient band,
+            more than two draw the gradient along the bends of the line.
+        - *gradient*: A list of rgb or rgba color tuples that the gradient interpolates between,
+            or a Gradient instance.
+        - *width*: The width of the line, can be specified with any unit with a string representation.
+        - *steps* (optional): If given, the gradient is divided into this many bands of uniform color.
+            Defaults to None, a smooth gradient.
+        - *options* (optional): Keyword args dictionary of outlinecolor and outlinewidth options.
+        """
         options = self._check_options(options)
+        self.drawer.flush()
 
-        #width,unit = units.split_unit(width)
         pixwidth = self.parse_relative_dist(width)
-        
         halfwidth = pixwidth/2.0
-        p1,p2 = line
-        p1,p2 = self.coord2pixel(*p1), self.coord2pixel(*p2)
-        dirvec = p2[0]-p1[0], p2[1]-p1[1]
-        magni = math.hypot(*dirvec)
-        relmagni = halfwidth / float(magni)
-        perpvec = dirvec[1]*relmagni, -dirvec[0]*relmagni
-
-        colors = (col for col in Gradient(gradient).interp(steps))
-        xincr = dirvec[0]/float(steps)
-        yincr = dirvec[1]/float(steps)
-        incrlength = math.hypot(xincr,yincr)
-        incrlength += 2 # NOTE: Adds extra pixels to avoid tiny gaps bw lines
-        #incrlength = str(incrlength + 2) + "px" # NOTE: Adds 2 extra pixels to avoid tiny gaps bw lines
-
-        # temporarily suspend transform in order to draw directly using pixel coords
-        self.drawer.settransform()
-
-        # draw slices stepwise along the line
-        cur = p1[0]+xincr/2.0, p1[1]+yincr/2.0
-        for step in range(steps):
-            left = cur[0]-perpvec[0], cur[1]-perpvec[1]
-            right = cur[0]+perpvec[0], cur[1]+perpvec[1]
-            col = tuple(next(colors))
+        coords = []
+        for xy in line:
+            xy = self.coord2pixel(*xy)
+            if not coords or xy != coords[-1]:
+                coords.append(xy)
+
+        if len(coords) >= 2 and halfwidth > 0:
+            # only the pixels covered by the line are computed
+            left,right,starts = geomhelper.stroke_line(coords, [halfwidth]*len(coords), starts=True)
+            outline = left + right[::-1]
+            xs,ys = zip(*outline)
+            xmin,ymin = max(0, int(math.floor(min(xs)))), max(0, int(math.floor(min(ys))))
+            xmax,ymax = min(self.width, int(math.ceil(max(xs)))), min(self.height, int(math.ceil(max(ys))))
+
+            if xmin < xmax and ymin < ymax:
+                size = (xmax-xmin, ymax-ymin)
+                coords = [(x-xmin, y-ymin) for x,y in coords]
+                if len(coords) == 2:
+                    positions = gradienthelper.linear_positions(size, coords[0], coords[1])
+                else:
+                    left = [(x-xmin, y-ymin) for x,y in left]
+                    right = [(x-xmin, y-ymin) for x,y in right]
+                    positions = gradienthelper.path_positions(size, coords, left, right, starts)
 
-            pen = aggdraw.Pen(col, incrlength)
-            pixline = [left[0],left[1],right[0],right[1]]
-            self.drawer.line(pixline, pen)
-            #self.draw_line([left,right], fillcolor=col, fillsize=incrlength, outlinecolor=None)
-            cur = cur[0]+xincr, cur[1]+yincr
+                # the antialiased shape of the line
+                maskdrawer = aggdraw.Draw("L", size, 0)
+                maskdrawer.polygon([v for x,y in outline for v in (x-xmin, y-ymin)], aggdraw.Brush(255))
+                mask = PIL.Image.frombytes("L", size, maskdrawer.tobytes())
 
-        # reactivate transform
-        self.drawer.settransform(self.coordspace_transform)
+                colors = Gradient(gradient).lut(steps)
+                self._paste_image(gradienthelper.colorize(positions, colors, mask), (xmin,ymin))
+                self.update_drawer_img()
 
         # draw the line outline
         if options.get('outlinecolor') and options.get('outlinewidth'):
@@ -1142,33 +1776,62 @@ class Canvas:
 
     # Layout
 
-    def draw_grid(self, xinterval, yinterval, **kwargs):
-        # ONLY BASIC SO FAR...
-        xleft,ytop,xright,ybottom = self.coordspace_bbox
-        xs = (xleft,xright)
-        ys = (ytop,ybottom)
-        xmin,xmax = min(xs),max(xs)
-        ymin,ymax = min(ys),max(ys)
-        
+    @_recordable
+    def draw_grid(self, xinterval, yinterval, xminor=None, yminor=None, origin=(0,0),
+                  labels=False, labelformat=None, labeloptions=None, minoroptions=None, **kwargs):
+        """
+        Draws grid lines across the canvas at regular intervals of the coordinate system,
+        eg a graticule on a map. Only the lines within the current view are drawn, and
+        all of them are drawn as a single path with a single pen.
+
+        Parameters:
+
+        - *xinterval*: The coordinate interval between the vertical grid lines.
+        - *yinterval*: The coordinate interval between the horizontal grid lines.
+        - *xminor* (optional): The coordinate interval between minor vertical lines, drawn underneath
+            the grid lines. Defaults to None, no minor lines.
+        - *yminor* (optional): The coordinate interval between minor horizontal lines.
+        - *origin* (optional): An xy coordinate that the grid lines pass through. Defaults to (0,0).
+        - *labels* (optional): If True, writes the coordinate of each grid line along the bottom and
+            left edges of the view. Defaults to False.
+        - *labelformat* (optional): Python formatting string or function for converting coordinates
+            to labels. By default whole numbers if the intervals are whole, otherwise the shortest
+            decimal representation.
+        - *labeloptions* (optional): Dictionary of options to be passed to draw_text() for the labels.
+        - *minoroptions* (optional): Dictionary of fillsize and fillcolor options of the minor lines.
+            By default the same as the grid lines, but half as thick.
+        - *kwargs* (optional): The fillsize (default 1px) and fillcolor (default black) options
+            of the grid lines.
+        """
         if "fillsize" not in kwargs:
             kwargs["fillsize"] = "1px"
         if "fillcolor" not in kwargs:
-            kwargs["fillcolor"] = "1px"
-
-        xorigin, yorigin = 0,0
-        
-        # x
-        for x in _floatrange(xorigin, xmin, -xinterval):
-            self.draw_line([(x,ymax),(x,ymin)], **kwargs)
-        for x in _floatrange(xorigin, xmax, xinterval):
-            self.draw_line([(x,ymax),(x,ymin)], **kwargs)
-
-        # y
-        for y in _floatrange(yorigin, ymin, -yinterval):
-            self.draw_line([(xmin,y),(xmax,y)], **kwargs)
-        for y in _floatrange(yorigin, ymax, yinterval):
-            self.draw_line([(xmin,y),(xmax,y)], **kwargs)
-
+            kwargs["fillcolor"] = "black"
+        options = self._check_options(kwargs)
+
+        # grid positions within the view
+        xmin,ymin,xmax,ymax = self._view_bbox()
+        xorigin,yorigin = origin
+        xs = _grid_positions(xmin, xmax, xinterval, xorigin)
+        ys = _grid_positions(ymin, ymax, yinterval, yorigin)
+
+        # minor lines, except where they coincide with the grid lines
+        if xminor or yminor:
+            minor = dict(kwargs, fillsize="%spx" % (options["fillsize"] / 2.0))
+            minor.update(minoroptions or {})
+            minor = self._check_options(minor)
+            minorxs = [x for x in _grid_positions(xmin, xmax, xminor, xorigin)
+                       if not _on_grid(x, xinterval, xorigin)] if xminor else []
+            minorys = [y for y in _grid_positions(ymin, ymax, yminor, yorigin)
+                       if not _on_grid(y, yinterval, yorigin)] if yminor else []
+            self._draw_grid_lines(minorxs, minorys, (xmin,ymin,xmax,ymax), minor)
+
+        self._draw_grid_lines(xs, ys, (xmin,ymin,xmax,ymax), options)
+
+        if labels:
+            self._draw_grid_labels(xs, ys, xinterval, yinterval, origin, labelformat, labeloptions)
+
+    @_recordable
     def grid_paste(self, imgs, columns=None, rows=None, colfirst=True, lock_ratio=True, fit=True):
         # canvas size
         width,height = self.width,self.height
@@ -1201,6 +1864,7 @@ class Canvas:
         # insert
         pastewidth = int(width/columns)
         pasteheight = int(height/rows)
+        items = []
 
         if colfirst:
             y = 0
@@ -1216,8 +1880,7 @@ class Canvas:
                         if canvas:
                             # resize subimg
                             canvas.resize(pastewidth, pasteheight, lock_ratio=lock_ratio, fit=fit)
-                            # paste
-                            self.paste(canvas, (x,y))
+                            items.append((canvas, (x,y)))
                     x += pastewidth
                     
                 y += pasteheight
@@ -1236,12 +1899,14 @@ class Canvas:
                         if canvas:
                             # resize subimg
                             canvas.resize(pastewidth, pasteheight, lock_ratio=lock_ratio, fit=fit)
-                            # paste
-                            self.paste(canvas, (x,y))
+                            items.append((canvas, (x,y)))
                     y += pasteheight
                     
                 x += pastewidth
 
+        # paste
+        self.paste_many(items)
+
         return self
 
 ##    def warp(self, coordconvert, method="near"):
@@ -1290,6 +1955,7 @@ class Canvas:
 ##        self.img = PIL.Image.merge(self.img.mode, bands)
 ##        self.update_drawer_img()
 
+    @_recordable
     def draw_axis(self, axis, minval, maxval, intercept,
                   tickpos=None,
                   tickinterval=None, ticknum=5,
@@ -1461,6 +2127,7 @@ class Canvas:
         units = self.coordspace_width / float(widthcm)
         return units
 
+    @_recordable
     def zoom_units(self, units, center=None):
         """
         Zoom in or out based on how many units per cm to have at the new zoom level.
@@ -1470,7 +2137,7 @@ class Canvas:
         - *units*: how many coordinate units per screen cm at the new zoom level.
         - *center* (optional): xy coordinate tuple to center/offset the zoom. Defauls to middle of the bbox. 
         """
-        self.drawer.flush()
+        self.flush()
         
         # calculate pixels per unit etc
         unitscm = units
@@ -1492,6 +2159,7 @@ class Canvas:
 
         self.update_drawer_img()
 
+    @_recordable
     def zoom_factor(self, factor, center=None):
         """
         Zooms in or out n times of previous bbox. Useful when the zoom is called programmatically and it is
@@ -1502,7 +2170,7 @@ class Canvas:
         - *factor*: Positive values > 1 for in-zoom, negative < -1 for out-zoom.
         - *center* (optional): xy coordinate tuple to center/offset the zoom. Defauls to middle of the bbox. 
         """
-        self.drawer.flush()
+        self.flush()
         
         if -1 < factor < 1:
             raise Exception("Zoom error: Zoom factor must be higher than +1 or lower than -1.")
@@ -1521,6 +2189,7 @@ class Canvas:
         
         self.update_drawer_img()
 
+    @_recordable
     def zoom_in(self, factor, center=None):
         """
         Zooms inwards n times of previous bbox. Same as zoom_factor() with a positive value. 
@@ -1532,6 +2201,7 @@ class Canvas:
         """
         self.zoom_factor(factor, center)
 
+    @_recordable
     def zoom_out(self, factor, center=None):
         """
         Zooms outwards n times of previous bbox. Same as zoom_factor() with a negative value. 
@@ -1543,6 +2213,7 @@ class Canvas:
         """
         self.zoom_factor(-1 * factor, center)        
 
+    @_recordable
     def zoom_bbox(self, xmin, ymin, xmax, ymax, lock_ratio=True, fit=True):
         """
         Essentially the same as using coord_space(), but takes a bbox
@@ -1558,8 +2229,25 @@ class Canvas:
         - *ymax*: The higher bound of the y-axis after the zoom.
         - *lock_ratio*: Preserve the aspect ratio of the original image/coordsys. 
         """
-        self.drawer.flush()
+        self.flush()
+        xleft,ytop,xright,ybottom = self._zoom_coords(xmin, ymin, xmax, ymax, lock_ratio, fit)
+            
+        # zoom the image
+        pxleft,pytop = self.coord2pixel(xleft,ytop)
+        pxright,pybottom = self.coord2pixel(xright,ybottom)
+        self.img = self.img.transform((self.width,self.height),
+                                      PIL.Image.EXTENT,
+                                      (pxleft,pytop,pxright,pybottom),
+                                      PIL.Image.BILINEAR)
+        
+        # zoom the coord space
+        # NOTE: disabling aspect ratio because already calculated the bbox correctly
+        self.custom_space(xleft, ytop, xright, ybottom, lock_ratio=False) 
         
+        self.update_drawer_img()
+
+    def _zoom_coords(self, xmin, ymin, xmax, ymax, lock_ratio, fit):
+        # the left, top, right, and bottom coordinates to zoom to, see zoom_bbox()
         xleft, ybottom, xright, ytop = xmin, ymin, xmax, ymax
         oldxleft, oldytop, oldxright, oldybottom = self.coordspace_bbox
         
@@ -1578,21 +2266,9 @@ class Canvas:
                                                                   self.coordspace_width,
                                                                   self.coordspace_height,
                                                                   fit=fit)
-            
-        # zoom the image
-        pxleft,pytop = self.coord2pixel(xleft,ytop)
-        pxright,pybottom = self.coord2pixel(xright,ybottom)
-        self.img = self.img.transform((self.width,self.height),
-                                      PIL.Image.EXTENT,
-                                      (pxleft,pytop,pxright,pybottom),
-                                      PIL.Image.BILINEAR)
-        
-        # zoom the coord space
-        # NOTE: disabling aspect ratio because already calculated the bbox correctly
-        self.custom_space(xleft, ytop, xright, ybottom, lock_ratio=False) 
-        
-        self.update_drawer_img()
+        return xleft,ytop,xright,ybottom
 
+    @_recordable
     def pixel_space(self):
         """
         Convenience method for setting the coordinate space to pixels,
@@ -1603,6 +2279,7 @@ class Canvas:
         self.coordspace_transform = (1, 0, 0,
                                      0, 1, 0)
 
+    @_recordable
     def fraction_space(self):
         """
         Convenience method for setting the coordinate space to fractions,
@@ -1610,6 +2287,7 @@ class Canvas:
         """
         self.custom_space(*[0,0,1,1])
 
+    @_recordable
     def percent_space(self):
         """
         Convenience method for setting the coordinate space to percentages,
@@ -1617,6 +2295,7 @@ class Canvas:
         """
         self.custom_space(*[0,0,100,100])
 
+    @_recordable
     def geographic_space(self):
         """
         Convenience method for setting the coordinate space to geographic,
@@ -1627,6 +2306,7 @@ class Canvas:
         """
         self.custom_space(*[-180,90,180,-90], lock_ratio=True)
 
+    @_recordable
     def custom_space(self, xleft, ytop, xright, ybottom,
                          lock_ratio=False):
         """
@@ -1703,6 +2383,7 @@ class Canvas:
                                            yratio=yheight / float(oldyheight) )
         self.coordspace_transform = transcoeffs
 
+    @_recordable
     def set_default_unit(self, unit):
         """
         Sets the default unit for drawing sizes etc.
@@ -1716,6 +2397,47 @@ class Canvas:
         """
         self.default_unit = unit
 
+    def make_style(self, **options):
+        """
+        Precompiles a set of drawing options into a reusable Style object, so that
+        the options only have to be parsed once instead of for every draw call.
+        Pass the returned style to any draw method using the style option, eg
+        canvas.draw_circle(xy, style=style). Any additional options given along with
+        the style override the style's own options.
+
+        Styles are cached, so calling make_style() again with the same options returns
+        the same style. The cache is automatically invalidated whenever the canvas ppi,
+        default unit, size, or coordinate space changes, and styles made before such a
+        change are automatically reparsed when used.
+
+        Parameters:
+
+        - *options*: Keyword args dictionary of draw styling options.
+
+        Returns:
+
+        - A Style instance.
+        """
+        statekey = self._style_statekey()
+        if statekey != self._styles_statekey:
+            self._styles.clear()
+            self._styles_statekey = statekey
+
+        try:
+            key = tuple((k, tuple(v) if isinstance(v, list) else v)
+                        for k,v in sorted(options.items()))
+            hash(key)
+        except TypeError:
+            # unhashable options, cannot be cached
+            key = None
+        style = self._styles.get(key) if key is not None else None
+
+        if style is None:
+            style = Style(self._check_options(options), dict(options), statekey)
+            if key is not None:
+                self._styles.put(key, style)
+        return style
+
 
 
 
@@ -1730,6 +2452,7 @@ class Canvas:
 
     # Drawing
 
+    @_recordable
     def draw_circle(self, xy=None, bbox=None, flatratio=1, **options):
         """
         Draw a circle, normal or flattened. Either specified with xy and flatratio,
@@ -1747,10 +2470,10 @@ class Canvas:
         args = []
         
         if options["outlinecolor"]:
-            pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+            pen = _outline_pen(options)
             args.append(pen)
         if options["fillcolor"]:
-            brush = aggdraw.Brush(options["fillcolor"])
+            brush = _fill_brush(options)
             args.append(brush)
             
         if xy:
@@ -1780,6 +2503,7 @@ class Canvas:
         self.drawer.ellipse(bbox, *args)
         self.drawer.settransform(self.coordspace_transform)
 
+    @_recordable
     def draw_triangle(self, xy=None, bbox=None, flatratio=3.0/4.0, direction=0, **options):
         """
         Draw a triangle, equilateral or otherwise. Either specified with xy and flatratio,
@@ -1797,10 +2521,10 @@ class Canvas:
         args = []
         
         if options["outlinecolor"]:
-            pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+            pen = _outline_pen(options)
             args.append(pen)
         if options["fillcolor"]:
-            brush = aggdraw.Brush(options["fillcolor"])
+            brush = _fill_brush(options)
             args.append(brush)
             
         if xy:
@@ -1837,6 +2561,7 @@ class Canvas:
         coords = list(itertools.chain(*coords)) # flat
         self.drawer.polygon(coords, *args)
 
+    @_recordable
     def draw_pie(self, xy, startangle, endangle, **options):
         """
         Draw a piece of pie.
@@ -1862,10 +2587,10 @@ class Canvas:
         bbox = [x-fillsize, y-fillsize, x+fillsize, y+fillsize]
         args = []
         if options["outlinecolor"]:
-            pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+            pen = _outline_pen(options)
             args.append(pen)
         if options["fillcolor"]:
-            brush = aggdraw.Brush(options["fillcolor"])
+            brush = _fill_brush(options)
             args.append(brush)
 
         # aggdraw expects circle degrees that start to the right and goes counter-clockwise.
@@ -1881,6 +2606,7 @@ class Canvas:
         self.drawer.pieslice(bbox, endangle, startangle, *args) # note that we switch start and endangle
         self.drawer.settransform(self.coordspace_transform)
 
+    @_recordable
     def draw_box(self, xy=None, bbox=None, flatratio=1.0, **options):
         """
         Draw a square, equisized or rectangular. Either specified with xy and flatratio,
@@ -1897,10 +2623,10 @@ class Canvas:
         args = []
         
         if options["outlinecolor"]:
-            pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+            pen = _outline_pen(options)
             args.append(pen)
         if options["fillcolor"]:
-            brush = aggdraw.Brush(options["fillcolor"])
+            brush = _fill_brush(options)
             args.append(brush)
             
         if xy:
@@ -1921,44 +2647,200 @@ class Canvas:
         elif bbox: pass
         
         else: raise Exception("Either xy or bbox has to be specified")
-        
+
         self.drawer.rectangle(bbox, *args)
 
-    def draw_line(self, coords, smooth=False, volume=None, start="flat", end="flat", **options):
+    @_recordable
+    def draw_points(self, xys, shape="circle", flatratio=None, **options):
+        """
+        Draw many point symbols in a single batch. Options are only resolved once,
+        all coordinates are converted to pixels in one go, and pens and brushes are
+        reused for each distinct style, making this much faster than calling
+        draw_circle(), draw_box(), or draw_triangle() once for each point.
+
+        Parameters:
+
+        - *xys*: The point coordinates, either as a sequence of xy tuples, a flat sequence
+            of alternating x and y values, or a NumPy array of shape (n,2).
+        - *shape* (optional): The point symbol to draw, either 'circle' (default), 'box', or 'triangle'.
+        - *flatratio* (optional): The ratio of the symbol height to width. Defaults to the same as the
+            corresponding draw_circle(), draw_box(), or draw_triangle() method.
+        - *options* (optional): Keyword args dictionary of draw styling options. The fillsize, fillwidth,
+            fillheight, outlinewidth, fillcolor, and outlinecolor options can also be given as a sequence
+            with one value for each point.
+        """
+        if shape not in ("circle","box","triangle"):
+            raise Exception("Point shape must be 'circle', 'box', or 'triangle', not %s" % shape)
+        if flatratio is None:
+            flatratio = 3.0/4.0 if shape == "triangle" else 1.0
+
+        # pixel coordinates
+        pixels = self.coords2pixels(xys)
+        if _get_numpy(pixels) is not None:
+            pixels = pixels.ravel().tolist()
+        pxs,pys = pixels[0::2],pixels[1::2]
+        count = len(pxs)
+        if not count:
+            return
+
+        # separate out per-point options
+        perpoint = dict()
+        for key in ("fillsize","fillwidth","fillheight","outlinewidth"):
+            val = options.get(key)
+            if val is not None and not isinstance(val, (bytes,str)) and hasattr(val, "__len__"):
+                perpoint[key] = options.pop(key)
+        for key in ("fillcolor","outlinecolor"):
+            val = options.get(key)
+            if val is not None and not isinstance(val, (bytes,str)) and hasattr(val, "__len__") \
+               and len(val) == count and (_get_numpy(val) is not None and getattr(val, "ndim", 1) == 2
+                                          or not isinstance(val[0], (int,float))):
+                perpoint[key] = options.pop(key)
+        for key,vals in perpoint.items():
+            if len(vals) != count:
+                raise Exception("Per-point option %s must have one value for each of the %s points, not %s" % (key, count, len(vals)))
+
+        # resolve scalar options once
+        explicit = set(options) | set(perpoint)
+        options = self._check_options(options)
+        def parse_sizes(vals):
+            return units.parse_dists(vals,
+                                     ppi=self.ppi,
+                                     default_unit=self.default_unit,
+                                     canvassize=[self.width,self.height],
+                                     coordsize=[self.coordspace_width,self.coordspace_height])
+        if "fillsize" in perpoint:
+            sizes = parse_sizes(perpoint["fillsize"])
+        else:
+            sizes = itertools.repeat(options["fillsize"])
+        if "fillwidth" in perpoint:
+            widths = parse_sizes(perpoint["fillwidth"])
+        elif "fillwidth" in explicit or "fillsize" not in perpoint:
+            widths = itertools.repeat(options["fillwidth"])
+        else:
+            widths = [size * 2 for size in sizes]
+        if "fillheight" in perpoint:
+            heights = parse_sizes(perpoint["fillheight"])
+        elif "fillheight" in explicit or "fillsize" not in perpoint:
+            heights = itertools.repeat(options["fillheight"])
+        else:
+            heights = [size * 2 for size in sizes]
+        if "outlinewidth" in perpoint:
+            outlinewidths = parse_sizes(perpoint["outlinewidth"])
+        else:
+            outlinewidths = itertools.repeat(options["outlinewidth"])
+        def colors(key):
+            if key in perpoint:
+                vals = perpoint[key]
+                if _get_numpy(vals) is not None:
+                    vals = vals.tolist()
+                return (tuple(map(int,col)) if isinstance(col, (tuple,list)) else col
+                        for col in vals)
+            return itertools.repeat(options[key])
+        fillcolors = colors("fillcolor")
+        outlinecolors = colors("outlinecolor")
+
+        # reuse pens and brushes for each distinct style
+        pens = dict()
+        brushes = dict()
+        def drawargs(fillcolor, outlinecolor, outlinewidth):
+            args = []
+            if outlinecolor:
+                key = (outlinecolor, outlinewidth)
+                pen = pens.get(key)
+                if pen is None:
+                    pen = pens[key] = aggdraw.Pen(outlinecolor, outlinewidth)
+                args.append(pen)
+            if fillcolor:
+                brush = brushes.get(fillcolor)
+                if brush is None:
+                    brush = brushes[fillcolor] = aggdraw.Brush(fillcolor)
+                args.append(brush)
+            return args
+
+        anchor = options.get("anchor")
+        if anchor:
+            anchor = anchor.lower()
+        # triangles point towards increasing y coordinates, same as draw_triangle()
+        tipsign = 1 if self.coordspace_transform[4] >= 0 else -1
+
+        # draw directly in pixel space
+        self.drawer.settransform()
+        if shape == "circle":
+            # snap to whole pixels, same as draw_circle()
+            pxs = [_floor(x) for x in pxs]
+            pys = [_floor(y) for y in pys]
+            drawfunc = self.drawer.ellipse
+        elif shape == "box":
+            drawfunc = self.drawer.rectangle
+        else:
+            drawfunc = self.drawer.polygon
+        for x,y,width,height,fillcolor,outlinecolor,outlinewidth in zip(pxs, pys, widths, heights,
+                                                                         fillcolors, outlinecolors, outlinewidths):
+            if flatratio: height *= flatratio
+            if anchor:
+                x,y = _anchor_offset(x, y, anchor, (width,height))
+            halfwidth, halfheight = width / 2.0, height / 2.0
+            if shape == "triangle":
+                coords = [x-halfwidth, y-halfheight*tipsign,
+                          x+halfwidth, y-halfheight*tipsign,
+                          x, y+halfheight*tipsign]
+            else:
+                coords = [x-halfwidth, y-halfheight, x+halfwidth, y+halfheight]
+            drawfunc(coords, *drawargs(fillcolor, outlinecolor, outlinewidth))
+        self.drawer.settransform(self.coordspace_transform)
+
+    @_recordable
+    def draw_line(self, coords, smooth=False, volume=None, start="flat", end="flat", simplify=None, join="miter", **options):
         """
         Connect a series of coordinate points with one or more lines.
-        Outline does not work with this method.
 
         Parameters:
 
         - *coords*: A list of coordinates for the linesequence.
         - *smooth* (optional): If True, smooths the lines by drawing quadratic bezier curves between midpoints of each line segment. Default is False.
+        - *volume* (optional): The fillsize at each node of the line, for flow lines of varying thickness. Either a sequence with one
+            fillsize for each node, or a function that takes the progress along the line from 0 to 1 and the node's pixel xy,
+            and returns its fillsize. Default is None. 
+        - *start* (optional): The shape of the start of the line when it has a volume or outline, "flat" (default) or None
+            to leave it without outline. 
+        - *end* (optional): The shape of the end of the line when it has a volume or outline, "flat" (default), "arrow", or None
+            to leave it without outline. 
+        - *simplify* (optional): If "auto", removes line vertices that make less than half a pixel difference before drawing.
+            Can also be the maximum allowed difference in pixels. Ignored if volume is given as a sequence. Default is None. 
+        - *join* (optional): How the line sides are joined at each node when it has a volume or outline,
+            "miter" (default), "round", or "bevel". 
         - *options* (optional): Keyword args dictionary of draw styling options. 
         """
-        # NOTE: Outline does not work because uses paths instead of normal line method.
-        # TODO: Add volume param, containing a list of linewidths same length as line
-        # or as a function that calculates the width at each node
-        # Result is a flow line with varying thickness at each node
-        # Have to calculate left/right xy at each node, and use symbol curveto()
-        # Easy and really cool...DO IT!
         options = self._check_options(options)
-        
-        if not hasattr(coords[0], "__iter__"):
-            coords = _grouper(coords, 2)
-        else: coords = (point for point in coords)
 
-        # remove duplicate points
+        # remove vertices too small to see
+        if simplify and not (volume and hasattr(volume, "__iter__")):
+            if not hasattr(coords[0], "__iter__"):
+                coords = list(_grouper(coords, 2))
+            coords = geomhelper.simplify_line(coords, self._simplify_tolerance(simplify))
+        
+        # remove duplicate points, and the volume of each
+        if volume and hasattr(volume, "__iter__"):
+            volume = list(volume)
         def uniquecoords():
             prev = None
-            for point in coords:
+            for i,point in enumerate(coords):
                 if point == prev:
                     continue
-                yield point
+                yield i,point
                 prev = point
 
         # convert coords to pixels and temp disable transform bc all buffers etc have already been converted to pixels
-        coords = (self.coord2pixel(*xy) for xy in coords)
-        coords = list(uniquecoords())
+        pixels = self.coords2pixels(coords)
+        if _get_numpy(pixels) is not None:
+            pixels = pixels.ravel().tolist()
+        coords = zip(map(_floor, pixels[0::2]), map(_floor, pixels[1::2]))
+        unique = list(uniquecoords())
+        coords = [point for i,point in unique]
+        if volume and hasattr(volume, "__iter__"):
+            if len(volume) != len(pixels) // 2:
+                raise Exception("The volume sequence must have one fillsize for each node of the line, not %s for %s nodes" % (len(volume), len(pixels) // 2))
+            volume = [volume[i] for i,point in unique]
         if len(coords) <= 1:
             # all coords are the same in pixelspace, ie fall within a single pixel, ignore? 
             return
@@ -1967,6 +2849,7 @@ class Canvas:
 
         if volume or (options.get("outlinecolor") and options.get("outlinewidth")):
             # enables outline and varying line volume thickness
+            # ...by drawing the line as a single polygon around its left and right sides
 
             def convertvolume(val):
                 return units.parse_dist(val,
@@ -1977,290 +2860,69 @@ class Canvas:
 
             coords = list(coords)
 
+            # half the line width at each vertex
             if not volume:
                 fillsize = options["fillsize"] / 2.0 # no need to convert unit since fillsize has already been through that
-                getbuffer = lambda p,x,y: fillsize
+                widths = [fillsize] * len(coords)
 
             elif hasattr(volume, "__call__"):
-                def getbuffer(prog, x, y):
-                    return convertvolume(volume(prog, x, y)) / 2.0
+                progs = [i / float(len(coords)) for i in range(len(coords)-1)] + [1]
+                widths = [convertvolume(volume(prog, x, y)) / 2.0 for prog,(x,y) in zip(progs, coords)]
 
             elif hasattr(volume, "__iter__"):
-                _buffers = (buff for buff in volume)
-                def getbuffer(prog, x, y):
-                    return convertvolume(next(_buffers)) / 2.0
+                widths = [convertvolume(val) / 2.0 for val in volume]
 
             else:
-                raise Exception("The volume parameter must be a function or an iterable (of the same length as the line minus 1) that hold the fillsize for each node")
-
-            def threewise(iterable):
-                a,_ = itertools.tee(iterable)
-                b,c = itertools.tee(_)
-                next(b, None)
-                next(c, None)
-                next(c, None)
-                return zip(a,b,c)
-
-            def bufferedlinesegments():
-                if len(coords) == 2:
-                    (x1,y1),(x2,y2) = coords
-                    lastline = _Line(x1,y1,x2,y2)
-                    prog = 1
-                    buffersize = getbuffer(prog, x2, y2)
-                    leftline,rightline = lastline.getbuffersides(linebuffer=buffersize)
-                    yield leftline.tolist(), rightline.tolist()
-
-                else:
-                    #the first line
-                    (x1,y1),(x2,y2),(x3,y3) = coords[:3]
-                    line1 = _Line(x1,y1,x2,y2)
-                    line2 = _Line(x2,y2,x3,y3)
-                    prog = 0
-                    buffersize = getbuffer(prog, x1, y1)
-                    leftline,rightline = line1.getbuffersides(linebuffer=buffersize)
-                    leftlinestart = leftline.tolist()[0]
-                    rightlinestart = rightline.tolist()[0]
-                    prevleft = leftlinestart
-                    prevright = rightlinestart
-                    #then all mid areas
-                    #sharp join style
-                    for i,(start,mid,end) in enumerate(threewise(coords)):
-                        i += 1
-                        (x1,y1),(x2,y2),(x3,y3) = start,mid,end
-                        line1 = _Line(x1,y1,x2,y2)
-                        line2 = _Line(x2,y2,x3,y3)
-                        prog = i / float(len(coords))
-                        buffersize = getbuffer(prog, x2, y2)
-                        
-                        line1_left,line1_right = line1.getbuffersides(linebuffer=buffersize)
-                        line2_left,line2_right = line2.getbuffersides(linebuffer=buffersize)
-                        midleft = line1_left.intersect(line2_left, infinite=True)
-                        midright = line1_right.intersect(line2_right, infinite=True)
-                        if not midleft:
-                            # line1 and line2 do not intersect because they are on the same line
-                            # their intersection thus becomes their shared start/end point
-                            midleft = line1_left.end
-                        if not midright:
-                            # line1 and line2 do not intersect because they are on the same line
-                            # their intersection thus becomes their shared start/end point
-                            midright = line1_right.end
-
-                        # yield each line segment one at a time, so they are drawn in correct order if overlap
-                        leftside = [prevleft,midleft]
-                        rightside = [prevright,midright]
-                        yield leftside, rightside
-
-                        # remember coords
-                        prevleft = midleft
-                        prevright = midright
-                        
-                    #finally add last line coords
-                    (x1,y1),(x2,y2) = coords[-2:]
-                    lastline = _Line(x1,y1,x2,y2)
-                    prog = 1
-                    buffersize = getbuffer(prog, x2, y2)
-                    leftline,rightline = lastline.getbuffersides(linebuffer=buffersize)
-                    leftlineend = leftline.tolist()[1]
-                    rightlineend = rightline.tolist()[1]
-
-                    leftside = [prevleft,leftlineend]
-                    rightside = [prevright,rightlineend]
-                    yield leftside, rightside
+                raise Exception("The volume parameter must be a function or an iterable (of the same length as the line) that hold the fillsize for each node")
 
+            left,right = geomhelper.stroke_line(coords, widths, join=join)
             if smooth and len(coords) > 2:
-                # Note: simple 2point line is skipped here and processed as a non-smooth line
-                
-                pen,brush = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"]), aggdraw.Brush(options["fillcolor"])
-
-                segments = bufferedlinesegments()
-                def midpoint(line):
-                    (startx,starty),(endx,endy) = line
-                    midx,midy = (endx + startx) / 2.0, (endy + starty) / 2.0
-                    return midx,midy
-
-                # draw straight line to first line midpoint
-                left,right = next(bufferedlinesegments()) # without iterating segments
-                
-                firstleft,firstright = left,right
-                firstline = coords[:2]
-                
-                # first fill
-                midleft = midpoint(left)
-                midright = midpoint(right)
-                if options["fillcolor"]:
-                    linepolygon = [left[0], midleft, midright, right[0]]
-                    pathstring = " M%s,%s" %linepolygon[0]
-                    for p in linepolygon[1:]:
-                        pathstring += " L%s,%s"%p
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, None, brush)
-
-                # then outline
-                # left
-                pathstring = " M%s,%s" %left[0]
-                pathstring += " L%s,%s" %midleft
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-                # right
-                pathstring = " M%s,%s" %right[0]
-                pathstring += " L%s,%s" %midright
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-
-                left1,right1 = left,right
-                midleft1,midright1 = midleft,midright
-                
-                # for each line
-                for left2,right2 in segments:
-                    # curve from midpoint of first to midpoint of second
-                    midleft2 = midpoint(left2)
-                    midright2 = midpoint(right2)
-
-                    # first fill
-                    if options["fillcolor"]:
-                        pathstring = " M%s,%s" %midleft1 + " Q%s,%s"%left2[0] + ",%s,%s"%midleft2
-                        pathstring += " L%s,%s" %midright2 + " Q%s,%s"%right2[0] + ",%s,%s"%midright1
-                        symbol = aggdraw.Symbol(pathstring)
-                        self.drawer.symbol((0,0), symbol, None, brush)
-
-                    # then outline
-                    # left
-                    pathstring = " M%s,%s"%midleft1
-                    pathstring += " Q%s,%s"%left2[0] + ",%s,%s"%midleft2
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, pen, None)
-                    # right
-                    pathstring = " M%s,%s"%midright1
-                    pathstring += " Q%s,%s"%right2[0] + ",%s,%s"%midright2
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, pen, None)
-
-                    left1,right1 = left2,right2
-                    midleft1,midright1 = midleft2,midright2
-                                        
-                # draw straight line to endpoint of last line
-                # first fill
-                if options["fillcolor"]:
-                    linepolygon = [midleft2, left2[1], right2[1], midright2]
-                    pathstring = " M%s,%s" %linepolygon[0]
-                    for p in linepolygon[1:]:
-                        pathstring += " L%s,%s"%p
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, None, brush)
-
-                # then outline
-                # left
-                pathstring = " M%s,%s" %midleft2
-                pathstring += " L%s,%s" %left2[1]
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-                # right
-                pathstring = " M%s,%s" %midright2
-                pathstring += " L%s,%s" %right2[1]
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-
-                lastline = coords[-2:]
-                lastleft = left2
-                lastright = right2
-
-            else:
-                # not smooth
-                pen,brush = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"]), aggdraw.Brush(options["fillcolor"])
-
-                firstleft,firstright = next(bufferedlinesegments()) # separate iter
-                firstline = coords[:2]
-        
-                for left,right in bufferedlinesegments():
-                    # first fill
-                    if options["fillcolor"]:
-                        linepolygon = list(left) + list(reversed(right))
-                        pathstring = " M%s,%s" %linepolygon[0]
-                        for p in linepolygon[1:]:
-                            pathstring += " L%s,%s"%p
-                        symbol = aggdraw.Symbol(pathstring)
-                        self.drawer.symbol((0,0), symbol, None, brush)
-
-                    # then outline
-                    # left
-                    pathstring = " M%s,%s"%left[0] + " L%s,%s"%left[1]
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, pen, None)
-                    # right
-                    pathstring = " M%s,%s"%right[0] + " L%s,%s"%right[1]
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, pen)
-
-                lastline = coords[-2:]
-                lastleft = left
-                lastright = right
-
-            # optional startpoint
-            if start:
-                if start == "flat":
-                    def start(line,left,right):
-                        return left,right
-                        
-                startpolygon = start(firstline, firstleft[0], firstright[0]) # takes last two poins ie last line and left and right endpoints as input arg
-
-                # first fill
-                if options["fillcolor"]:
-                    pathstring = " M%s,%s" %startpolygon[0]
-                    for p in startpolygon[1:]:
-                        pathstring += " L%s,%s"%p
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, None, brush)
-
-                # then outline
-                # left
-                pathstring = " M%s,%s"%startpolygon[0]
-                for p in startpolygon[1:]:
-                    pathstring += " L%s,%s"%p
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-                # right
-                pathstring = " M%s,%s"%startpolygon[-1]
-                for p in reversed(startpolygon[:-1]):
-                    pathstring += " L%s,%s"%p
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen)
-
-            # optional endpoint
-            if end:
-                if end == "arrow":
-                    def end(line,left,right):
-                        helpline = _Line(line[0][0],line[0][1],line[1][0],line[1][1])
-                        width = abs(math.hypot(left[0]-right[0], left[1]-right[1]))
-                        tip = helpline.walkdistance(-width)
-                        leftbuf,rightbuf = helpline.getbuffersides(width)
-                        return left,leftbuf.end,tip,rightbuf.end,right
-                elif end == "flat":
-                    def end(line,left,right):
-                        return left,right
-                        
-                endpolygon = end(lastline, lastleft[1], lastright[1]) # takes last two poins ie last line and left and right endpoints as input arg
-
-                # first fill
-                if options["fillcolor"]:
-                    pathstring = " M%s,%s" %endpolygon[0]
-                    for p in endpolygon[1:]:
-                        pathstring += " L%s,%s"%p
-                    symbol = aggdraw.Symbol(pathstring)
-                    self.drawer.symbol((0,0), symbol, None, brush)
-
-                # then outline
-                # left
-                pathstring = " M%s,%s"%endpolygon[0]
-                for p in endpolygon[1:]:
-                    pathstring += " L%s,%s"%p
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen, None)
-                # right
-                pathstring = " M%s,%s"%endpolygon[-1]
-                for p in reversed(endpolygon[:-1]):
-                    pathstring += " L%s,%s"%p
-                symbol = aggdraw.Symbol(pathstring)
-                self.drawer.symbol((0,0), symbol, pen)
+                # Note: simple 2point line is processed as a non-smooth line
+                left = geomhelper.smooth_line(left)
+                right = geomhelper.smooth_line(right)
+
+            # start and end caps go from the left to the right side
+            if start == "flat":
+                def start(line,left,right):
+                    return left,right
+            if end == "arrow":
+                def end(line,left,right):
+                    helpline = _Line(line[0][0],line[0][1],line[1][0],line[1][1])
+                    width = abs(math.hypot(left[0]-right[0], left[1]-right[1]))
+                    tip = helpline.walkdistance(-width)
+                    leftbuf,rightbuf = helpline.getbuffersides(width)
+                    return left,leftbuf.end,tip,rightbuf.end,right
+            elif end == "flat":
+                def end(line,left,right):
+                    return left,right
+            startpolygon = start(coords[:2], left[0], right[0]) if start else None
+            endpolygon = end(coords[-2:], left[-1], right[-1]) if end else None
+            startmid = list(startpolygon[-2:0:-1]) if start else []
+            endmid = list(endpolygon[1:-1]) if end else []
+
+            # fill
+            ring = left + endmid + right[::-1] + startmid
+            if options["fillcolor"]:
+                brush = aggdraw.Brush(options["fillcolor"])
+                self.drawer.polygon([xory for xy in ring for xory in xy], brush)
+
+            # outline, leaving out any missing caps
+            if options["outlinecolor"] and options["outlinewidth"]:
+                pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+                if start and end:
+                    parts = [ring + ring[:1]]
+                elif end:
+                    parts = [ring]
+                elif start:
+                    parts = [right[::-1] + startmid + left]
+                else:
+                    parts = [left, right]
+                path = aggdraw.Path()
+                for part in parts:
+                    path.moveto(*part[0])
+                    for xy in part[1:]:
+                        path.lineto(*xy)
+                self.drawer.path(path, pen)
 
         else:
             # no volume and no outline, simple and fast
@@ -2269,7 +2931,7 @@ class Canvas:
             # get drawing tools from options
             args = []
             if options["fillcolor"]:
-                pen = aggdraw.Pen(options["fillcolor"], options["fillsize"])
+                pen = _line_pen(options)
                 args.append(pen)
 
             if smooth:
@@ -2346,6 +3008,10 @@ class Canvas:
         - *smooth* (optional): If True, smooths the lines by drawing quadratic bezier curves between midpoints of each line segment. Default is False.
         - *options* (optional): Keyword args dictionary of draw styling options. 
         """
+        if self._adjustments is not None:
+            self._apply_adjustments()
+        if self._textqueue:
+            self._flush_text()
         # This is a draft of the new much simpler and correct line drawing.
         # Draws using the outline options, fill options are ignored.
         # Line outlines must be simulated by drawing a thicker line underneath.
@@ -2357,11 +3023,12 @@ class Canvas:
         else: coords = (point for point in coords)
 
         if options['outlinecolor'] and options['outlinewidth']:
-            pen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+            pen = _outline_pen(options)
             flatcoords = [xory for p in coords for xory in p]
             self.drawer.line(flatcoords, pen)
 
-    def draw_polygon(self, coords, holes=[], **options):
+    @_recordable
+    def draw_polygon(self, coords, holes=[], cull=True, clip=False, simplify=None, **options):
         """
         Draw polygon and holes with color fill.
         Holes must be counterclockwise.
@@ -2370,9 +3037,14 @@ class Canvas:
         
         - *coords*: A list of coordinates for the polygon exterior.
         - *holes* (optional): A list of one or more polygon hole coordinates, one for each hole. Defaults to no holes.
+        - *cull* (optional): If True (default), skips drawing the polygon if it lies entirely outside the current view.
+        - *clip* (optional): If True, clips a polygon that crosses the edge of the current view to the view. Defaults to False.
+        - *simplify* (optional): If "auto", removes polygon vertices that make less than half a pixel difference before drawing.
+            Can also be the maximum allowed difference in pixels. Holes that become too small are dropped. Default is None. 
         - *options* (optional): Keyword args dictionary of draw styling options.
                                 Fillcolor can also be a function taking a width and height, returning a canvas of same size.
                                 Fillmask is an optional function taking a width and height, returning a canvas of same size that defines which areas will be filled.
+                                Both can also be a Pattern, eg Pattern.hatch("diagonal"), that is repeated across the canvas.
         """
         options = self._check_options(options)
         
@@ -2382,6 +3054,33 @@ class Canvas:
             coords = list(_grouper(coords, 2))
         else: coords = list(coords)
 
+        # skip or clip polygons outside the view
+        if cull or clip:
+            viewbbox = self._view_bbox(self._cull_margin(options))
+            bbox = geomhelper.geom_bbox({"type":"Polygon", "coordinates":[coords]})
+            if cull and not geomhelper.bbox_intersects(bbox, viewbbox):
+                self.cullstats["culled"] += 1
+                return
+            if clip and not geomhelper.bbox_within(bbox, viewbbox):
+                coords = geomhelper.clip_ring(coords, viewbbox)
+                if not coords:
+                    self.cullstats["culled"] += 1
+                    return
+                holes = [hole if hasattr(hole[0], "__iter__") else list(_grouper(hole, 2))
+                         for hole in holes]
+                holes = [geomhelper.clip_ring(hole, viewbbox) for hole in holes]
+                holes = [hole for hole in holes if hole]
+                self.cullstats["clipped"] += 1
+            self.cullstats["drawn"] += 1
+
+        # remove vertices too small to see
+        if simplify:
+            poly = [coords] + [hole if hasattr(hole[0], "__iter__") else list(_grouper(hole, 2))
+                               for hole in holes]
+            poly = geomhelper.simplify_geom({"type":"Polygon", "coordinates":poly},
+                                            self._simplify_tolerance(simplify))["coordinates"]
+            coords,holes = poly[0],poly[1:]
+
         def traverse_ring(coords):
             # begin
             coords = (point for point in coords)
@@ -2407,53 +3106,25 @@ class Canvas:
         # fillmask or picture
         if "fillmask" in options or hasattr(options["fillcolor"], "__call__"): 
             xs,ys = zip(*coords)
-            xmin,ymin,xmax,ymax = min(xs),min(ys),max(xs),max(ys)
-            w,h = xmax-xmin, ymax-ymin
-            pw,ph = self.parse_relative_dist(str(w)+"x"), self.parse_relative_dist(str(h)+"y")
-            pw,ph = int(pw),int(ph)
-
-            # use insides of the polygon as mask
-            mask = Canvas(width=pw, height=ph, background="black", mode="RGB")
-            mask.custom_space(*[xmin,ymin,xmax,ymax])
-            mask.drawer.path(path, aggdraw.Brush("white"))
-            mask.drawer.flush()
-            mask = mask.img.convert("L")
-
-            # add additional mask from user
-            if "fillmask" in options:
-                maskfunc = options["fillmask"] 
-                custommask = maskfunc(pw,ph)
-                custommask.drawer.flush()
-                custommask = custommask.img.convert("L")
-                mask = PIL.ImageMath.eval("a & b", a=mask, b=custommask).convert("L")
-
-            # paste color or image
-            final = PIL.Image.new("RGBA", (pw,ph))
-            fill = options["fillcolor"]
-            
-            # picture/texture fill
-            if hasattr(fill, "__call__"):
-                fill = fill(pw,ph).img
-            final.paste(fill,
-                        mask=mask)
-            self.paste(final, bbox=[xmin,ymin,xmax,ymax])
+            self._fill_textured(path, [min(xs),min(ys),max(xs),max(ys)], options)
 
             # draw outline on top
             if options["outlinecolor"]:
-                outlinepen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+                outlinepen = _outline_pen(options)
                 self.drawer.path(path, None, outlinepen)
 
         else:
             # normal fast drawing
             args = []
             if options["fillcolor"]:
-                fillbrush = aggdraw.Brush(options["fillcolor"])
+                fillbrush = _fill_brush(options)
                 args.append(fillbrush)
             if options["outlinecolor"]:
-                outlinepen = aggdraw.Pen(options["outlinecolor"], options["outlinewidth"])
+                outlinepen = _outline_pen(options)
                 args.append(outlinepen)
             self.drawer.path(path, *args)
 
+    @_recordable
     def draw_text(self, text, xy=None, bbox=None, rotate=None, **options):
         """
         Draws basic text.
@@ -2515,7 +3186,7 @@ class Canvas:
                 # horizontally justify the text relative to the bbox edges
                 fontwidth, fontheight = font.getsize(textline)
                 if horizjustify == "center":
-                    x = int(xleft + xwidth/2.0 - fontwidth/2.0)
+                    x = _floor(xleft + xwidth/2.0 - fontwidth/2.0)
                 elif horizjustify == "right":
                     x = xleft + xwidth - fontwidth
                 elif horizjustify == "left":
@@ -2541,7 +3212,7 @@ class Canvas:
             # get font and dimensions
             textlines = text.split("\n")
             fontsize = int(round(options["textsize"]))
-            font = PIL.ImageFont.truetype(fontlocation, size=fontsize) #, opacity=options["textopacity"])
+            font = fonthelper.load_font(fontlocation, size=fontsize) #, opacity=options["textopacity"])
             widths,heights = zip(*[font.getsize(line) for line in textlines])
             maxwidth, maxheight = max(widths),sum(heights)
             
@@ -2550,19 +3221,19 @@ class Canvas:
                 # update to post-rotate anchor
                 itemwidth,itemheight = size
                 if anchor == "center":
-                    x = int(x - itemwidth/2.0)
-                    y = int(y - itemheight/2.0)
+                    x = _floor(x - itemwidth/2.0)
+                    y = _floor(y - itemheight/2.0)
                 else:
-                    x = int(x - itemwidth/2.0)
-                    y = int(y - itemheight/2.0)
+                    x = _floor(x - itemwidth/2.0)
+                    y = _floor(y - itemheight/2.0)
                     if "n" in anchor:
-                        y = int(y + itemheight/2.0)
+                        y = _floor(y + itemheight/2.0)
                     elif "s" in anchor:
-                        y = int(y - itemheight/2.0)
+                        y = _floor(y - itemheight/2.0)
                     if "e" in anchor:
-                        x = int(x - itemwidth/2.0)
+                        x = _floor(x - itemwidth/2.0)
                     elif "w" in anchor:
-                        x = int(x + itemwidth/2.0)
+                        x = _floor(x + itemwidth/2.0)
                 return x,y
             
             textanchor = options["anchor"].lower()
@@ -2615,19 +3286,39 @@ class Canvas:
 
                 self.draw_box(bbox=bbox, **bboxoptions)
 
+            # reuse previously rendered labels
+            justify = options["justify"].lower()
             if rotate:
-                # write and rotate separate img
-                txt_img = PIL.Image.new('RGBA', (maxwidth,maxheight))
-                draw_textlines(txt_img, textlines, (0,0), (maxwidth,maxheight), **options)
-                txt_img = txt_img.rotate(rotate, PIL.Image.BILINEAR, expand=1)
+                key = (text, fontlocation, fontsize, justify, options["textcolor"], rotate)
+                txt_img = LABELCACHE.get(key)
+                if txt_img is None:
+                    # write and rotate separate img
+                    txt_img = PIL.Image.new('RGBA', (maxwidth,maxheight))
+                    draw_textlines(txt_img, textlines, (0,0), (maxwidth,maxheight), **options)
+                    txt_img = txt_img.rotate(rotate, PIL.Image.BILINEAR, expand=1)
+                    LABELCACHE.put(key, txt_img, nbytes=txt_img.size[0]*txt_img.size[1]*4)
                 pastex,pastey = anchor_offset(xorig, yorig, textanchor, txt_img.size)
                 # paste into main
-                self.drawer.flush()
-                self.img.paste(txt_img, (pastex,pastey), txt_img)
+                def render(img):
+                    img.paste(txt_img, (pastex,pastey), txt_img)
+
+            elif self.img.mode in ("RGB","RGBA","L"):
+                # the text coverage mask is the same for any color, and pasting the color
+                # through it gives the exact same result as writing the text directly
+                margin = int(math.ceil(fontsize * LABELMARGIN))
+                key = (text, fontlocation, fontsize, justify, None, None)
+                mask = LABELCACHE.get(key)
+                if mask is None:
+                    size = (maxwidth + margin*2, maxheight + margin*2)
+                    mask = PIL.Image.new('L', size, 0)
+                    draw_textlines(mask, textlines, (margin,margin), (maxwidth,maxheight), **dict(options, textcolor=255))
+                    LABELCACHE.put(key, mask, nbytes=size[0]*size[1])
+                def render(img):
+                    img.paste(options["textcolor"], (x-margin, y-margin), mask)
 
             else:
-                self.drawer.flush()
-                draw_textlines(self.img, textlines, (x,y), (maxwidth,maxheight), **options)
+                def render(img):
+                    draw_textlines(img, textlines, (x,y), (maxwidth,maxheight), **options)
 
         elif bbox:
             # dynamically decides optimal font size and wrap length
@@ -2690,94 +3381,169 @@ class Canvas:
             #### process text options
             fontlocation = fonthelper.get_fontpath(options["font"])
 
-            #### incrementally cut size in half or double it until within 20 percent of desired height
-            infiloop = False
-            prevsize = None
-            cursize = options["textsize"]
-            nextsize = None
-            while True:                
-                # calculate size metrics for current
-                font = PIL.ImageFont.truetype(fontlocation, size=cursize) #, opacity=options["textopacity"])
-                fontwidth, fontheight = font.getsize(text)
-                widthratio = fontwidth / float(boxwidth)
-                wraplength = int( len(text) / widthratio )
-                if wraplength < 1:
-                    # minimum wrap length is wrapping a text at every 1 char
-                    # ...any lower than that means font size is too big to be
-                    # ...wrapped, so halve the size and continue.
-                    ### print("size too big to be tested, halve it!")
-                    nextsize = int(round(cursize/2.0))
-                    prevsize = cursize
-                    cursize = nextsize
-                    continue
-                textlines = textwrap.wrap(text, width=wraplength)
-                wrapped_fontheight = fontheight * len(textlines) # + pady * len(textlines)
-                wrapped_fontheight_ratio = wrapped_fontheight / float(boxheight)
+            #### find the biggest font size where the wrapped text fits inside the box
+            font,textlines = _fit_textsize(fontlocation, text, boxwidth, boxheight)
 
-                # exit if size is within the box and almost fills it
-                if 0.8 <= wrapped_fontheight_ratio <= 1:
-                    break
+            def render(img):
+                draw_textlines(img, textlines, (xmin,ymin), (boxwidth,boxheight), **options)
 
-                # break out of infinite loop between two almost same sizes
-                if infiloop:
-                    ### print("infinite loop, break!")
-                    break
+        else:
+            return
 
-                # check if too big or small
-                toobig = False
-                toosmall = False
-                if wrapped_fontheight_ratio < 1:
-                    toosmall = True
-                else:
-                    toobig = True
+        if self.defer_text:
+            # drawn together with any following text, before the next other drawing
+            self._textqueue.append(render)
+        else:
+            self.drawer.flush()
+            render(self.img)
+            # update changes to the aggdrawer, and remember to reapply transform
+            self.update_drawer_img()
 
-                # mark as infinite loop once increments get smaller than 1
-                if prevsize and cursize-prevsize in (-1,0,1):
-                    infiloop = True
-                    # make sure to choose the smaller of the two repeating sizes, so fits inside box
-                    if toobig:
-                        nextsize = cursize-1
+    def place_labels(self, items, candidates=labelhelper.CANDIDATES, priority=None, gap="0.5%min", cellsize=None, **options):
+        """
+        Draws many point labels while making sure none of them overlap. Labels are placed
+        one at a time in order of priority, each at the first of its candidate positions
+        around its point that does not overlap any label placed before it and is inside
+        the canvas. Labels that do not fit at any candidate position are dropped. 
 
-                # or if prev change went too far, try in between prev and cur size
-                elif prevsize and ((toosmall and prevsize > cursize) or (toobig and prevsize < cursize)):
-                    ### print("too far, flip!")
-                    nextsize = int(round((prevsize + cursize) / 2.0))
+        Placed labels are kept in a grid index, so that each label only has to be tested
+        against the labels near it. 
 
-                # otherwise double or halve size based on fit
-                else:
-                    if toobig:
-                        nextsize = int(round(cursize / 2.0))
-                        ### print("too big!")
-                    elif toosmall:
-                        nextsize = cursize * 2
-                        ### print("too small!")
+        Parameters:
 
-                # update vars for next iteration
-                ### print(prevsize, cursize, nextsize)
-                prevsize = cursize
-                cursize = nextsize
+        - *items*: A sequence of (text, xy) pairs, where xy is the point to label. 
+            Can also be (text, xy, options) triples, where options is a dictionary of
+            text styling options for that label that override the shared options. 
+        - *candidates* (optional): The positions of each label relative to its point to try,
+            in order of preference. Can be any compass direction n,ne,e,se,s,sw,w,nw, or center.
+            Defaults to labelhelper.CANDIDATES. 
+        - *priority* (optional): A function that takes each item and returns its priority,
+            where items with higher priority are placed first. Defaults to placing items
+            in the order they are given. 
+        - *gap* (optional): The distance between each point and its label. Defaults to "0.5%min". 
+        - *cellsize* (optional): The pixel size of each cell in the grid index. Defaults to twice the label height. 
+        - *options* (optional): Keyword args dictionary of text styling options shared by all labels,
+            same as for draw_text(). 
 
-            self.drawer.flush()
-            draw_textlines(self.img, textlines, (xmin,ymin), (boxwidth,boxheight), **options)
+        Returns:
 
-        # update changes to the aggdrawer, and remember to reapply transform
-        self.drawer = aggdraw.Draw(self.img)
-        self.drawer.settransform(self.coordspace_transform)
+        - A dictionary with the number of labels "placed" and "dropped", and a list of the
+            "positions" chosen for each item in the same order as the items, or None if dropped. 
+        """
+        items = list(items)
+        if priority is None:
+            order = range(len(items))
+        else:
+            order = sorted(range(len(items)), key=lambda i: priority(items[i]), reverse=True)
+        gap = self.parse_relative_dist(gap)
+        width,height = self.width,self.height
 
-    def draw_geojson(self, geojobj, **options):
+        # resolve font sizes the same way as draw_text()
+        fonts = dict()
+        def getfont(itemoptions):
+            key = (itemoptions.get("font"), itemoptions.get("textsize"), itemoptions.get("textsize_is_internal"))
+            font = fonts.get(key)
+            if font is None:
+                resolved = self._check_text_options(itemoptions)
+                textsize = resolved["textsize"]
+                if not resolved.get("textsize_is_internal") and self.ppi != 97:
+                    textsize *= self.ppi / 97.0
+                fontsize = int(round(textsize))
+                fontlocation = fonthelper.get_fontpath(resolved["font"])
+                font = fonts[key] = (fonthelper.load_font(fontlocation, size=fontsize), fontsize)
+            return font
+
+        factors = [(candidate,) + labelhelper.candidate_factors(candidate, gap) for candidate in candidates]
+        index = None
+        positions = [None] * len(items)
+        placed = []
+        for i in order:
+            item = items[i]
+            if len(item) == 3:
+                text,xy,itemoptions = item
+                itemoptions = dict(options, **itemoptions)
+            else:
+                text,xy = item
+                itemoptions = options
+            if not isinstance(text, str):
+                text = str(text)
+            if not text:
+                continue
+            font,fontsize = getfont(itemoptions)
+            sizes = [fonthelper.get_textsize(font, line) for line in text.split("\n")]
+            labelwidth = max(size[0] for size in sizes)
+            labelheight = sum(size[1] for size in sizes)
+            if index is None:
+                index = labelhelper.GridIndex(cellsize or max(labelheight * 2, 8))
+
+            x,y = self.coord2pixel(*xy)
+            for candidate,dx,dy,fx,fy in factors:
+                xmin = x + dx - labelwidth * fx
+                ymin = y + dy - labelheight * fy
+                box = (xmin, ymin, xmin + labelwidth, ymin + labelheight)
+                if xmin < 0 or ymin < 0 or box[2] > width or box[3] > height:
+                    continue
+                if not index.intersects(box):
+                    index.insert(box)
+                    positions[i] = candidate
+                    placed.append((text, xy, candidate, fontsize, itemoptions))
+                    break
+
+        # draw the placed labels
+        for text,xy,candidate,fontsize,itemoptions in placed:
+            dx,dy = labelhelper.candidate_offset(candidate, gap)
+            labeloptions = dict(itemoptions)
+            labeloptions.update(textsize=fontsize, textsize_is_internal=True,
+                                anchor=labelhelper.ANCHORS[candidate],
+                                xoffset="%spx" % dx, yoffset="%spx" % dy)
+            self.draw_text(text, xy=xy, **labeloptions)
+
+        return {"placed": len(placed),
+                "dropped": len(items) - len(placed),
+                "positions": positions}
+
+    def draw_geojson(self, geojobj, cull=True, clip=False, simplify=None, **options):
         """
         Draws a shape based on the GeoJSON format. 
 
+        Shapes that lie entirely outside the current view are skipped before they are transformed and
+        drawn, using the GeoJSON bbox member if it has one. The number of drawn, culled, and clipped
+        shapes are counted in the canvas cullstats dictionary.
+
         Parameters: 
 
         - *geojobj*: Takes a GeoJSON dictionary or object that has the \_\_geo_interface__ attribute. Must be a geometry type, or a feature type with a geometry attribute. 
+        - *cull* (optional): If True (default), skips drawing shapes that lie entirely outside the current view. 
+        - *clip* (optional): If True, clips shapes that cross the edge of the current view to the view. Defaults to False.
+        - *simplify* (optional): If "auto", removes line and polygon vertices that make less than half a pixel difference
+            before drawing. Can also be the maximum allowed difference in pixels. Default is None. 
         - *options*: Keyword args dictionary of draw styling options.
         """
         if isinstance(geojobj, dict): geojson = geojobj
         else: geojson = geojobj.__geo_interface__
 
-        if geojson["type"] == "Feature":
-            geojson = geojson["geometry"]
+        if self._recorder is not None and not self._recording_depth:
+            # the shapes are recorded one by one, and are culled and simplified
+            # only when replayed, to fit the canvas they are replayed onto
+            if geojson["type"] == "Feature":
+                geojson = geojson["geometry"]
+            lineoptions = dict(simplify=simplify)
+            polyoptions = dict(cull=cull, clip=clip, simplify=simplify)
+        else:
+            if cull or clip:
+                if "style" in options:
+                    margin = self._cull_margin(self._check_options(options))
+                else:
+                    margin = self._cull_margin(self._check_size_options(options))
+                geojson = self._cull_geojson(geojson, self._view_bbox(margin), cull, clip)
+                if geojson is None:
+                    return
+            elif geojson["type"] == "Feature":
+                geojson = geojson["geometry"]
+            if simplify:
+                geojson = geomhelper.simplify_geom(geojson, self._simplify_tolerance(simplify))
+            lineoptions = dict()
+            polyoptions = dict(cull=False)
             
         if "shape" in options:
             draw_point = getattr(self, "draw_%s" % options["shape"])
@@ -2792,28 +3558,294 @@ class Canvas:
             for point in coords:
                 draw_point(xy=point, **options)
         elif geotype == "LineString":
-            self.draw_line(coords=coords, **options)
+            self.draw_line(coords=coords, **dict(options, **lineoptions))
         elif geotype == "MultiLineString":
             for line in coords:
-                self.draw_line(coords=line, **options)
+                self.draw_line(coords=line, **dict(options, **lineoptions))
         elif geotype == "Polygon":
             exterior = coords[0]
             interiors = []
             if len(coords) > 1:
                 interiors.extend(coords[1:])
-            self.draw_polygon(exterior, holes=interiors, **options)
+            self.draw_polygon(exterior, holes=interiors, **dict(options, **polyoptions))
         elif geotype == "MultiPolygon":
             for poly in coords:
                 exterior = poly[0]
                 interiors = []
                 if len(poly) > 1:
                     interiors.extend(poly[1:])
-                self.draw_polygon(exterior, holes=interiors, **options)
+                self.draw_polygon(exterior, holes=interiors, **dict(options, **polyoptions))
+
+    def draw_geojson_collection(self, features, style=None, cull=True, clip=False, simplify=None, **options):
+        """
+        Draws many GeoJSON features at once, much faster than calling draw_geojson() for each one.
+        Features are grouped by their style and geometry type, and each group is drawn with a single
+        combined path, so options only have to be parsed once per style.
+
+        Polygons are drawn first, then lines, then points, each in the order their style first
+        appeared. Since each group is drawn in one go, semi-transparent features of the same group
+        do not blend with each other, and outlines of the same group are not covered by later fills.
+        Features with picture fills or fillmasks are drawn one at a time with draw_geojson().
+
+        Parameters: 
+
+        - *features*: Any iterable of GeoJSON dictionaries or objects with the __geo_interface__ attribute,
+            either geometry or feature types. Can also be a FeatureCollection.
+        - *style* (optional): The draw styling options to use for all features, either as a dictionary or a Style
+            made with make_style(). Can also be a function that takes each feature and returns its styling options,
+            or None to skip that feature. 
+        - *cull* (optional): If True (default), skips features that lie entirely outside the current view,
+            same as draw_geojson(). 
+        - *clip* (optional): If True, clips features that cross the edge of the current view to the view. Defaults to False.
+        - *simplify* (optional): Simplifies lines and polygons before drawing, same as draw_geojson(). Default is None. 
+        - *options* (optional): Keyword args dictionary of draw styling options shared by all features,
+            overridden by the options from the style parameter.
+
+        Returns:
+
+        - A list of one dictionary for each drawn group, with the group's style and geometry type ('polygon', 'line', or 'point'),
+            the number of features and vertices, and the time in seconds spent collecting and drawing the group.
+        """
+        if self._adjustments is not None:
+            self._apply_adjustments()
+        if self._textqueue:
+            self._flush_text()
+        if isinstance(features, dict) and features.get("type") == "FeatureCollection":
+            features = features["features"]
+        elif hasattr(features, "__geo_interface__"):
+            geoj = features.__geo_interface__
+            if geoj.get("type") == "FeatureCollection":
+                features = geoj["features"]
+
+        stylefunc = style if hasattr(style, "__call__") else None
+        def getstyle(featurestyle):
+            # make_style() returns the same style object for the same options
+            if isinstance(featurestyle, Style):
+                if not options:
+                    return featurestyle
+                featurestyle = dict(featurestyle.rawoptions,
+                                    fillcolor=featurestyle["fillcolor"],
+                                    outlinecolor=featurestyle["outlinecolor"])
+            merged = dict(options)
+            merged.update(featurestyle or {})
+            return self.make_style(**merged)
+        if not stylefunc:
+            fixedstyle = getstyle(style)
+
+        recorder = self._recorder
+        if recorder is not None and not self._recording_depth:
+            # record the geometries with the index of their resolved style, so that
+            # replaying does not depend on the style function or random colors
+            styles = []
+            styleindexes = dict()
+            recorded = []
+            for feat in features:
+                if not isinstance(feat, dict):
+                    feat = feat.__geo_interface__
+                if stylefunc:
+                    featurestyle = stylefunc(feat)
+                    if featurestyle is None:
+                        continue
+                    featurestyle = getstyle(featurestyle)
+                else:
+                    featurestyle = fixedstyle
+                if featurestyle not in styleindexes:
+                    styleindexes[featurestyle] = len(styles)
+                    styles.append(featurestyle.to_options())
+                geoj = feat.get("geometry") if feat["type"] == "Feature" else feat
+                if not geoj:
+                    continue
+                recfeat = {"type":"Feature", "geometry":geoj, "properties":{"style":styleindexes[featurestyle]}}
+                if "bbox" in feat:
+                    recfeat["bbox"] = feat["bbox"]
+                recorded.append(recfeat)
+            recorder.record("draw_geojson_collection", (recorded,),
+                            dict(style=displaylist.StyleLookup(styles), cull=cull, clip=clip, simplify=simplify))
+            if not recorder.draw:
+                return []
+            self._recording_depth += 1
+            try:
+                return self.draw_geojson_collection(recorded, style=displaylist.StyleLookup(styles),
+                                                    cull=cull, clip=clip, simplify=simplify)
+            finally:
+                self._recording_depth -= 1
+
+        # only calculate the view once for each style
+        viewbboxes = dict()
+        def getviewbbox(style):
+            viewbbox = viewbboxes.get(style)
+            if viewbbox is None:
+                viewbbox = viewbboxes[style] = self._view_bbox(self._cull_margin(style))
+            return viewbbox
+
+        if simplify:
+            tolerance = self._simplify_tolerance(simplify)
+
+        groups = dict()
+        grouporder = []
+        def getgroup(style, kind):
+            group = groups.get((style,kind))
+            if group is None:
+                group = {"style": style, "geometry": kind, "features": 0, "vertices": 0, "time": 0.0}
+                group["data"] = aggdraw.Path() if kind != "point" else []
+                groups[(style,kind)] = group
+                grouporder.append(group)
+            return group
+
+        def addring(path, ring, clockwise):
+            # make sure exteriors and holes go in opposite directions so holes
+            # are left empty by the nonzero fill rule
+            if (_ring_area(ring) < 0) != clockwise:
+                ring = ring[::-1]
+            path.moveto(ring[0][0], ring[0][1])
+            for p in ring[1:]:
+                path.lineto(p[0], p[1])
+            path.close()
+
+        def addline(path, line):
+            path.moveto(line[0][0], line[0][1])
+            for p in line[1:]:
+                path.lineto(p[0], p[1])
+
+        for feat in features:
+            t = time.time()
+            if not isinstance(feat, dict):
+                feat = feat.__geo_interface__
+            if stylefunc:
+                featurestyle = stylefunc(feat)
+                if featurestyle is None:
+                    continue
+                style = getstyle(featurestyle)
+            else:
+                style = fixedstyle
+
+            if cull or clip:
+                geoj = self._cull_geojson(feat, getviewbbox(style), cull, clip)
+            else:
+                geoj = feat.get("geometry") if feat["type"] == "Feature" else feat
+            if not geoj:
+                continue
+            if simplify:
+                geoj = geomhelper.simplify_geom(geoj, tolerance)
+
+            geotype = geoj["type"]
+            coords = geoj["coordinates"]
+
+            # polygons with pattern fills are combined and filled at once, but other
+            # picture fills and masks are drawn at the size of each shape
+            if "fillmask" in style or hasattr(style["fillcolor"], "__call__"):
+                patterned = geotype in ("Polygon","MultiPolygon") \
+                            and isinstance(style.get("fillmask", style["fillcolor"]), Pattern) \
+                            and (isinstance(style["fillcolor"], Pattern) or not hasattr(style["fillcolor"], "__call__"))
+                if not patterned:
+                    self.draw_geojson(geoj, cull=False, style=style)
+                    continue
+                group = getgroup(style, "pattern")
+                polys = [coords] if geotype == "Polygon" else coords
+                for poly in polys:
+                    addring(group["data"], poly[0], False)
+                    for hole in poly[1:]:
+                        addring(group["data"], hole, True)
+                    group["vertices"] += sum(len(ring) for ring in poly)
+                xmin,ymin,xmax,ymax = geomhelper.geom_bbox(geoj)
+                if "bbox" in group:
+                    oldxmin,oldymin,oldxmax,oldymax = group["bbox"]
+                    xmin,ymin,xmax,ymax = min(xmin,oldxmin),min(ymin,oldymin),max(xmax,oldxmax),max(ymax,oldymax)
+                group["bbox"] = [xmin,ymin,xmax,ymax]
+            elif geotype in ("Point","MultiPoint"):
+                group = getgroup(style, "point")
+                points = [coords] if geotype == "Point" else coords
+                group["data"].extend(p[:2] for p in points)
+                group["vertices"] += len(points)
+            elif geotype in ("LineString","MultiLineString"):
+                group = getgroup(style, "line")
+                lines = [coords] if geotype == "LineString" else coords
+                for line in lines:
+                    if len(line) > 1:
+                        addline(group["data"], line)
+                        group["vertices"] += len(line)
+            elif geotype in ("Polygon","MultiPolygon"):
+                group = getgroup(style, "polygon")
+                polys = [coords] if geotype == "Polygon" else coords
+                for poly in polys:
+                    addring(group["data"], poly[0], False)
+                    for hole in poly[1:]:
+                        addring(group["data"], hole, True)
+                    group["vertices"] += sum(len(ring) for ring in poly)
+            else:
+                continue
+            group["features"] += 1
+            group["time"] += time.time() - t
+
+        # draw each group
+        kindorder = {"pattern":0, "polygon":0, "line":1, "point":2}
+        grouporder.sort(key=lambda group: kindorder[group["geometry"]])
+        for group in grouporder:
+            t = time.time()
+            style = group["style"]
+            data = group.pop("data")
+            if group["geometry"] == "pattern":
+                self._fill_textured(data, group.pop("bbox"), style)
+                if style["outlinecolor"]:
+                    self.drawer.path(data, None, _outline_pen(style))
+            elif group["geometry"] == "polygon":
+                args = []
+                if style["fillcolor"]:
+                    args.append(_fill_brush(style))
+                if style["outlinecolor"]:
+                    args.append(_outline_pen(style))
+                if args:
+                    self.drawer.path(data, *args)
+            elif group["geometry"] == "line":
+                if style["outlinecolor"] and style["outlinewidth"]:
+                    # draw a wider line underneath as the outline 
+                    outlinepen = aggdraw.Pen(style["outlinecolor"], style["fillsize"] + style["outlinewidth"] * 2)
+                    self.drawer.path(data, None, outlinepen)
+                if style["fillcolor"]:
+                    self.drawer.path(data, None, _line_pen(style))
+            else:
+                self.draw_points(data, shape=style.get("shape", "circle"), style=style)
+            group["time"] += time.time() - t
+
+        return grouporder
 
 ##    def draw_svg(self, svg):
 ##        pass
 
 
+    # Recording
+
+    def start_recording(self, draw=True):
+        """
+        Starts recording all coordinate system changes, image operations, and drawing
+        done on the canvas into a display list, which can then be replayed onto other
+        canvases of any size, or saved to disk.
+
+        Parameters:
+
+        - *draw* (optional): If True (default), also draws on the canvas while recording.
+            If False, only records the drawing, which is much faster.
+
+        Returns:
+
+        - The DisplayList instance being recorded to.
+        """
+        self._recorder = displaylist.DisplayList(draw=draw)
+        return self._recorder
+
+    def stop_recording(self):
+        """
+        Stops recording to the display list started with start_recording().
+
+        Returns:
+
+        - The recorded DisplayList instance, or None if not recording.
+        """
+        recorder = self._recorder
+        self._recorder = None
+        return recorder
+
+
 
 
 
@@ -2827,8 +3859,14 @@ class Canvas:
     @property
     def coordspace_invtransform(self):
         # the inverse coefficients to go from pixel space to coordinates
+        # only recalculated when the coordspace transform has changed
+        transform = tuple(self.coordspace_transform)
+        cached = getattr(self, "_invtransform_cache", None)
+        if cached and cached[0] == transform:
+            return cached[1]
+        
         # taken from Sean Gillies' "affine.py"
-        a,b,c,d,e,f = self.coordspace_transform
+        a,b,c,d,e,f = transform
         det = a*e - b*d
         if det != 0:
             idet = 1 / float(det)
@@ -2836,9 +3874,10 @@ class Canvas:
             rb = -b * idet
             rd = -d * idet
             re = a * idet
-            a,b,c,d,e,f = (ra, rb, -c*ra - f*rb,
-                           rd, re, -c*rd - f*re)
-            return a,b,c,d,e,f
+            invtransform = (ra, rb, -c*ra - f*rb,
+                            rd, re, -c*rd - f*re)
+            self._invtransform_cache = (transform, invtransform)
+            return invtransform
         else:
             raise Exception("Cannot invert degenerate matrix")
 
@@ -2866,7 +3905,43 @@ class Canvas:
         """
         a,b,c,d,e,f = self.coordspace_transform
         newx,newy = (x*a + y*b + c, x*d + y*e + f)
-        return int(newx),int(newy)
+        return _floor(newx),_floor(newy)
+
+    def coords2pixels(self, coords):
+        """
+        Transforms many data coordinates to their canvas image pixel positions in a single pass.
+        Unlike coord2pixel(), the pixel positions are not rounded to whole pixels.
+
+        Parameters:
+
+        - *coords*: The coordinates, either as a flat sequence of alternating x and y values,
+            a sequence of xy tuples, an array.array, or a NumPy array. 
+
+        Returns:
+
+        - The pixel positions as alternating x and y values, either as a NumPy array of the same
+            shape if given a NumPy array, an array.array of floats if given an array.array, or
+            otherwise a flat list. 
+        """
+        return _affine_transform(self.coordspace_transform, coords)
+
+    def pixels2coords(self, pixels):
+        """
+        Transforms many pixel locations on the image to their positions in the canvas coordinate
+        system in a single pass.
+
+        Parameters:
+
+        - *pixels*: The pixel locations, either as a flat sequence of alternating x and y values,
+            a sequence of xy tuples, an array.array, or a NumPy array. 
+
+        Returns:
+
+        - The coordinates as alternating x and y values, either as a NumPy array of the same
+            shape if given a NumPy array, an array.array of floats if given an array.array, or
+            otherwise a flat list. 
+        """
+        return _affine_transform(self.coordspace_invtransform, pixels)
 
     def measure_dist(self, fromxy, toxy):
         """
@@ -2923,7 +3998,33 @@ class Canvas:
         """
         self.img = PIL.Image.new(self.img.mode, self.img.size, self.background)
         self.drawer = aggdraw.Draw(self.img)
-        
+        self._textqueue = []
+        self._adjustments = None
+
+    @_recordable
+    def flush(self):
+        """
+        Writes all pending drawing to the canvas image, first any shapes and then any
+        deferred text on top. Text is deferred so that many consecutive labels can be
+        drawn in a single batch, instead of having to reload the drawer after each label. 
+
+        This is done automatically before any other drawing that follows the text, and
+        whenever the canvas image is read or saved, so only needs to be called before
+        using the canvas image (the .img attribute) directly. 
+        """
+        self._flush_text()
+
+    def _flush_text(self):
+        # same as flush(), but not recorded, see _recordable()
+        self.drawer.flush()
+        if self._textqueue:
+            textqueue = self._textqueue
+            self._textqueue = []
+            for render in textqueue:
+                render(self.img)
+            # update changes to the aggdrawer
+            self.update_drawer_img()
+
     def get_image(self):
         """
         Retrieves the canvas image along with any drawing updates.
@@ -2932,7 +4033,7 @@ class Canvas:
 
         - A PIL image. 
         """
-        self.drawer.flush()
+        self.flush()
         return self.img
     
     def get_tkimage(self):
@@ -2943,7 +4044,8 @@ class Canvas:
 
         - A Tkinter PhotoImage image.
         """
-        self.drawer.flush()
+        import PIL.ImageTk
+        self.flush()
         return PIL.ImageTk.PhotoImage(self.img)
 
     def view(self):
@@ -2951,6 +4053,10 @@ class Canvas:
         Creates a Tkinter application that packs the canvas image in order to view
         what the canvas image looks like. 
         """
+        try:
+            import Tkinter as tk
+        except ImportError:
+            import tkinter as tk
         window = tk.Tk()
         label = tk.Label(window)
         label.pack()
@@ -2967,7 +4073,7 @@ class Canvas:
         - *filepath*: The filepath to save the image, including the file type extension.
             Can be saved to any image type supported by PIL. 
         """
-        self.drawer.flush()
+        self.flush()
         self.img.save(filepath)
 
 
@@ -2983,78 +4089,227 @@ class Canvas:
 
     # Internal only
 
+    def _fill_textured(self, path, bbox, options):
+        # fills a path with a pattern, picture, or fillmask, compositing only the pixels
+        # within the coordinate bbox of the path
+        self.drawer.flush()
+        corners = self.coords2pixels([bbox[0],bbox[1], bbox[2],bbox[1], bbox[2],bbox[3], bbox[0],bbox[3]])
+        pxs,pys = corners[0::2],corners[1::2]
+        left,top = int(math.floor(min(pxs))), int(math.floor(min(pys)))
+        right,bottom = int(math.ceil(max(pxs))), int(math.ceil(max(pys)))
+        x1,y1 = max(left, 0), max(top, 0)
+        x2,y2 = min(right, self.width), min(bottom, self.height)
+        if x1 >= x2 or y1 >= y2:
+            return
+        size = (x2-x1, y2-y1)
+
+        # the antialiased insides of the path
+        a,b,c,d,e,f = self.coordspace_transform
+        maskdrawer = aggdraw.Draw("L", size, 0)
+        maskdrawer.settransform((a, b, c - x1, d, e, f - y1))
+        maskdrawer.path(path, aggdraw.Brush(255))
+        mask = PIL.Image.frombytes("L", size, maskdrawer.tobytes())
+
+        # picture fill functions and fillmasks are drawn at the size of the whole shape
+        def shape_image(func):
+            img = func(right-left, bottom-top)
+            img = img.get_image() if isinstance(img, Canvas) else img
+            return img.crop((x1-left, y1-top, x2-left, y2-top))
+
+        from PIL import ImageChops
+        if "fillmask" in options:
+            maskfunc = options["fillmask"]
+            if isinstance(maskfunc, Pattern):
+                custommask = maskfunc.image(x1, y1, size[0], size[1]).getchannel("A")
+            else:
+                custommask = shape_image(maskfunc).convert("L")
+            mask = ImageChops.multiply(mask, custommask)
+
+        fill = options["fillcolor"]
+        if isinstance(fill, Pattern):
+            fill = fill.image(x1, y1, size[0], size[1])
+        elif hasattr(fill, "__call__"):
+            fill = shape_image(fill).convert("RGBA")
+        elif fill:
+            fill = PIL.Image.new("RGBA", size, fill)
+        else:
+            return
+        fill.putalpha(ImageChops.multiply(fill.getchannel("A"), mask))
+        self._paste_image(fill, (x1,y1))
+        self.update_drawer_img()
+
+    def _draw_grid_lines(self, xs, ys, bbox, options):
+        # all vertical and horizontal lines of a grid as one path, in pixel coordinates
+        if not (xs or ys):
+            return
+        xmin,ymin,xmax,ymax = bbox
+        coords = array("d")
+        for x in xs:
+            coords.extend((x, ymin, x, ymax))
+        for y in ys:
+            coords.extend((xmin, y, xmax, y))
+        pixels = self.coords2pixels(coords)
+        path = aggdraw.Path()
+        for i in range(0, len(pixels), 4):
+            path.moveto(pixels[i], pixels[i+1])
+            path.lineto(pixels[i+2], pixels[i+3])
+        self.drawer.settransform()
+        self.drawer.path(path, _line_pen(options))
+        self.drawer.settransform(self.coordspace_transform)
+
+    def _draw_grid_labels(self, xs, ys, xinterval, yinterval, origin, labelformat=None, labeloptions=None):
+        # writes the grid coordinates along the bottom and left edges of the view
+        if labelformat is None:
+            whole = all(float(val).is_integer() for val in (xinterval, yinterval) + tuple(origin))
+            labelformat = ".0f" if whole else "g"
+        if isinstance(labelformat, (bytes,str)):
+            _frmt = labelformat
+            labelformat = lambda val: format(val, _frmt)
+        labeloptions = dict(labeloptions or {})
+        left,bottom = self.pixel2coord(0, self.height)
+        xoptions = dict({"anchor":"s", "yoffset":"-0.5%min"}, **labeloptions)
+        for x in xs:
+            self.draw_text(labelformat(x), (x,bottom), **xoptions)
+        yoptions = dict({"anchor":"w", "xoffset":"0.5%min"}, **labeloptions)
+        for y in ys:
+            self.draw_text(labelformat(y), (left,y), **yoptions)
+
+    def _view_bbox(self, margin=0):
+        # the coordinate bbox of the image, extended by a margin in pixels
+        m = margin
+        corners = [-m,-m, self.width+m,-m, self.width+m,self.height+m, -m,self.height+m]
+        coords = self.pixels2coords(corners)
+        xs,ys = coords[0::2],coords[1::2]
+        return [min(xs), min(ys), max(xs), max(ys)]
+
+    def _cull_margin(self, options):
+        # how far in pixels a shape drawn with the given options can reach outside its coordinates,
+        # from options that have already been checked
+        return max(options["fillwidth"], options["fillheight"]) + options["outlinewidth"]
+
+    def _cull_geojson(self, geojson, viewbbox, cull=True, clip=False):
+        # returns the geometry of a geojson feature or geometry after culling and clipping
+        # it to the view bbox, or None if it should not be drawn
+        geom = geojson.get("geometry") if geojson["type"] == "Feature" else geojson
+        if not geom:
+            return None
+        bbox = geomhelper.geom_bbox(geojson)
+        if bbox is None:
+            return None
+        if cull and not geomhelper.bbox_intersects(bbox, viewbbox):
+            self.cullstats["culled"] += 1
+            return None
+        if clip and not geomhelper.bbox_within(bbox, viewbbox):
+            geom = geomhelper.clip_geom(geom, viewbbox)
+            if geom is None:
+                self.cullstats["culled"] += 1
+                return None
+            self.cullstats["clipped"] += 1
+        self.cullstats["drawn"] += 1
+        return geom
+
+    def _simplify_tolerance(self, simplify):
+        # converts a simplify option in pixels to a tolerance in coordinate units
+        if simplify == "auto":
+            simplify = 0.5
+        a,b,c,d,e,f = self.coordspace_transform
+        scale = math.sqrt(abs(a*e - b*d)) # pixels per coordinate unit
+        return simplify / float(scale)
+
+    def _style_statekey(self):
+        # the canvas state that parsed style sizes depend on
+        return (self.ppi, self.default_unit, self.width, self.height,
+                tuple(self.coordspace_transform), tuple(self.coordspace_bbox))
+
     def _check_options(self, customoptions):
+        # precompiled style
+        if "style" in customoptions:
+            customoptions = customoptions.copy()
+            style = customoptions.pop("style")
+            if not customoptions and style.statekey == self._style_statekey():
+                return style
+            # override some of the style options, or reparse the style if
+            # the canvas has changed since it was made
+            options = dict(style.rawoptions)
+            # keep any default colors the same
+            options["fillcolor"] = style["fillcolor"]
+            options["outlinecolor"] = style["outlinecolor"]
+            options.update(customoptions)
+            return self.make_style(**options)
+
         # types
+        customoptions = self._check_size_options(customoptions)
+        
+        # colors
+        if "fillcolor" not in customoptions:
+            customoptions["fillcolor"] = tuple([random.randrange(0,255) for _ in range(3)])
+        if "outlinecolor" not in customoptions:
+            customoptions["outlinecolor"] = (0,0,0)
+
+        # force to tuple of ints so user doesnt have to
+        if isinstance(customoptions["fillcolor"], (tuple,list)):
+            customoptions["fillcolor"] = tuple(map(int,customoptions["fillcolor"]))
+        if isinstance(customoptions["outlinecolor"], (tuple,list)):
+            customoptions["outlinecolor"] = tuple(map(int,customoptions["outlinecolor"]))
+            
+        # finish  
+        return customoptions
+
+    def _check_size_options(self, customoptions):
+        # a copy of the options with the drawing sizes parsed to pixels,
+        # size units are parsed relative to the current canvas
         customoptions = customoptions.copy()
+        ppi = self.ppi
+        default_unit = self.default_unit
+        canvassize = (self.width,self.height)
+        coordsize = (self.coordspace_width,self.coordspace_height)
         
         # fillsize
         # NOTE: if circle is specified with an area, get radius by:
         #    math.sqrt(area_squared/math.pi)
         if "fillsize" in customoptions:
-            customoptions["fillsize"] = units.parse_dist(customoptions["fillsize"],
-                                                         ppi=self.ppi,
-                                                         default_unit=self.default_unit,
-                                                         canvassize=[self.width,self.height],
-                                                         coordsize=[self.coordspace_width,self.coordspace_height])
+            customoptions["fillsize"] = units.parse_dist(customoptions["fillsize"], ppi, default_unit, canvassize, coordsize)
         else:
-            customoptions["fillsize"] = units.parse_diststring("0.7%min", ppi=self.ppi, canvassize=[self.width,self.height])
+            customoptions["fillsize"] = units.parse_diststring("0.7%min", ppi=ppi, canvassize=canvassize)
         if "fillwidth" in customoptions:
-            customoptions["fillwidth"] = units.parse_dist(customoptions["fillwidth"],
-                                                         ppi=self.ppi,
-                                                         default_unit=self.default_unit,
-                                                         canvassize=[self.width,self.height],
-                                                         coordsize=[self.coordspace_width,self.coordspace_height])
+            customoptions["fillwidth"] = units.parse_dist(customoptions["fillwidth"], ppi, default_unit, canvassize, coordsize)
         else:
             customoptions["fillwidth"] = customoptions["fillsize"] * 2
         if "fillheight" in customoptions:
-            customoptions["fillheight"] = units.parse_dist(customoptions["fillheight"],
-                                                         ppi=self.ppi,
-                                                         default_unit=self.default_unit,
-                                                         canvassize=[self.width,self.height],
-                                                         coordsize=[self.coordspace_width,self.coordspace_height])
+            customoptions["fillheight"] = units.parse_dist(customoptions["fillheight"], ppi, default_unit, canvassize, coordsize)
         else:
             customoptions["fillheight"] = customoptions["fillsize"] * 2
         # outlinewidth
         if "outlinewidth" in customoptions:
-            customoptions["outlinewidth"] = units.parse_dist(customoptions["outlinewidth"],
-                                                         ppi=self.ppi,
-                                                         default_unit=self.default_unit,
-                                                         canvassize=[self.width,self.height],
-                                                         coordsize=[self.coordspace_width,self.coordspace_height])
+            customoptions["outlinewidth"] = units.parse_dist(customoptions["outlinewidth"], ppi, default_unit, canvassize, coordsize)
         else:
-            customoptions["outlinewidth"] = units.parse_diststring("0.07%min", ppi=self.ppi, canvassize=[self.width,self.height])
-        
-        # colors
-        if "fillcolor" not in customoptions:
-            customoptions["fillcolor"] = tuple([random.randrange(0,255) for _ in range(3)])
-        if "outlinecolor" not in customoptions:
-            customoptions["outlinecolor"] = (0,0,0)
-
-        # force to tuple of ints so user doesnt have to
-        if isinstance(customoptions["fillcolor"], (tuple,list)):
-            customoptions["fillcolor"] = tuple(map(int,customoptions["fillcolor"]))
-        if isinstance(customoptions["outlinecolor"], (tuple,list)):
-            customoptions["outlinecolor"] = tuple(map(int,customoptions["outlinecolor"]))
-            
-        # finish  
+            customoptions["outlinewidth"] = units.parse_diststring("0.07%min", ppi=ppi, canvassize=canvassize)
         return customoptions
 
     def _check_text_options(self, customoptions):
         customoptions = customoptions.copy()
 
+        # precompiled style, text options are passed on as they are
+        style = customoptions.pop("style", None)
+        if style:
+            options = dict(style.rawoptions)
+            options.update(customoptions)
+            customoptions = options
+
         def calc_fontsize(width=None, height=None, font=None):
             #### process text options
             fontlocation = fonthelper.get_fontpath(font)
 
-            #### incrementally cut size in half or double it until within 20 percent of desired height
+            #### start from the size predicted by the font metrics, which is usually within 10 percent,
+            #### otherwise incrementally cut size in half or double it until within 10 percent of desired height
             infiloop = False
             prevsize = None
-            cursize = 12
+            cursize = fonthelper.fontsize_for_height(fontlocation, width if width else height)
             nextsize = None
             
             while True: 
                 # calculate size metrics for current
-                font = PIL.ImageFont.truetype(fontlocation, size=cursize) 
+                font = fonthelper.load_font(fontlocation, size=cursize) 
                 fontwidth, fontheight = font.getsize("H") # arbitrary big character, we are only interested in height
 
                 refsize = width if width else height
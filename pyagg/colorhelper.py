@@ -0,0 +1,116 @@
+"""
+Contains helpers for finding the pixels of an image that match a color,
+such as when making a color transparent or replacing it.
+Mostly used internally.
+"""
+
+import PIL, PIL.Image, PIL.ImageChops
+
+# How the tolerance of a color match is measured
+METRICS = ("average", "euclidean", "channel")
+
+# Number of pixels matched at a time, to limit the size of the intermediate images
+CHUNKSIZE = 1024 * 1024
+
+# Largest term of a channel that still lets the sum of three terms fit in a single band
+MAXTERM = 85
+
+
+
+def channel_luts(color, tolerance=0, metric="average"):
+    """
+    Returns the (luts, threshold) of a color match, where luts are three lists
+    giving the distance term of each possible red, green and blue value, and a
+    pixel matches if the sum of its three terms is no more than the threshold.
+
+    Parameters:
+
+    - *color*: The rgb color to match.
+    - *tolerance* (optional): How much a pixel may differ from the color and still match,
+        as a fraction from 0 to 1 of the full color range. Defaults to 0, an exact match.
+    - *metric* (optional): How the difference is measured, one of "average" (default) for the
+        mean absolute difference of the three channels, "euclidean" for the straight line
+        distance between the two colors, or "channel" for the largest difference of any channel.
+    """
+    if metric not in METRICS:
+        raise Exception("Color match metric must be one of %s, not %r" % (METRICS, metric))
+    tolerance = 255 * tolerance
+    luts = []
+    for c in color[:3]:
+        if metric == "average":
+            lut = [abs(v - c) for v in range(256)]
+        elif metric == "euclidean":
+            lut = [(v - c) ** 2 for v in range(256)]
+        else:
+            # channels that are within tolerance add nothing, any other one fails the match
+            lut = [0 if abs(v - c) <= tolerance else 1 for v in range(256)]
+        luts.append(lut)
+    if metric == "average":
+        threshold = 3 * tolerance
+    elif metric == "euclidean":
+        threshold = tolerance ** 2
+    else:
+        threshold = 0
+    return luts, threshold
+
+def color_mask(img, color, tolerance=0, metric="average", inside=255, outside=0):
+    """
+    Returns an "L" mode mask image of the pixels that match a color.
+
+    The distance terms of each channel are looked up in tables made once for the
+    whole image, instead of being computed for every pixel, and the match is always
+    exact. Small tolerances are summed in a single band, larger ones in 32-bit
+    integer images. The image is matched a strip of rows at a time, so that apart
+    from the mask the intermediate images stay small.
+
+    Parameters:
+
+    - *img*: The PIL image to match, the first three bands are taken as rgb.
+    - *color*: The rgb color to match.
+    - *tolerance* (optional): How much a pixel may differ from the color and still match,
+        as a fraction from 0 to 1 of the full color range. Defaults to 0, an exact match.
+    - *metric* (optional): How the difference is measured, see channel_luts().
+    - *inside* (optional): The mask value of matching pixels, defaults to 255.
+    - *outside* (optional): The mask value of all other pixels, defaults to 0.
+    """
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    luts, threshold = channel_luts(color, tolerance, metric)
+    # the terms are whole numbers, so can be compared to the whole part of the threshold
+    threshold = int(threshold)
+    alpha = [0] * 256 if img.mode == "RGBA" else []
+    if threshold <= MAXTERM - 1:
+        # terms beyond the threshold can be cut off without changing the result
+        tables = [[min(MAXTERM, term) for lut in luts for term in lut] + alpha]
+        match = _band_match
+    else:
+        # the high and low bytes of each term
+        tables = [[term >> 8 for lut in luts for term in lut] + alpha,
+                  [term & 255 for lut in luts for term in lut] + alpha]
+        match = _int_match
+    values = [inside if v == 255 else outside for v in range(256)]
+    width, height = img.size
+    mask = PIL.Image.new("L", img.size)
+    rows = max(1, CHUNKSIZE // max(width, 1))
+    for y in range(0, height, rows):
+        strip = img.crop((0, y, width, min(y + rows, height)))
+        mask.paste(match(strip, tables, threshold).point(values), (0, y))
+    return mask
+
+# Internal only
+
+def _band_match(img, tables, threshold):
+    # sums the capped terms in a single band, and returns 255 where they match
+    r, g, b = img.point(tables[0]).split()[:3]
+    total = PIL.ImageChops.add(PIL.ImageChops.add(r, g), b)
+    return total.point([255 if v <= threshold else 0 for v in range(256)])
+
+def _int_match(img, tables, threshold):
+    # sums the exact terms from their high and low bytes in 32-bit images,
+    # and returns 255 where they match
+    import PIL.ImageMath
+    r1, g1, b1 = img.point(tables[0]).split()[:3]
+    r0, g0, b0 = img.point(tables[1]).split()[:3]
+    matched = PIL.ImageMath.eval("((r1 + g1 + b1) * 256 + r0 + g0 + b0 <= t) * 255",
+                                 r1=r1, g1=g1, b1=b1, r0=r0, g0=g0, b0=b0, t=threshold)
+    return matched.convert("L")
@@ -0,0 +1,219 @@
+"""
+Records the drawing done on a Canvas, so that it can be replayed onto
+other canvases of any size or saved to disk.
+"""
+
+import pickle
+from array import array
+from collections import namedtuple
+
+
+# Recordable canvas methods, the opcode of each is its position in the list
+OPNAMES = ["pixel_space", "fraction_space", "percent_space", "geographic_space", "custom_space",
+           "zoom_units", "zoom_factor", "zoom_in", "zoom_out", "zoom_bbox", "set_default_unit",
+           "resize", "rotate", "flip", "move", "crop",
+           "brightness", "contrast", "blur", "sharpen", "equalize", "invert", "transparency",
+           "transparent_color", "replace_color", "color_tint", "color_remap",
+           "paste", "grid_paste", "draw_gradient", "draw_grid", "draw_axis",
+           "draw_circle", "draw_triangle", "draw_pie", "draw_box", "draw_points",
+           "draw_line", "draw_polygon", "draw_text", "draw_geojson_collection", "flush",
+           "paste_many"]
+OPCODES = dict((name,code) for code,name in enumerate(OPNAMES))
+
+# Methods that only change the coordinate system or default unit
+COORDSPACEOPS = set(OPNAMES[:OPNAMES.index("set_default_unit")+1])
+
+# Methods that draw shapes with a random fillcolor if none is given,
+# which must be decided before recording
+SHAPEOPS = set(["draw_circle", "draw_triangle", "draw_pie", "draw_box", "draw_points",
+                "draw_line", "draw_polygon"])
+
+# Methods whose first argument is a sequence of coordinates
+COORDOPS = set(["draw_points", "draw_line", "draw_polygon"])
+
+# Methods whose first argument is an image or canvas, or a sequence of them,
+# along with the name of that argument
+IMAGEOPS = {"paste":"image", "paste_many":"items", "grid_paste":"imgs"}
+
+# A slice of the display list coordinate array
+CoordRef = namedtuple("CoordRef", ["start", "end"])
+
+
+
+class DisplayList(object):
+    """
+    A compact recording of drawing operations, as created by Canvas.start_recording().
+    Each operation is stored as an opcode, with the coordinates of lines, polygons, and points
+    stored together in a single array of floats.
+
+    Sizes given in relative units such as % are stored as they are, so that replaying onto
+    a bigger or smaller canvas scales them to that canvas, but any random default colors
+    are decided once when recorded. Display lists can be pickled, eg to send them to other
+    processes, or saved to and loaded from disk.
+
+    Attributes:
+
+    - *opcodes*:
+        An array with the opcode of each operation.
+    - *params*:
+        A list with the (args, kwargs) of each operation.
+    - *coords*:
+        An array with the xy coordinates of all operations.
+    - *draw*:
+        Whether the canvas also draws while recording.
+    """
+    def __init__(self, draw=True):
+        self.opcodes = array("B")
+        self.params = []
+        self.coords = array("d")
+        self.draw = draw
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def __iter__(self):
+        for opcode,(args,kwargs) in zip(self.opcodes, self.params):
+            yield OPNAMES[opcode], args, kwargs
+
+    def record(self, name, args, kwargs):
+        """
+        Adds an operation to the display list. Mostly used internally.
+
+        Parameters:
+
+        - *name*: The name of the canvas method, must be one of OPNAMES.
+        - *args*: The positional arguments of the method call.
+        - *kwargs*: The keyword arguments of the method call.
+        """
+        args = list(args)
+        kwargs = dict(kwargs)
+
+        # precompiled styles are stored as their options
+        style = kwargs.get("style")
+        if hasattr(style, "rawoptions"):
+            options = kwargs.pop("style").to_options()
+            options.update(kwargs)
+            kwargs = options
+
+        # pasted canvases are stored as copies of their images, which can be pickled
+        # and are not changed by any later drawing on the pasted canvas
+        if name in IMAGEOPS:
+            key = IMAGEOPS[name]
+            if args:
+                args[0] = _copy_images(name, args[0])
+            elif key in kwargs:
+                kwargs[key] = _copy_images(name, kwargs[key])
+
+        # store coordinates in the array
+        if name in COORDOPS:
+            if args:
+                args[0] = self._add_coords(args[0])
+            else:
+                key = "xys" if name == "draw_points" else "coords"
+                kwargs[key] = self._add_coords(kwargs[key])
+            if name == "draw_polygon":
+                if len(args) > 1:
+                    args[1] = [self._add_coords(hole) for hole in args[1]]
+                elif kwargs.get("holes"):
+                    kwargs["holes"] = [self._add_coords(hole) for hole in kwargs["holes"]]
+
+        self.opcodes.append(OPCODES[name])
+        self.params.append((tuple(args), kwargs))
+
+    def replay(self, canvas, coordspace=True):
+        """
+        Replays all recorded operations onto a canvas.
+
+        Parameters:
+
+        - *canvas*: The Canvas instance to draw on.
+        - *coordspace* (optional): If True (default), also replays any changes to the coordinate system
+            and default unit. Set to False to draw in the canvas' own coordinate system instead.
+
+        Returns:
+
+        - The canvas.
+        """
+        for name,args,kwargs in self:
+            if not coordspace and name in COORDSPACEOPS:
+                continue
+            if name in COORDOPS:
+                args = [self._get_coords(arg) for arg in args]
+                kwargs = dict((key,self._get_coords(val)) for key,val in kwargs.items())
+            getattr(canvas, name)(*args, **kwargs)
+        return canvas
+
+    def save(self, filepath):
+        """
+        Saves the display list to a file.
+
+        Parameters:
+
+        - *filepath*: The filepath to save the display list.
+        """
+        with open(filepath, "wb") as fileobj:
+            pickle.dump(self, fileobj, pickle.HIGHEST_PROTOCOL)
+
+    # Internal only
+
+    def _add_coords(self, coords):
+        start = len(self.coords)
+        if type(coords).__module__ == "numpy":
+            self.coords.extend(coords.ravel().tolist())
+        elif len(coords) and hasattr(coords[0], "__iter__"):
+            for xy in coords:
+                self.coords.extend(xy[:2])
+        else:
+            self.coords.extend(coords)
+        return CoordRef(start, len(self.coords))
+
+    def _get_coords(self, val):
+        if isinstance(val, CoordRef):
+            return self.coords[val.start:val.end]
+        elif isinstance(val, list) and val and isinstance(val[0], CoordRef):
+            return [self.coords[ref.start:ref.end] for ref in val]
+        return val
+
+
+
+class StyleLookup(object):
+    """
+    Looks up the recorded style of each feature in a recorded draw_geojson_collection() call,
+    based on the style index stored in the feature properties. Mostly used internally.
+    """
+    def __init__(self, styles):
+        self.styles = styles
+
+    def __call__(self, feature):
+        return self.styles[feature["properties"]["style"]]
+
+
+
+def _copy_image(image):
+    # a copy of the current image of a canvas, or the image itself if not a canvas
+    if hasattr(image, "get_image"):
+        return image.get_image().copy()
+    return image
+
+def _copy_images(name, value):
+    if name == "paste":
+        return _copy_image(value)
+    elif name == "paste_many":
+        return [(_copy_image(image),xy) for image,xy in value]
+    else:
+        return [_copy_image(image) for image in value]
+
+def load(filepath):
+    """
+    Loads a display list that was saved to a file.
+
+    Parameters:
+
+    - *filepath*: The filepath of the saved display list.
+
+    Returns:
+
+    - A DisplayList instance.
+    """
+    with open(filepath, "rb") as fileobj:
+        return pickle.load(fileobj)
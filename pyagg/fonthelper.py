@@ -12,6 +12,11 @@ Karim Bahgat, 2015
 import sys
 import os
 import struct
+import json
+
+import PIL.ImageFont
+
+from . import cachehelper
 
 
 
@@ -27,6 +32,22 @@ SYSFONTFOLDERS = dict([("windows",["C:/Windows/Fonts/"]),
 # Include builtin fonts
 LIBFONTFOLDER = os.path.join(os.path.split(__file__)[0], 'fonts')
 
+# Where to store the index of system fonts, so font files only have to be read
+# when they change, can be overridden with the PYAGG_CACHE_DIR environment variable
+if os.environ.get("PYAGG_CACHE_DIR"):
+    CACHEFOLDER = os.environ["PYAGG_CACHE_DIR"]
+elif OSSYSTEM == "windows":
+    CACHEFOLDER = os.path.join(os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "pyagg", "cache")
+elif OSSYSTEM == "mac":
+    CACHEFOLDER = os.path.expanduser("~/Library/Caches/pyagg")
+else:
+    CACHEFOLDER = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "pyagg")
+FONTINDEXPATH = os.path.join(CACHEFOLDER, "fontindex.json")
+FONTINDEXVERSION = 1
+
+# Fontname-filepath mapping of system fonts, loaded on first use, see load_sysfonts()
+SYSFONTS = None
+
 
 # Apparently ttf is stored in big endian
 endian = ">"
@@ -47,6 +68,12 @@ def _read_ulong(fileobj):
     (val,) = struct.unpack(frmt, raw)
     return val
 
+def _read_short(fileobj):
+    frmt = endian + "h"
+    raw = fileobj.read(struct.calcsize(frmt))
+    (val,) = struct.unpack(frmt, raw)
+    return val
+
 def _read_chars(fileobj, n):
     frmt = endian+str(n)+"s"
     raw = fileobj.read(struct.calcsize(frmt))
@@ -89,6 +116,74 @@ def _read_namestable_record(fileobj):
 
 
 
+def _find_tables(fileobj, names):
+    # returns the offset tables of the named tables
+    file_header = _read_file_header(fileobj)
+    tables = dict()
+    for _ in range(file_header["NumOfTables"]):
+        offset_table = _read_offset_table(fileobj)
+        if offset_table["TableName"] in names:
+            tables[offset_table["TableName"]] = offset_table
+    return tables
+
+def _read_fontindex(indexpath):
+    try:
+        with open(indexpath, "r") as fileobj:
+            index = json.load(fileobj)
+        if index.get("version") == FONTINDEXVERSION:
+            return index
+    except (IOError, OSError, ValueError):
+        # missing or corrupt index is rebuilt
+        pass
+    return {"version": FONTINDEXVERSION, "folders": {}, "files": {}}
+
+def _write_fontindex(indexpath, index):
+    try:
+        folder = os.path.dirname(indexpath)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        # write to a temporary file first, so other processes never read a half written index
+        temppath = "%s.%s.tmp" % (indexpath, os.getpid())
+        with open(temppath, "w") as fileobj:
+            json.dump(index, fileobj)
+        if os.path.exists(indexpath) and OSSYSTEM == "windows":
+            os.remove(indexpath)
+        os.rename(temppath, indexpath)
+    except (IOError, OSError):
+        # the index is only an optimization, so ignore unwritable cache folders
+        pass
+
+def _scan_folders(folders, index):
+    # lists the .ttf files in the folders and their subfolders, reusing the
+    # folder contents stored in the index if the folder has not been modified
+    scanned = dict()
+    filepaths = []
+    stack = list(reversed(folders))
+    while stack:
+        folder = stack.pop()
+        if folder in scanned:
+            continue
+        try:
+            mtime = os.stat(folder).st_mtime
+        except OSError:
+            continue
+        cached = index["folders"].get(folder)
+        if cached and cached["mtime"] == mtime:
+            subfolders,filenames = cached["subfolders"],cached["filenames"]
+        else:
+            subfolders,filenames = [],[]
+            for name in sorted(os.listdir(folder)):
+                if os.path.isdir(os.path.join(folder, name)):
+                    subfolders.append(name)
+                elif name.lower().endswith(".ttf"):
+                    filenames.append(name)
+        scanned[folder] = {"mtime": mtime, "subfolders": subfolders, "filenames": filenames}
+        filepaths.extend(os.path.join(folder, filename) for filename in filenames)
+        stack.extend(os.path.join(folder, name) for name in reversed(subfolders))
+    return scanned, filepaths
+
+
+
 # User Functions
 
 def get_fontname(filepath):
@@ -144,40 +239,73 @@ def get_fontpath(font):
     Gets fontpath from either font name, fontfile name, or full fontfile path
     """
     font = font.lower()
+    sysfonts = SYSFONTS if SYSFONTS is not None else load_sysfonts()
     # first try to get human readable name from custom list
-    if font in SYSFONTS:
-        return SYSFONTS[font]
+    if font in sysfonts:
+        return sysfonts[font]
     # then try to get from custom font filepath
     elif os.path.lexists(font):
         return font
     # or try to get from filename in font folder
     else:
-        for filepath in list(SYSFONTS.values()): # + [LIBFONTFOLDER]:
+        for filepath in list(sysfonts.values()): # + [LIBFONTFOLDER]:
             if filepath.endswith(font):
                 return filepath
     # raise error if hasnt succeeded yet
     raise Exception("Could not find the font specified. Font must be either a human-readable name, a filename with extension in the default font folder, or a full path to the font file location, not: {}".format(font))
 
-def load_sysfonts():
+def load_sysfonts(indexpath=None):
     """
     Caches and returns a fontname-filepath mapping of available system fonts,
-    by looking up SYSFONTFOLDERS. This function is run on startup, and
-    the results can be accessed via the cached storage variable SYSFONTS. 
-    """
-    fontfilenames = dict([(filename.lower(), os.path.join(dirpath, filename))
-                          for fontfold in SYSFONTFOLDERS[OSSYSTEM] + [LIBFONTFOLDER]
-                           for dirpath,dirnames,filenames in os.walk(fontfold)
-                          for filename in filenames
-                          if filename.lower().endswith(".ttf")])
+    by looking up SYSFONTFOLDERS and the builtin font folder. This function is
+    run the first time a font is looked up, and the results can be accessed via
+    the cached storage variable SYSFONTS.
+
+    The font names are stored in an index file, so that on later runs only new
+    or modified font files have to be read, detected by the modification times
+    of the font folders and the sizes and modification times of the font files.
+
+    Parameters:
+
+    - *indexpath* (optional): The filepath of the font index. Defaults to FONTINDEXPATH.
+        Set to False to read all font files without using an index. 
+    """
+    if indexpath is None:
+        indexpath = FONTINDEXPATH
+    if indexpath:
+        index = _read_fontindex(indexpath)
+    else:
+        index = {"version": FONTINDEXVERSION, "folders": {}, "files": {}}
+
+    folders,filepaths = _scan_folders(SYSFONTFOLDERS[OSSYSTEM] + [LIBFONTFOLDER], index)
+
+    # same font filename in multiple folders is only included once
+    fontfilenames = dict([(os.path.basename(filepath).lower(), filepath)
+                          for filepath in filepaths])
+
+    files = dict()
     fontnames = dict()
-    for filename,filepath in fontfilenames.items():
-        #fontname = get_fontname(filepath)
+    for filename,filepath in sorted(fontfilenames.items()):
         try:
-            fontname = get_fontname(filepath)
-            fontnames.update([(fontname.lower(), filepath)])
-        except:
-            # errors and fails are to be expected on some files, so just skip those
-            pass
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        cached = index["files"].get(filepath)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+            fontname = cached["fontname"]
+        else:
+            try:
+                fontname = get_fontname(filepath)
+            except:
+                # errors and fails are to be expected on some files, so just skip those
+                fontname = None
+        files[filepath] = {"size": stat.st_size, "mtime": stat.st_mtime, "fontname": fontname}
+        if fontname:
+            fontnames[fontname.lower()] = filepath
+
+    newindex = {"version": FONTINDEXVERSION, "folders": folders, "files": files}
+    if indexpath and newindex != index:
+        _write_fontindex(indexpath, newindex)
 
     # cache so other funcs can reuse results
     global SYSFONTS
@@ -185,19 +313,112 @@ def load_sysfonts():
 
     return fontnames
 
-# Cache all sysfonts on import
-load_sysfonts()
 
 
+# Font metrics
 
+# Font size used when measuring text to predict its size at other font sizes
+REFSIZE = 100
 
+# Cache of font metrics, keyed by fontpath
+FONTMETRICS = dict()
 
+def get_fontmetrics(fontpath):
+    """
+    Reads the units per em, ascent, descent, and line gap of a .ttf font file
+    from its head and hhea tables, and returns them as a dictionary. Ascent
+    and descent are in font units, with descent being negative. The results
+    are cached so each font file is only read once. 
+    """
+    metrics = FONTMETRICS.get(fontpath)
+    if metrics is None:
+        with open(fontpath, "rb") as fileobj:
+            tables = _find_tables(fileobj, (b"head", b"hhea"))
+            if len(tables) < 2:
+                raise Exception("Could not find the head and hhea tables")
+
+            # units per em is 18 bytes into the head table
+            fileobj.seek(tables[b"head"]["Offset"] + 18)
+            unitsperem = _read_ushort(fileobj)
+
+            # ascent, descent, and linegap follow the hhea version number
+            fileobj.seek(tables[b"hhea"]["Offset"] + 4)
+            ascent = _read_short(fileobj)
+            descent = _read_short(fileobj)
+            linegap = _read_short(fileobj)
+
+        metrics = {"unitsperem": unitsperem,
+                   "ascent": ascent,
+                   "descent": descent,
+                   "linegap": linegap}
+        FONTMETRICS[fontpath] = metrics
+    return metrics
+
+def fontsize_for_height(fontpath, height):
+    """
+    Predicts the font size at which a line of text without descenders, such
+    as capital letters, is the given number of pixels tall. Calculated directly
+    from the font metrics, or from the text height at the REFSIZE font size
+    if the metrics cannot be read. 
+    """
+    try:
+        metrics = get_fontmetrics(fontpath)
+        ratio = metrics["ascent"] / float(metrics["unitsperem"])
+    except Exception:
+        refheight = load_font(fontpath, REFSIZE).getsize("H")[1]
+        ratio = refheight / float(REFSIZE)
+    return max(1, int(round(height / ratio)))
 
 
 
+# Loaded fonts
 
+# Process-wide cache of loaded fonts, keyed by (fontpath, size, index)
+FONTCACHE = cachehelper.LRUCache(maxsize=256)
 
-        
-        
+def load_font(fontpath, size, index=0):
+    """
+    Loads and returns a PIL truetype font from a font filepath at the given size,
+    reusing a previously loaded font if the same path, size, and font index
+    has been loaded before. Use instead of PIL.ImageFont.truetype() to avoid
+    repeatedly opening the same font file. 
+    """
+    key = (fontpath, size, index)
+    font = FONTCACHE.get(key)
+    if font is None:
+        font = PIL.ImageFont.truetype(fontpath, size=size, index=index)
+        FONTCACHE.put(key, font)
+    return font
+
+# Cache of character sizes for each loaded font, see get_textsize()
+GLYPHSIZES = cachehelper.LRUCache(maxsize=256)
+
+def clear_font_cache():
+    """
+    Empties the cache of loaded fonts used by load_font(), and resets its
+    hit and miss counters, along with the cached character sizes. 
+    """
+    FONTCACHE.clear()
+    GLYPHSIZES.clear()
+
+def get_textsize(font, text):
+    """
+    Returns the approximate pixel (width,height) of a single line of text written
+    with a loaded font, calculated from the cached sizes of each character. Much
+    faster than font.getsize() when measuring many short texts, but ignores kerning. 
+    """
+    key = (font.path, font.size, font.index)
+    glyphsizes = GLYPHSIZES.get(key)
+    if glyphsizes is None:
+        glyphsizes = dict()
+        GLYPHSIZES.put(key, glyphsizes)
+    width = height = 0
+    for char in text:
+        size = glyphsizes.get(char)
+        if size is None:
+            size = glyphsizes[char] = font.getsize(char)
+        width += size[0]
+        if size[1] > height:
+            height = size[1]
+    return width,height
 
-        
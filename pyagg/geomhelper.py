@@ -0,0 +1,428 @@
+"""
+Contains several helper functions for GeoJSON geometries, such as
+calculating and testing bounding boxes and clipping to a view,
+and for stroking lines into polygons.
+Mostly used internally.
+"""
+
+import math
+
+# Bounding boxes
+
+def _coords_bbox(coords):
+    xs = [p[0] for p in coords]
+    ys = [p[1] for p in coords]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def _merge_bboxes(bboxes):
+    bboxes = [bbox for bbox in bboxes if bbox]
+    if not bboxes:
+        return None
+    xmins,ymins,xmaxs,ymaxs = zip(*bboxes)
+    return [min(xmins), min(ymins), max(xmaxs), max(ymaxs)]
+
+def geom_bbox(geoj):
+    """
+    Returns the [xmin,ymin,xmax,ymax] bounding box of a GeoJSON geometry or feature
+    dictionary, using its bbox member if it has one. Returns None for empty geometries.
+    """
+    bbox = geoj.get("bbox")
+    if bbox:
+        # may be 3-dimensional, ie [xmin,ymin,zmin,xmax,ymax,zmax]
+        half = len(bbox) // 2
+        return [bbox[0], bbox[1], bbox[half], bbox[half+1]]
+
+    if geoj["type"] == "Feature":
+        geom = geoj.get("geometry")
+        return geom_bbox(geom) if geom else None
+
+    geotype = geoj["type"]
+    if geotype == "GeometryCollection":
+        return _merge_bboxes(geom_bbox(geom) for geom in geoj["geometries"])
+
+    coords = geoj["coordinates"]
+    if not coords:
+        return None
+    if geotype == "Point":
+        x,y = coords[0],coords[1]
+        return [x, y, x, y]
+    elif geotype in ("MultiPoint","LineString"):
+        return _coords_bbox(coords)
+    elif geotype == "MultiLineString":
+        return _merge_bboxes(_coords_bbox(line) for line in coords if line)
+    elif geotype == "Polygon":
+        # holes are always inside the exterior
+        return _coords_bbox(coords[0])
+    elif geotype == "MultiPolygon":
+        return _merge_bboxes(_coords_bbox(poly[0]) for poly in coords if poly)
+    else:
+        raise Exception("Unknown geometry type: %s" % geotype)
+
+def bbox_intersects(bbox, otherbbox):
+    """
+    Tests if two [xmin,ymin,xmax,ymax] bounding boxes intersect.
+    """
+    xmin,ymin,xmax,ymax = bbox
+    oxmin,oymin,oxmax,oymax = otherbbox
+    return not (xmax < oxmin or xmin > oxmax or ymax < oymin or ymin > oymax)
+
+def bbox_within(bbox, otherbbox):
+    """
+    Tests if a [xmin,ymin,xmax,ymax] bounding box lies entirely inside another.
+    """
+    xmin,ymin,xmax,ymax = bbox
+    oxmin,oymin,oxmax,oymax = otherbbox
+    return xmin >= oxmin and xmax <= oxmax and ymin >= oymin and ymax <= oymax
+
+
+
+# Clipping
+
+def clip_ring(ring, bbox):
+    """
+    Clips a polygon ring to a [xmin,ymin,xmax,ymax] bounding box, using the
+    Sutherland-Hodgman algorithm. Returns the clipped ring, or an empty list
+    if the ring falls entirely outside the bbox.
+    """
+    xmin,ymin,xmax,ymax = bbox
+    edges = [(0, xmin, 1), (0, xmax, -1), (1, ymin, 1), (1, ymax, -1)]
+    points = [(p[0],p[1]) for p in ring]
+    for axis,limit,sign in edges:
+        if not points:
+            break
+        inside = lambda p: (p[axis] - limit) * sign >= 0
+        clipped = []
+        prev = points[-1]
+        previn = inside(prev)
+        for p in points:
+            pin = inside(p)
+            if pin != previn:
+                # add the crossing point
+                t = (limit - prev[axis]) / float(p[axis] - prev[axis])
+                cross = [None, None]
+                cross[axis] = limit
+                cross[1-axis] = prev[1-axis] + t * (p[1-axis] - prev[1-axis])
+                clipped.append(tuple(cross))
+            if pin:
+                clipped.append(p)
+            prev,previn = p,pin
+        points = clipped
+    if len(points) < 3:
+        return []
+    if points[0] != points[-1]:
+        points.append(points[0])
+    return points
+
+def _clip_segment(x1, y1, x2, y2, bbox):
+    # Liang-Barsky, returns the clipped segment or None
+    xmin,ymin,xmax,ymax = bbox
+    dx,dy = x2-x1, y2-y1
+    t0,t1 = 0.0,1.0
+    for p,q in ((-dx, x1-xmin), (dx, xmax-x1), (-dy, y1-ymin), (dy, ymax-y1)):
+        if p == 0:
+            if q < 0:
+                return None
+        else:
+            t = q / float(p)
+            if p < 0:
+                if t > t1: return None
+                t0 = max(t0, t)
+            else:
+                if t < t0: return None
+                t1 = min(t1, t)
+    return (x1 + t0*dx, y1 + t0*dy), (x1 + t1*dx, y1 + t1*dy)
+
+def clip_line(line, bbox):
+    """
+    Clips a line to a [xmin,ymin,xmax,ymax] bounding box. Since a line may go
+    in and out of the bbox, returns a list of the clipped line parts.
+    """
+    parts = []
+    current = None
+    for i in range(len(line) - 1):
+        p1,p2 = line[i],line[i+1]
+        segment = _clip_segment(p1[0], p1[1], p2[0], p2[1], bbox)
+        if segment is None:
+            current = None
+            continue
+        start,end = segment
+        if current and current[-1] == start:
+            current.append(end)
+        else:
+            current = [start, end]
+            parts.append(current)
+        if end != (p2[0],p2[1]):
+            # line leaves the bbox
+            current = None
+    return parts
+
+def clip_geom(geoj, bbox):
+    """
+    Clips a GeoJSON geometry dictionary to a [xmin,ymin,xmax,ymax] bounding box.
+    Returns a new geometry dictionary, or None if nothing is left after clipping.
+    """
+    geotype = geoj["type"]
+    if geotype == "GeometryCollection":
+        geoms = [clip_geom(geom, bbox) for geom in geoj["geometries"]]
+        geoms = [geom for geom in geoms if geom]
+        return {"type":"GeometryCollection", "geometries":geoms} if geoms else None
+
+    coords = geoj["coordinates"]
+    xmin,ymin,xmax,ymax = bbox
+
+    def inside(p):
+        return xmin <= p[0] <= xmax and ymin <= p[1] <= ymax
+
+    def clip_poly(poly):
+        exterior = clip_ring(poly[0], bbox)
+        if not exterior:
+            return None
+        holes = [clip_ring(hole, bbox) for hole in poly[1:]]
+        return [exterior] + [hole for hole in holes if hole]
+
+    if geotype == "Point":
+        return geoj if inside(coords) else None
+    elif geotype == "MultiPoint":
+        points = [p for p in coords if inside(p)]
+        return {"type":"MultiPoint", "coordinates":points} if points else None
+    elif geotype == "LineString":
+        lines = clip_line(coords, bbox)
+    elif geotype == "MultiLineString":
+        lines = [part for line in coords for part in clip_line(line, bbox)]
+    elif geotype == "Polygon":
+        poly = clip_poly(coords)
+        return {"type":"Polygon", "coordinates":poly} if poly else None
+    elif geotype == "MultiPolygon":
+        polys = [clip_poly(poly) for poly in coords]
+        polys = [poly for poly in polys if poly]
+        return {"type":"MultiPolygon", "coordinates":polys} if polys else None
+    else:
+        raise Exception("Unknown geometry type: %s" % geotype)
+
+    if not lines:
+        return None
+    elif len(lines) == 1:
+        return {"type":"LineString", "coordinates":lines[0]}
+    else:
+        return {"type":"MultiLineString", "coordinates":lines}
+
+
+
+# Simplification
+
+def _sqseg_dist(px, py, x1, y1, x2, y2):
+    # squared distance from a point to a line segment
+    dx,dy = x2-x1, y2-y1
+    if dx or dy:
+        t = ((px-x1)*dx + (py-y1)*dy) / float(dx*dx + dy*dy)
+        if t > 1:
+            x1,y1 = x2,y2
+        elif t > 0:
+            x1 += dx*t
+            y1 += dy*t
+    dx,dy = px-x1, py-y1
+    return dx*dx + dy*dy
+
+def simplify_line(coords, tolerance):
+    """
+    Simplifies a sequence of xy coordinates by removing vertices that are closer
+    than the tolerance distance to the simplified line, first with a fast radial
+    distance pass and then with the Douglas-Peucker algorithm. The first and last
+    vertices are always kept.
+    """
+    if len(coords) < 3:
+        return list(coords)
+    sqtol = tolerance * tolerance
+
+    # drop vertices too close to the previous one
+    points = [coords[0]]
+    prevx,prevy = coords[0][0],coords[0][1]
+    for p in coords[1:-1]:
+        dx,dy = p[0]-prevx, p[1]-prevy
+        if dx*dx + dy*dy > sqtol:
+            points.append(p)
+            prevx,prevy = p[0],p[1]
+    points.append(coords[-1])
+
+    # douglas-peucker, without recursion to allow for very long lines
+    count = len(points)
+    if count < 3:
+        return points
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count-1)]
+    while stack:
+        first,last = stack.pop()
+        x1,y1 = points[first][0],points[first][1]
+        x2,y2 = points[last][0],points[last][1]
+        maxdist = sqtol
+        index = None
+        for i in range(first+1, last):
+            dist = _sqseg_dist(points[i][0], points[i][1], x1, y1, x2, y2)
+            if dist > maxdist:
+                index,maxdist = i,dist
+        if index is not None:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p,k in zip(points, keep) if k]
+
+def simplify_ring(ring, tolerance):
+    """
+    Same as simplify_line(), but for closed polygon rings. Returns None if the
+    ring collapses to less than three distinct vertices.
+    """
+    simple = simplify_line(ring, tolerance)
+    if len(simple) < 4:
+        return None
+    return simple
+
+def simplify_geom(geoj, tolerance):
+    """
+    Simplifies a GeoJSON geometry dictionary with simplify_line() and simplify_ring().
+    Polygon exteriors that would collapse are kept as they are so the polygon is
+    still drawn, while collapsed holes are dropped. Returns a new geometry dictionary.
+    """
+    geotype = geoj["type"]
+    if geotype in ("Point","MultiPoint"):
+        return geoj
+    elif geotype == "GeometryCollection":
+        return {"type":geotype, "geometries":[simplify_geom(geom, tolerance) for geom in geoj["geometries"]]}
+
+    def simplify_poly(poly):
+        exterior = simplify_ring(poly[0], tolerance) or poly[0]
+        holes = [simplify_ring(hole, tolerance) for hole in poly[1:]]
+        return [exterior] + [hole for hole in holes if hole]
+
+    coords = geoj["coordinates"]
+    if geotype == "LineString":
+        coords = simplify_line(coords, tolerance)
+    elif geotype == "MultiLineString":
+        coords = [simplify_line(line, tolerance) for line in coords]
+    elif geotype == "Polygon":
+        coords = simplify_poly(coords)
+    elif geotype == "MultiPolygon":
+        coords = [simplify_poly(poly) for poly in coords]
+    else:
+        raise Exception("Unknown geometry type: %s" % geotype)
+    return {"type":geotype, "coordinates":coords}
+
+
+
+
+# Stroking
+
+def stroke_line(coords, widths, join="miter", miterlimit=4, starts=False):
+    """
+    Returns the left and right sides of a line drawn with a given width at each vertex,
+    as two lists of xy points, computed in a single pass over the line. The line must
+    not have any repeated consecutive vertices. 
+
+    Parameters:
+
+    - *coords*: A sequence of xy coordinates.
+    - *widths*: A sequence with the half width of the line at each vertex.
+    - *join* (optional): How the outer side of the line is joined at each vertex,
+        one of "miter" (default), "round", or "bevel". 
+    - *miterlimit* (optional): Miter joins longer than this many half widths are beveled instead.
+        Defaults to 4.
+    - *starts* (optional): If True, also returns a list with the (left,right) index of the first
+        side point of each vertex, since joins can add more than one point per vertex.
+    """
+    if join not in ("miter", "round", "bevel"):
+        raise Exception("Line join must be miter, round, or bevel, not %r" % join)
+    minhalf = 1.0 / (miterlimit * miterlimit)
+    
+    # unit direction of each segment
+    dirs = []
+    (prevx,prevy) = coords[0][:2]
+    for x,y in coords[1:]:
+        dx,dy = x-prevx, y-prevy
+        length = math.hypot(dx, dy)
+        dirs.append((dx/length, dy/length))
+        prevx,prevy = x,y
+
+    # start, offset to the left (dy,-dx) and right (-dy,dx) of the first segment
+    x,y = coords[0][:2]
+    dx,dy = dirs[0]
+    w = widths[0]
+    left = [(x + dy*w, y - dx*w)]
+    right = [(x - dy*w, y + dx*w)]
+    vertexstarts = [(0,0)]
+    
+    # joins
+    for i in range(1, len(coords)-1):
+        vertexstarts.append((len(left),len(right)))
+        x,y = coords[i][:2]
+        w = widths[i]
+        dx1,dy1 = dirs[i-1]
+        dx2,dy2 = dirs[i]
+        # half of one plus the cosine of the turn, ie the squared cosine of half the turn
+        half = (1 + dx1*dx2 + dy1*dy2) / 2.0
+        if half >= minhalf and (join == "miter" or half > 0.9999):
+            # both sides meet where their offset lines intersect
+            scale = w / (2*half)
+            mx,my = (dy1+dy2) * scale, -(dx1+dx2) * scale
+            left.append((x + mx, y + my))
+            right.append((x - mx, y - my))
+            continue
+
+        # the side on the inside of the turn still meets at the intersection
+        # unless that is too far away, and the outside is joined around the vertex
+        turnleft = dx1*dy2 - dy1*dx2 < 0
+        inner,outer = (left,right) if turnleft else (right,left)
+        sign = -1 if turnleft else 1 # outer side
+        if half >= minhalf:
+            scale = w / (2*half)
+            mx,my = (dy1+dy2) * scale, -(dx1+dx2) * scale
+            inner.append((x - sign*mx, y - sign*my))
+        else:
+            inner.append((x - sign*dy1*w, y + sign*dx1*w))
+            inner.append((x - sign*dy2*w, y + sign*dx2*w))
+        outer.append((x + sign*dy1*w, y - sign*dx1*w))
+        if join == "round":
+            # arc points no further than a quarter pixel from the circle
+            start = math.atan2(-sign*dx1, sign*dy1)
+            turn = math.atan2(dx1*dy2 - dy1*dx2, dx1*dx2 + dy1*dy2)
+            step = 2 * math.acos(1 - 0.25 / w) if w > 0.25 else math.pi
+            steps = int(abs(turn) / step)
+            for k in range(1, steps+1):
+                angle = start + turn * k / float(steps+1)
+                outer.append((x + math.cos(angle)*w, y + math.sin(angle)*w))
+        outer.append((x + sign*dy2*w, y - sign*dx2*w))
+
+    # end
+    vertexstarts.append((len(left),len(right)))
+    x,y = coords[-1][:2]
+    dx,dy = dirs[-1]
+    w = widths[-1]
+    left.append((x + dy*w, y - dx*w))
+    right.append((x - dy*w, y + dx*w))
+    if starts:
+        return left, right, vertexstarts
+    return left, right
+
+def smooth_line(coords):
+    """
+    Smooths a line with quadratic bezier curves between the midpoints of its segments,
+    using each vertex as a control point, and returns the curves as a new list of xy
+    points at most a few pixels apart. The first and last vertices are kept.
+    """
+    if len(coords) < 3:
+        return list(coords)
+    points = [coords[0]]
+    x1,y1 = coords[0][:2]
+    cx,cy = coords[1][:2]
+    x1,y1 = (x1+cx) / 2.0, (y1+cy) / 2.0
+    points.append((x1,y1))
+    for x,y in coords[2:]:
+        x2,y2 = (cx+x) / 2.0, (cy+y) / 2.0
+        steps = min(32, max(2, int((math.hypot(cx-x1, cy-y1) + math.hypot(x2-cx, y2-cy)) / 3)))
+        for k in range(1, steps+1):
+            t = k / float(steps)
+            a,b,c = (1-t)*(1-t), 2*(1-t)*t, t*t
+            points.append((a*x1 + b*cx + c*x2, a*y1 + b*cy + c*y2))
+        x1,y1 = x2,y2
+        cx,cy = x,y
+    points.append(coords[-1])
+    return points
@@ -0,0 +1,149 @@
+"""
+Contains helpers for rendering color gradients into images, by computing the
+gradient position of each pixel with PIL image transforms and coloring it
+through a lookup table, so that the cost does not depend on the number of colors.
+Mostly used internally.
+"""
+
+from __future__ import division
+
+import math
+
+import PIL, PIL.Image, PIL.ImageChops, PIL.ImageDraw
+
+# Radius in pixels of the cached radial distance image
+RADIUS = 256
+
+_RADIAL = None
+
+
+
+def _radial_source():
+    # an image of the distance from its center, from 0 at the center to 255 at RADIUS pixels away
+    global _RADIAL
+    if _RADIAL is None:
+        size = RADIUS * 2
+        values = bytearray(size * size)
+        scale = 255.0 / RADIUS
+        i = 0
+        for y in range(size):
+            dy = y + 0.5 - RADIUS
+            for x in range(size):
+                dx = x + 0.5 - RADIUS
+                values[i] = min(255, int(math.sqrt(dx*dx + dy*dy) * scale + 0.5))
+                i += 1
+        _RADIAL = PIL.Image.frombytes("L", (size, size), bytes(values))
+    return _RADIAL
+
+def linear_positions(size, start, end):
+    """
+    Returns an "L" mode image with the position of each pixel along a linear gradient,
+    from 0 at the start point to 255 at the end point, measured along the line between them.
+
+    Parameters:
+
+    - *size*: The width and height of the image.
+    - *start*: The pixel xy where the gradient starts.
+    - *end*: The pixel xy where the gradient ends.
+    """
+    width,height = size
+    (x1,y1),(x2,y2) = start,end
+    dx,dy = x2-x1, y2-y1
+    sqlength = float(dx*dx + dy*dy) or 1.0
+    a,b = 255 * dx / sqlength, 255 * dy / sqlength
+    c = -(a * x1 + b * y1)
+
+    # positions past the end are clamped by extending the ramp, those before the start are filled with 0
+    corners = [a*x + b*y + c for x in (0,width) for y in (0,height)]
+    pad = max(0, int(math.ceil(max(corners))) - 255) + 2
+    ramp = PIL.Image.frombytes("L", (1, 256 + pad), bytes(bytearray(list(range(256)) + [255] * pad)))
+    return ramp.transform(size, PIL.Image.AFFINE, (0, 0, 0.5, a, b, c + 0.5), PIL.Image.BILINEAR, fillcolor=0)
+
+def radial_positions(size, center, radius):
+    """
+    Returns an "L" mode image with the position of each pixel along a radial gradient,
+    from 0 at the center to 255 at the radius and beyond.
+
+    Parameters:
+
+    - *size*: The width and height of the image.
+    - *center*: The pixel xy of the gradient center.
+    - *radius*: The pixel radius of the gradient.
+    """
+    cx,cy = center
+    scale = RADIUS / float(radius or 1)
+    return _radial_source().transform(size, PIL.Image.AFFINE,
+                                      (scale, 0, RADIUS - cx * scale, 0, scale, RADIUS - cy * scale),
+                                      PIL.Image.BILINEAR, fillcolor=255)
+
+def path_positions(size, coords, left, right, starts):
+    """
+    Returns an "L" mode image with the position of each pixel along a gradient that
+    follows a line, from 0 at its first vertex to 255 at its last, measured by the distance
+    along the line. Each segment fills the area between the left and right sides of the line
+    from its first to its last vertex, including any join at its last vertex, so that
+    neighbouring segments meet without seams, and pixels outside of the line are 0.
+
+    Parameters:
+
+    - *size*: The width and height of the image.
+    - *coords*: The pixel xy vertices of the line, without repeated consecutive vertices.
+    - *left*: The pixel xy points of the left side of the line, as returned by geomhelper.stroke_line().
+    - *right*: The pixel xy points of the right side of the line, as returned by geomhelper.stroke_line().
+    - *starts*: The (left,right) index of the first side point of each vertex, as returned by
+        geomhelper.stroke_line() with starts=True.
+    """
+    lengths = [math.hypot(x2-x1, y2-y1) for (x1,y1),(x2,y2) in zip(coords[:-1], coords[1:])]
+    total = sum(lengths) or 1.0
+    dirs = [((x2-x1) / length, (y2-y1) / length)
+            for ((x1,y1),(x2,y2)),length in zip(zip(coords[:-1], coords[1:]), lengths)]
+    ends = starts[1:] + [(len(left),len(right))]
+
+    positions = PIL.Image.new("L", size, 0)
+    walked = 0
+    for i,length in enumerate(lengths):
+        # from the last side points of the first vertex to all side points of the last vertex
+        (l1,r1),(l2,r2) = starts[i+1],ends[i+1]
+        area = [left[l1-1]] + left[l1:l2] + right[r1:r2][::-1] + [right[r1-1]]
+        xs,ys = zip(*area)
+        xmin,ymin = max(0, int(math.floor(min(xs)))), max(0, int(math.floor(min(ys))))
+        xmax,ymax = min(size[0], int(math.ceil(max(xs)))+1), min(size[1], int(math.ceil(max(ys)))+1)
+        if xmin >= xmax or ymin >= ymax:
+            walked += length
+            continue
+
+        # the segment's share of the positions, measured within its own bounding box
+        (x1,y1),(x2,y2) = coords[i], coords[i+1]
+        dx,dy = dirs[i]
+        start = (x1 - dx * walked - xmin, y1 - dy * walked - ymin)
+        end = (x1 + dx * (total - walked) - xmin, y1 + dy * (total - walked) - ymin)
+        boxsize = (xmax-xmin, ymax-ymin)
+        segment = linear_positions(boxsize, start, end)
+
+        # pasted through the segment area without antialiasing, so neighbours leave no gaps
+        mask = PIL.Image.new("L", boxsize, 0)
+        PIL.ImageDraw.Draw(mask).polygon([(x-xmin, y-ymin) for x,y in area], fill=255, outline=255)
+        positions.paste(segment, (xmin, ymin), mask)
+        walked += length
+    return positions
+
+def colorize(positions, colors, mask=None):
+    """
+    Colors an "L" mode image of gradient positions with a lookup table of gradient colors,
+    and returns it as an "RGBA" image.
+
+    Parameters:
+
+    - *positions*: An "L" mode image of gradient positions from 0 to 255.
+    - *colors*: A list of 256 rgb or rgba colors.
+    - *mask* (optional): An "L" mode image that the transparency of the result is multiplied with,
+        eg the antialiased shape that the gradient fills.
+    """
+    bands = [positions.point([color[i] for color in colors]) for i in range(3)]
+    if len(colors[0]) > 3 and any(color[3] != 255 for color in colors):
+        alpha = positions.point([color[3] for color in colors])
+        if mask is not None:
+            alpha = PIL.ImageChops.multiply(alpha, mask)
+    else:
+        alpha = mask if mask is not None else PIL.Image.new("L", positions.size, 255)
+    return PIL.Image.merge("RGBA", bands + [alpha])
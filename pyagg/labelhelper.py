@@ -0,0 +1,117 @@
+"""
+Contains helpers for placing text labels without overlap, such as a grid
+index of already placed label boxes and the candidate positions of a label
+around its point.
+Mostly used internally.
+"""
+
+
+# The default candidate positions of a label relative to its point, in order of preference
+CANDIDATES = ("ne", "e", "se", "sw", "w", "nw", "n", "s")
+
+# The text anchor that places the label at each candidate position
+ANCHORS = {"ne":"sw", "e":"w", "se":"nw", "s":"n",
+           "sw":"ne", "w":"e", "nw":"se", "n":"s",
+           "center":"center"}
+
+
+
+class GridIndex(object):
+    """
+    A spatial index of [xmin,ymin,xmax,ymax] boxes, where each box is stored
+    in every grid cell it overlaps, so that intersection tests only have to
+    check the boxes in the same cells.
+    """
+    def __init__(self, cellsize=64):
+        self.cellsize = float(cellsize)
+        self.cells = dict()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def insert(self, box):
+        """
+        Adds a box to the index.
+        """
+        box = tuple(box)
+        xmin,ymin,xmax,ymax = box
+        size = self.cellsize
+        cells = self.cells
+        for ix in range(int(xmin // size), int(xmax // size) + 1):
+            for iy in range(int(ymin // size), int(ymax // size) + 1):
+                cell = cells.get((ix,iy))
+                if cell is None:
+                    cells[(ix,iy)] = [box]
+                else:
+                    cell.append(box)
+        self.count += 1
+
+    def intersects(self, box):
+        """
+        Tests if a box overlaps any of the boxes in the index. Boxes that
+        only touch at their edges do not overlap.
+        """
+        xmin,ymin,xmax,ymax = box
+        size = self.cellsize
+        cells = self.cells
+        for ix in range(int(xmin // size), int(xmax // size) + 1):
+            for iy in range(int(ymin // size), int(ymax // size) + 1):
+                cell = cells.get((ix,iy))
+                if cell:
+                    for oxmin,oymin,oxmax,oymax in cell:
+                        if xmin < oxmax and xmax > oxmin and ymin < oymax and ymax > oymin:
+                            return True
+        return False
+
+
+
+def candidate_offset(candidate, gap):
+    """
+    Returns the pixel xy offset from a point to the anchor of a label placed
+    at a candidate position, leaving a gap between the point and the label.
+    """
+    dx = dy = 0
+    if candidate == "center":
+        # centered on the point, so no gap
+        return dx,dy
+    if "e" in candidate:
+        dx = gap
+    elif "w" in candidate:
+        dx = -gap
+    if candidate.startswith("n"):
+        dy = -gap
+    elif candidate.startswith("s"):
+        dy = gap
+    return dx,dy
+
+def candidate_factors(candidate, gap=0):
+    """
+    Returns the (dx,dy,fx,fy) factors of a candidate position, where a label
+    of a given width and height placed at pixel point xy has its upper left
+    corner at (x + dx - width * fx, y + dy - height * fy).
+    """
+    dx,dy = candidate_offset(candidate, gap)
+    anchor = ANCHORS[candidate]
+    fx = fy = 0.5
+    if anchor != "center":
+        if "n" in anchor:
+            fy = 0
+        elif "s" in anchor:
+            fy = 1
+        if "e" in anchor:
+            fx = 1
+        elif "w" in anchor:
+            fx = 0
+    return dx,dy,fx,fy
+
+def candidate_box(x, y, width, height, candidate, gap=0):
+    """
+    Returns the [xmin,ymin,xmax,ymax] pixel box of a label of the given pixel
+    width and height, placed at a candidate position around the pixel point xy,
+    the same as draw_text() would place it.
+    """
+    dx,dy,fx,fy = candidate_factors(candidate, gap)
+    xmin = x + dx - width * fx
+    ymin = y + dy - height * fy
+    return [xmin, ymin, xmin + width, ymin + height]
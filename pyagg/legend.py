@@ -2,7 +2,7 @@
 Canvas subclass specializing in being a Legend showing assigned symbology. 
 """
 
-from .canvas import Canvas
+from .canvas import Canvas, Gradient
 
 # PY3 fix
 try: 
@@ -95,7 +95,7 @@ class _Symbol:
             func = getattr(c, "draw_"+drawtype)
             func(xy=(x,y), anchor="center", **kwargs)
 
-        c.drawer.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
+        c.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
         c.update_drawer_img()
 
         return c
@@ -111,7 +111,7 @@ class _Gradient(_Symbol):
 
         self.refcanvas = refcanvas
 
-        self.gradient = gradient
+        self.gradient = Gradient(gradient)
         self.length = length
         self.thickness = thickness
         
@@ -143,7 +143,7 @@ class _Gradient(_Symbol):
         c.set_default_unit("px")
         c.draw_gradient(line, self.gradient, info["thickness"]) 
 
-        c.drawer.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
+        c.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
         c.update_drawer_img()
 
         return c
@@ -167,7 +167,7 @@ class Label(_Symbol):
         import PIL, PIL.ImageFont
         from . import fonthelper
         fontlocation = fonthelper.get_fontpath(info["font"])
-        font = PIL.ImageFont.truetype(fontlocation, size=info["textsize"])
+        font = fonthelper.load_font(fontlocation, size=info["textsize"])
         text = self.text if isinstance(self.text, str) else str(self.text)
         textlines = text.split("\n")
         widths,heights = zip(*[font.getsize(line) for line in textlines])
@@ -321,10 +321,11 @@ class _BaseGroup:
 
         # draw in direction
         #print "drawing group",reqwidth,reqheight
+        items = []
         for symbol in rensymbols:
             #print "child size",symbol.width,symbol.height
             #symbol.view()
-            c.paste(symbol, (x,y), anchor=anchor)
+            items.append((symbol, (x,y)))
             # TODO: fix error where semitransparent colors disappear entirely when pasting
             # ...
             
@@ -341,6 +342,8 @@ class _BaseGroup:
                 elif direction == "n":
                     y -= padpx + symbol.height / 2.0 + nextsymbol.height / 2.0
 
+        c.paste_many(items, anchor=anchor)
+
         return c
 
     def _default_boxoptions(self, **kwargs):
@@ -782,7 +785,7 @@ class GradientSymbol(BaseGroup):
                 c.draw_axis('x', minval=minval, maxval=maxval, intercept=intercept, tickside=_tickside, fillsize=_axisoptions['fillsize'], fillcolor=_axisoptions['fillcolor'], **alltickoptions)
 
             # finally reduce to valid pixel region
-            c.drawer.flush()
+            c.flush()
             c.img = c.img.crop(c.img.getbbox())
             c.update_drawer_img()
 
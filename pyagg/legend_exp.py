@@ -81,7 +81,7 @@ class _Symbol:
             func = getattr(c, "draw_"+drawtype)
             func(xy=(x,y), anchor="center", **self.kwargs)
 
-        c.drawer.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
+        c.flush() # STRANGE BUG, DOESNT RENDER UNLESS CALLING FLUSH HERE...
         c.update_drawer_img()
 
         return c
@@ -105,7 +105,7 @@ class Label(_Symbol):
         import PIL, PIL.ImageFont
         from . import fonthelper
         fontlocation = fonthelper.get_fontpath(info["font"])
-        font = PIL.ImageFont.truetype(fontlocation, size=info["textsize"]) 
+        font = fonthelper.load_font(fontlocation, size=info["textsize"]) 
         reqwidth, reqheight = font.getsize(self.text)
                     
         # create canvas and draw
@@ -0,0 +1,183 @@
+"""
+Renders many map tiles or other images with the same drawing but different
+coordinate extents, spread out over multiple processes.
+"""
+
+import os
+import io
+import time
+import zlib
+import random
+import traceback
+import multiprocessing
+
+from .canvas import Canvas, Style
+from . import fonthelper
+
+
+
+# Worker
+
+_WORKER = dict()
+
+def _init_worker(draw_func, options, styles=None):
+    # run once in each worker process, so that the font is loaded once per worker
+    # and kept in the font cache, and the style options are received once
+    # instead of with every tile
+    _WORKER["draw_func"] = draw_func
+    _WORKER["options"] = options
+    _WORKER["styles"] = styles
+    fonthelper.load_font(options["font"], fonthelper.REFSIZE)
+
+def _resolve_styles(styles):
+    # decides any random default colors of the styles once for all tiles,
+    # the same every time so that the output does not depend on the caller
+    state = random.getstate()
+    random.seed(_tile_seed("styles"))
+    try:
+        canvas = Canvas(1, 1)
+        resolved = dict()
+        for name,style in sorted(styles.items()):
+            if not isinstance(style, Style):
+                style = canvas.make_style(**style)
+            resolved[name] = style.to_options()
+        return resolved
+    finally:
+        random.setstate(state)
+
+def _tile_seed(key):
+    # same random numbers for the same tile, regardless of which worker renders it
+    return zlib.crc32(repr(key).encode("utf8")) & 0xffffffff
+
+def _tile_path(outdir, key, fileformat):
+    if isinstance(key, (tuple,list)) and len(key) == 3:
+        z,x,y = key
+        return os.path.join(outdir, str(z), str(x), "%s.%s" % (y, fileformat))
+    else:
+        return os.path.join(outdir, "%s.%s" % (key, fileformat))
+
+def _render_tile(task):
+    key,bbox = task
+    draw_func = _WORKER["draw_func"]
+    options = _WORKER["options"]
+    styles = _WORKER["styles"]
+    result = {"key":key, "bbox":bbox, "data":None, "path":None, "time":None, "error":None}
+    t = time.time()
+    try:
+        random.seed(_tile_seed(key))
+        canvas = Canvas(options["width"], options["height"], background=options["background"],
+                        mode=options["mode"], ppi=options["ppi"])
+        xmin,ymin,xmax,ymax = bbox
+        canvas.custom_space(xmin, ymax, xmax, ymin, lock_ratio=False)
+        if styles is None:
+            draw_func(canvas)
+        else:
+            # the styles are compiled once per tile, since their sizes depend on its coordinate system
+            draw_func(canvas, dict((name,canvas.make_style(**styleoptions))
+                                   for name,styleoptions in styles.items()))
+        img = canvas.get_image()
+
+        if options["outdir"]:
+            path = _tile_path(options["outdir"], key, options["format"])
+            folder = os.path.dirname(path)
+            if not os.path.isdir(folder):
+                try:
+                    os.makedirs(folder)
+                except OSError:
+                    # created by another worker in the meantime
+                    pass
+            img.save(path)
+            result["path"] = path
+        else:
+            fileobj = io.BytesIO()
+            img.save(fileobj, format=options["format"])
+            result["data"] = fileobj.getvalue()
+    except Exception:
+        result["error"] = traceback.format_exc()
+    result["time"] = time.time() - t
+    return result
+
+
+
+# User functions
+
+def render_tiles(draw_func, extents, workers=None, width=256, height=256, background=None,
+                 mode="RGBA", ppi=300, outdir=None, format="png", font="DejaVu Sans", styles=None):
+    """
+    Renders one image for each of many coordinate extents, spread out over a pool of
+    worker processes. Each image is rendered on a new Canvas whose coordinate space
+    is set to the extent, and is then drawn on by the draw function.
+
+    The output is the same regardless of the number of workers, since the random
+    colors of each tile are seeded by the tile key. An error in one tile does not
+    stop the others, and is instead reported in the results.
+
+    Parameters:
+
+    - *draw_func*: A function that takes a Canvas and draws on it. Must be defined at the top
+        level of a module so that it can be sent to the worker processes. If styles are given,
+        it is instead called with the canvas and a dictionary of the styles made for that canvas.
+    - *extents*: The coordinate extents to render, either as a dictionary or a sequence of (key, bbox) pairs,
+        where each bbox is [xmin,ymin,xmax,ymax]. The keys identify each tile, typically (z,x,y) tuples.
+        Can also be just a sequence of bboxes, in which case the key of each tile is its index.
+    - *workers* (optional): The number of worker processes. Defaults to the number of cpus. With 1 worker,
+        all tiles are rendered in the current process.
+    - *width* (optional): The pixel width of each tile. Defaults to 256.
+    - *height* (optional): The pixel height of each tile. Defaults to 256.
+    - *background* (optional): The background color of each tile, same as for Canvas.
+    - *mode* (optional): The image mode of each tile, same as for Canvas.
+    - *ppi* (optional): The pixels per inch of each tile, same as for Canvas.
+    - *outdir* (optional): If given, saves each tile to this folder instead of returning the image data.
+        Tiles with (z,x,y) keys are saved as outdir/z/x/y.png, and other tiles as outdir/key.png.
+    - *format* (optional): The image file format of each tile. Defaults to "png".
+    - *font* (optional): The font to load in each worker before rendering. Defaults to "DejaVu Sans".
+        Raises an error before starting any workers if the font cannot be found or loaded.
+    - *styles* (optional): A dictionary of named styles shared by all tiles, each given as a
+        dictionary of drawing options or a Style. Any random default colors are decided once,
+        and the options are sent to each worker once when it starts.
+
+    Returns:
+
+    - A list with one dictionary for each tile, in the same order as the extents, with the
+        tile's key, bbox, encoded image data (or None if saved to outdir), saved path (or None),
+        time in seconds spent rendering it, and error traceback string (or None if successful).
+    """
+    if isinstance(extents, dict):
+        tasks = list(extents.items())
+    else:
+        tasks = []
+        for i,extent in enumerate(extents):
+            if len(extent) == 2:
+                tasks.append(tuple(extent))
+            else:
+                tasks.append((i, extent))
+
+    # resolve and load the font here, so that a bad font fails once instead of in every worker
+    fontpath = fonthelper.get_fontpath(font)
+    fonthelper.load_font(fontpath, fonthelper.REFSIZE)
+
+    options = dict(width=width, height=height, background=background, mode=mode, ppi=ppi,
+                   outdir=outdir, format=format, font=fontpath)
+    if styles is not None:
+        styles = _resolve_styles(styles)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(tasks)))
+
+    if workers == 1:
+        # the tiles reseed the global random generator, so restore it for the caller afterwards
+        state = random.getstate()
+        _init_worker(draw_func, options, styles)
+        try:
+            results = [_render_tile(task) for task in tasks]
+        finally:
+            random.setstate(state)
+            _WORKER.clear()
+    else:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(draw_func, options, styles))
+        try:
+            results = pool.map(_render_tile, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    return results
@@ -0,0 +1,81 @@
+"""
+Contains helpers for pattern fills, such as drawing the tile of a hatch
+pattern and repeating a tile across an image.
+Mostly used internally.
+"""
+
+from __future__ import division
+
+import PIL, PIL.Image
+import aggdraw
+
+# The standard hatch patterns
+HATCHES = ("horizontal", "vertical", "diagonal", "backdiagonal", "cross", "diagonalcross", "dots")
+
+
+
+def hatch_tile(kind="diagonal", color=(0,0,0), spacing=8, linewidth=1, background=None):
+    """
+    Returns an "RGBA" image of a single tile of a hatch pattern, drawn so that it
+    repeats without seams.
+
+    Parameters:
+
+    - *kind* (optional): The hatch pattern, one of "horizontal", "vertical", "diagonal" (default)
+        for lines going up to the right, "backdiagonal" for lines going down to the right,
+        "cross", "diagonalcross", or "dots".
+    - *color* (optional): The color of the lines or dots. Defaults to black.
+    - *spacing* (optional): The pixel distance between lines or dots, which is also the width and
+        height of the tile. Defaults to 8.
+    - *linewidth* (optional): The pixel width of the lines, or diameter of the dots. Defaults to 1.
+    - *background* (optional): The color between the lines, defaults to transparent.
+    """
+    if kind not in HATCHES:
+        raise Exception("Hatch pattern must be one of %s, not %r" % (HATCHES, kind))
+    size = max(2, int(round(spacing)))
+    tile = PIL.Image.new("RGBA", (size,size), background or (0,0,0,0))
+    drawer = aggdraw.Draw(tile)
+    pen = aggdraw.Pen(color, linewidth)
+    half = size / 2.0
+    # straight lines of odd widths are centered on a pixel to keep them sharp
+    mid = size // 2 + (0.5 if int(round(linewidth)) % 2 else 0)
+    if kind in ("horizontal", "cross"):
+        drawer.line((-1, mid, size+1, mid), pen)
+    if kind in ("vertical", "cross"):
+        drawer.line((mid, -1, mid, size+1), pen)
+    # diagonals are repeated on each side of the tile so that they also cover its corners
+    if kind in ("diagonal", "diagonalcross"):
+        for c in (0, size, 2*size):
+            drawer.line((-size, c + size, 2*size, c - 2*size), pen)
+    if kind in ("backdiagonal", "diagonalcross"):
+        for c in (-size, 0, size):
+            drawer.line((-size, c - size, 2*size, c + 2*size), pen)
+    if kind == "dots":
+        radius = linewidth / 2.0
+        drawer.ellipse((half - radius, half - radius, half + radius, half + radius), aggdraw.Brush(color))
+    drawer.flush()
+    return tile
+
+def tile_image(tile, size):
+    """
+    Returns a new image of the given size, covered by repeating a tile from its upper left corner.
+
+    Parameters:
+
+    - *tile*: The PIL image to repeat.
+    - *size*: The width and height of the new image.
+    """
+    width,height = size
+    # doubles the tiled area at a time, so that only a few pastes are needed
+    img = tile
+    while img.size[0] < width:
+        wider = PIL.Image.new(tile.mode, (img.size[0] * 2, img.size[1]))
+        wider.paste(img, (0,0))
+        wider.paste(img, (img.size[0],0))
+        img = wider
+    while img.size[1] < height:
+        taller = PIL.Image.new(tile.mode, (img.size[0], img.size[1] * 2))
+        taller.paste(img, (0,0))
+        taller.paste(img, (0,img.size[1]))
+        img = taller
+    return img.crop((0, 0, width, height))
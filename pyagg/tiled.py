@@ -0,0 +1,416 @@
+"""
+A canvas for drawing images that are too big to fit in memory, by
+recording the drawing and rendering it one tile at a time.
+"""
+
+import struct
+import zlib
+import random
+
+import PIL, PIL.Image
+
+from .canvas import Canvas, Style, SIZEOPTIONS, from_image, _grid_positions
+from . import units
+
+# PY3 fix
+try:
+    basestring
+except NameError:
+    basestring = (bytes,str) # PY3
+
+# PNG color types for each image mode
+PNGCOLORTYPES = {"L":0, "RGB":2, "RGBA":6}
+
+
+
+class TiledCanvas(Canvas):
+    """
+    A canvas with the same drawing methods as Canvas, but which never holds the
+    full image in memory. Instead all drawing is recorded and then rendered one
+    tile at a time, where each tile is drawn with the coordinate system offset to
+    that part of the image. Finished tiles can be saved to disk as they are rendered,
+    so that peak memory is only bounded by the tile size.
+
+    All sizes, font sizes, and default random colors are decided at the time of
+    drawing, so the result looks the same as if drawn on a regular Canvas. Methods
+    that manipulate the pixels of the existing image, such as resize() or blur(),
+    are not supported. The zoom methods only change the coordinate system of any
+    drawing that follows, and do not zoom what has already been drawn.
+
+    Attributes:
+
+    - *tilesize*:
+        The pixel width and height of each tile.
+    - *operations*:
+        The list of recorded drawing operations.
+    """
+    def __init__(self, width=None, height=None, background=None, mode="RGBA", ppi=300, preset=None, defer_text=True, tilesize=1024):
+        """
+        Creates a new blank tiled canvas. Takes the same parameters as Canvas, plus:
+
+        - *tilesize* (optional):
+            The pixel width and height of each tile, or a (width,height) tuple. Defaults to 1024.
+        """
+        # maybe use image size preset
+        if not (width and height):
+            if preset:
+                if preset == "A4":
+                    width,height = "210mm","297mm"
+            else:
+                raise Exception("Canvas must be initiated with a width and height, or using the preset option")
+
+        # unless specified, interpret width and height as pixels
+        width = units.parse_dist(width, default_unit="px", ppi=ppi)
+        height = units.parse_dist(height, default_unit="px", ppi=ppi)
+        self._size = int(round(width)),int(round(height))
+
+        if isinstance(tilesize, (int,float)):
+            tilesize = (tilesize,tilesize)
+        self.tilesize = tuple(map(int, tilesize))
+        self.operations = []
+        self._recordstate = None
+
+        # only a tiny placeholder image, the real image is rendered one tile at a time
+        Canvas.__init__(self, 1, 1, background=background, mode=mode, ppi=ppi, defer_text=defer_text)
+
+    @property
+    def width(self):
+        return self._size[0]
+
+    @property
+    def height(self):
+        return self._size[1]
+
+    @property
+    def mode(self):
+        return self.img.mode
+
+    # Coordinate system
+
+    def zoom_bbox(self, xmin, ymin, xmax, ymax, lock_ratio=True, fit=True):
+        # only zooms the coordinate system of the drawing that follows,
+        # since the existing image is not held in memory
+        self.flush()
+        xleft,ytop,xright,ybottom = self._zoom_coords(xmin, ymin, xmax, ymax, lock_ratio, fit)
+        self.custom_space(xleft, ytop, xright, ybottom, lock_ratio=False)
+
+    # Drawing
+
+    def draw_circle(self, xy=None, bbox=None, flatratio=1, **options):
+        self._record("draw_circle", xy=xy, bbox=bbox, flatratio=flatratio, **self._record_options(options))
+
+    def draw_triangle(self, xy=None, bbox=None, flatratio=3.0/4.0, direction=0, **options):
+        self._record("draw_triangle", xy=xy, bbox=bbox, flatratio=flatratio, direction=direction, **self._record_options(options))
+
+    def draw_pie(self, xy, startangle, endangle, **options):
+        self._record("draw_pie", xy, startangle, endangle, **self._record_options(options))
+
+    def draw_box(self, xy=None, bbox=None, flatratio=1, **options):
+        self._record("draw_box", xy=xy, bbox=bbox, flatratio=flatratio, **self._record_options(options))
+
+    def draw_points(self, xys, shape="circle", flatratio=None, **options):
+        self._record("draw_points", xys, shape=shape, flatratio=flatratio, **self._record_options(options))
+
+    def draw_line(self, coords, smooth=False, volume=None, start="flat", end="flat", simplify=None, join="miter", **options):
+        if volume:
+            parse = self.parse_relative_dist
+            if hasattr(volume, "__call__"):
+                func = volume
+                volume = lambda prog, x, y: parse(func(prog, x, y))
+            else:
+                volume = [parse(val) for val in volume]
+        self._record("draw_line", coords, smooth=smooth, volume=volume, start=start, end=end,
+                     simplify=simplify, join=join, **self._record_options(options))
+
+    def draw_polygon(self, coords, holes=[], cull=True, clip=False, simplify=None, **options):
+        self._record("draw_polygon", coords, holes=holes, cull=cull, clip=clip, simplify=simplify,
+                     **self._record_options(options))
+
+    def draw_geojson(self, geojobj, cull=True, clip=False, simplify=None, **options):
+        # each tile culls the shapes outside itself
+        self._record("draw_geojson", geojobj, cull=cull, clip=clip, simplify=simplify,
+                     **self._record_options(options))
+
+    def draw_geojson_collection(self, features, style=None, cull=True, clip=False, simplify=None, **options):
+        # decide the style of each feature now, same as if drawn on a regular canvas
+        if isinstance(features, dict) and features.get("type") == "FeatureCollection":
+            features = features["features"]
+        features = [feat if isinstance(feat, dict) else feat.__geo_interface__
+                    for feat in features]
+        resolved = dict()
+        def resolve(featurestyle):
+            if not isinstance(featurestyle, Style):
+                merged = dict(options)
+                merged.update(featurestyle or {})
+                featurestyle = self.make_style(**merged)
+            elif options:
+                featurestyle = self._check_options(dict(options, style=featurestyle))
+            if featurestyle not in resolved:
+                resolved[featurestyle] = featurestyle.to_options(resolve_sizes=True)
+            return resolved[featurestyle]
+        if hasattr(style, "__call__"):
+            featurestyles = []
+            for feat in features:
+                featurestyle = style(feat)
+                featurestyles.append(resolve(featurestyle) if featurestyle is not None else None)
+            stylelookup = dict(zip(map(id, features), featurestyles))
+            style = lambda feat: stylelookup[id(feat)]
+        else:
+            style = resolve(style)
+        self._record("draw_geojson_collection", features, style=style, cull=cull, clip=clip, simplify=simplify)
+
+    def draw_gradient(self, line, gradient, width, steps=None, **options):
+        if options.get("outlinewidth") is not None:
+            options["outlinewidth"] = self.parse_relative_dist(options["outlinewidth"])
+        self._record("draw_gradient", line, gradient, self.parse_relative_dist(width), steps, **options)
+
+    def draw_grid(self, xinterval, yinterval, xminor=None, yminor=None, origin=(0,0),
+                  labels=False, labelformat=None, labeloptions=None, minoroptions=None, **options):
+        # each tile draws the grid lines within itself, but the labels go along the edges of the full canvas
+        options.setdefault("fillsize", "1px")
+        options.setdefault("fillcolor", "black")
+        options = self._record_options(options)
+        if minoroptions and minoroptions.get("fillsize") is not None:
+            minoroptions = dict(minoroptions, fillsize=self.parse_relative_dist(minoroptions["fillsize"]))
+        self._record("draw_grid", xinterval, yinterval, xminor=xminor, yminor=yminor, origin=origin,
+                     minoroptions=minoroptions, **options)
+        if labels:
+            xmin,ymin,xmax,ymax = self._view_bbox()
+            xs = _grid_positions(xmin, xmax, xinterval, origin[0])
+            ys = _grid_positions(ymin, ymax, yinterval, origin[1])
+            self._draw_grid_labels(xs, ys, xinterval, yinterval, origin, labelformat, labeloptions)
+
+    def draw_text(self, text, xy=None, bbox=None, rotate=None, **options):
+        options = options.copy()
+        resolved = self._check_text_options(options)
+        textsize = resolved["textsize"]
+        if not resolved.get("textsize_is_internal"):
+            textsize *= self.ppi / 97.0 # same as in Canvas.draw_text()
+        options["textsize"] = textsize
+        options["textsize_is_internal"] = True
+        for key in ("xoffset","yoffset","outlinewidth"):
+            if options.get(key) is not None:
+                options[key] = self.parse_relative_dist(options[key])
+        for key in ("padx","pady"):
+            # relative to the text box, so only need to decide the unit
+            if key in options and not isinstance(options[key], basestring):
+                options[key] = "%s%s" % (options[key], self.default_unit)
+        self._record("draw_text", text, xy=xy, bbox=bbox, rotate=rotate, **options)
+
+    def paste(self, image, xy=(0,0), bbox=None, lock_ratio=True, fit=True, anchor="nw", outlinewidth=None, outlinecolor="black"):
+        # decide the pixel location and size now, and paste the overlapping part into each tile
+        if isinstance(image, Canvas): image = image.get_image()
+        
+        if bbox:
+            x1,y1,x2,y2 = bbox
+            x1,y1 = self.coord2pixel(x1,y1)
+            x2,y2 = self.coord2pixel(x2,y2)
+            bbwidth = abs(x2 - x1)
+            bbheight = abs(y2 - y1)
+            image = from_image(image).resize(bbwidth,bbheight,lock_ratio=lock_ratio,fit=fit).img
+            x,y = min(x1,x2),min(y1,y2)
+
+        else:
+            x,y = self._paste_xy(image, xy, anchor)
+            width,height = image.size
+            bbox = [x, y, x+width, y+height]
+
+        self.operations.append(("paste", (image, (x,y)), None))
+
+        # outline
+        if outlinewidth and outlinecolor:
+            self.draw_box(bbox=bbox, fillcolor=None, outlinewidth=outlinewidth, outlinecolor=outlinecolor)
+
+        return self
+
+    def paste_many(self, items, anchor="nw"):
+        for image,xy in items:
+            self.paste(image, xy, anchor=anchor)
+        return self
+
+    # Rendering
+
+    def render_region(self, x, y, width, height):
+        """
+        Renders part of the image by replaying all recorded drawing operations.
+
+        Parameters:
+
+        - *x*: The pixel x-coordinate of the upper left corner of the region.
+        - *y*: The pixel y-coordinate of the upper left corner of the region.
+        - *width*: The pixel width of the region.
+        - *height*: The pixel height of the region.
+
+        Returns:
+
+        - A regular Canvas instance of the given size containing that part of the image.
+        """
+        tile = Canvas(width, height, background=self.background, mode=self.mode, ppi=self.ppi,
+                      defer_text=self.defer_text)
+        tile.textoptions = self.textoptions.copy()
+        tile.default_unit = "px" # sizes have already been converted to pixels
+        for name,args,kwargs in self.operations:
+            if name == "coordspace":
+                # offset the coordinate system to the tile
+                a,b,c,d,e,f = args
+                _set_transform(tile, (a, b, c - x, d, e, f - y))
+            elif name == "paste":
+                image,(px,py) = args
+                if px < x + width and py < y + height and \
+                   px + image.size[0] > x and py + image.size[1] > y:
+                    tile.paste(image, xy=(px - x, py - y), anchor="nw")
+            else:
+                getattr(tile, name)(*args, **kwargs)
+        tile.flush()
+        return tile
+
+    def iter_tiles(self):
+        """
+        Renders the image one tile at a time, row by row.
+
+        Returns:
+
+        - A generator yielding (x, y, image) tuples for each tile, where x and y are the pixel
+            location of the tile's upper left corner and image is the rendered PIL image.
+        """
+        tilewidth,tileheight = self.tilesize
+        for y in range(0, self.height, tileheight):
+            for x in range(0, self.width, tilewidth):
+                width = min(tilewidth, self.width - x)
+                height = min(tileheight, self.height - y)
+                yield x, y, self.render_region(x, y, width, height).get_image()
+
+    def get_image(self):
+        """
+        Renders and returns the full image. Note that this requires enough memory to hold
+        the full image; to avoid this, use save() with a PNG file or iter_tiles().
+
+        Returns:
+
+        - A PIL image.
+        """
+        return self.render_region(0, 0, self.width, self.height).get_image()
+
+    def save(self, filepath):
+        """
+        Renders the image and saves it to a file. PNG files are written one row of tiles at
+        a time, so only one row of tiles is held in memory. Other file types require
+        rendering the full image in memory.
+
+        Parameters:
+
+        - *filepath*: The filepath to save the image, including the file type extension.
+        """
+        if filepath.lower().endswith(".png"):
+            with open(filepath, "wb") as fileobj:
+                self._write_png(fileobj)
+        else:
+            self.get_image().save(filepath)
+
+    def flush(self):
+        """
+        Same as Canvas.flush(), each tile draws any deferred text before the operations that follow.
+        """
+        self._record("flush")
+
+    def clear(self):
+        """
+        Clears any drawing done on the canvas.
+        """
+        self.operations = []
+        self._recordstate = None
+
+    # Internal only
+
+    def _record(self, name, *args, **kwargs):
+        # remember the coordinate system if it has changed since the last operation
+        state = tuple(self.coordspace_transform)
+        if state != self._recordstate:
+            self.operations.append(("coordspace", state, None))
+            self._recordstate = state
+        self.operations.append((name, args, kwargs))
+
+    def _record_options(self, options):
+        # convert sizes to pixels and decide random colors, relative to the full canvas
+        options = options.copy()
+        style = options.pop("style", None)
+        if style is not None:
+            styleoptions = style.to_options(resolve_sizes=True)
+            styleoptions.update(options)
+            options = styleoptions
+        for key in SIZEOPTIONS:
+            val = options.get(key)
+            if val is None:
+                continue
+            if not isinstance(val, basestring) and hasattr(val, "__iter__"):
+                options[key] = list(units.parse_dists(val,
+                                                      ppi=self.ppi,
+                                                      default_unit=self.default_unit,
+                                                      canvassize=[self.width,self.height],
+                                                      coordsize=[self.coordspace_width,self.coordspace_height]))
+            else:
+                options[key] = self.parse_relative_dist(val)
+        # the defaults are also relative to the full canvas
+        if "fillsize" not in options:
+            options["fillsize"] = self.parse_relative_dist("0.7%min")
+        if "outlinewidth" not in options:
+            options["outlinewidth"] = self.parse_relative_dist("0.07%min")
+        if "fillcolor" not in options:
+            options["fillcolor"] = tuple([random.randrange(0,255) for _ in range(3)])
+        return options
+
+    def _write_png(self, fileobj):
+        # streams the image to a png file one row of tiles at a time
+        mode = self.mode
+        if mode not in PNGCOLORTYPES:
+            raise Exception("Cannot write PNG files for image mode %s" % mode)
+
+        def chunk(chunktype, data):
+            fileobj.write(struct.pack(">I", len(data)))
+            fileobj.write(chunktype)
+            fileobj.write(data)
+            fileobj.write(struct.pack(">I", zlib.crc32(chunktype + data) & 0xffffffff))
+
+        fileobj.write(b"\x89PNG\r\n\x1a\n")
+        chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, PNGCOLORTYPES[mode], 0, 0, 0))
+
+        compressor = zlib.compressobj(6)
+        tilewidth,tileheight = self.tilesize
+        rowsize = self.width * len(mode)
+        for y in range(0, self.height, tileheight):
+            height = min(tileheight, self.height - y)
+            band = PIL.Image.new(mode, (self.width, height))
+            for x in range(0, self.width, tilewidth):
+                width = min(tilewidth, self.width - x)
+                band.paste(self.render_region(x, y, width, height).get_image(), (x, 0))
+            data = band.tobytes()
+            del band
+            # each row starts with the filter type, here no filtering
+            rows = b"".join(b"\x00" + data[i:i+rowsize] for i in range(0, len(data), rowsize))
+            compressed = compressor.compress(rows)
+            if compressed:
+                chunk(b"IDAT", compressed)
+        chunk(b"IDAT", compressor.flush())
+        chunk(b"IEND", b"")
+
+
+
+def _set_transform(canvas, transform):
+    # sets the coordinate system of a canvas directly from its affine transform
+    canvas.coordspace_transform = transform
+    x1,y1 = canvas.pixel2coord(0, 0)
+    x2,y2 = canvas.pixel2coord(canvas.width, canvas.height)
+    canvas.coordspace_bbox = [x1,y1,x2,y2]
+    canvas.drawer.settransform(transform)
+
+def _unsupported(name):
+    def method(self, *args, **kwargs):
+        raise Exception("TiledCanvas does not support %s(), since the full image is never held in memory" % name)
+    method.__name__ = name
+    return method
+
+for _name in ("copy", "resize", "rotate", "skew", "flip", "move", "crop", "expand",
+              "brightness", "contrast", "blur", "sharpen", "equalize", "invert",
+              "transparency", "transparent_color", "replace_color", "color_tint",
+              "color_remap", "grid_paste", "warp", "draw_line2", "get_tkimage", "view"):
+    setattr(TiledCanvas, _name, _unsupported(_name))
@@ -1,142 +1,74 @@
 """
 Parses distances formatted as strings with a unit suffix, converting them
 to pixels.
-Mostly used internally. 
+Mostly used internally.
 """
 
+import re
+from array import array
+
+from . import cachehelper
+
 # PY3 fix
-try: 
+try:
     basestring
 except NameError:
     basestring = (bytes,str) # PY3
 
-    
-
-def px_to_px(diststring):
-    diststring = diststring.replace("px", "")
-    pixels = eval(diststring)
-    return pixels
-
-def pt_to_px(diststring, ppi):
-    diststring = diststring.replace("pt", "")
-    point = eval(diststring)
-    inches = point / 72.0 # a type point is one 72th of an inch
-    pixels = inches * ppi
-    return pixels
-
-def in_to_px(diststring, ppi):
-    diststring = diststring.replace("in", "")
-    inches = eval(diststring)
-    pixels = inches * ppi
-    return pixels
-
-def mm_to_px(diststring, ppi):
-    diststring = diststring.replace("mm", "")
-    mm = eval(diststring)
-    inches = mm * 0.0393700787
-    pixels = inches * ppi
-    return pixels
-
-def cm_to_px(diststring, ppi):
-    diststring = diststring.replace("cm", "")
-    cm = eval(diststring)
-    inches = cm * 0.393700787
-    pixels = inches * ppi
-    return pixels
-
-def percwidth_to_px(diststring, width):
-    diststring = diststring.replace("%w", "")
-    perc = float(diststring)
-    pixels = width / 100.0 * perc
-    return pixels
-
-def percheight_to_px(diststring, height):
-    diststring = diststring.replace("%h", "")
-    perc = float(diststring)
-    pixels = height / 100.0 * perc
-    return pixels
-
-def percmin_to_px(diststring, width, height):
-    diststring = diststring.replace("%min", "")
-    perc = float(diststring)
-    min_ = min([width,height])
-    pixels = min_ / 100.0 * perc
-    return pixels
+# Splits a distance string into its number and unit suffix
+DISTPATTERN = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-z%]*)\s*$")
+INTPATTERN = re.compile(r"^\s*[-+]?\d+\s*$")
 
-def percmax_to_px(diststring, width, height):
-    diststring = diststring.replace("%max", "")
-    perc = float(diststring)
-    max_ = max([width,height])
-    pixels = max_ / 100.0 * perc
-    return pixels
+# Remembers the most recently parsed distances
+CACHE = cachehelper.LRUCache(maxsize=4096)
 
-def x_to_px(diststring, width, coordwidth):
-    diststring = diststring.replace("x", "")
-    x = eval(diststring)
-    relx = x / float(coordwidth)
-    pixels = width * relx
-    return pixels
 
-def y_to_px(diststring, height, coordheight):
-    diststring = diststring.replace("y", "")
-    y = eval(diststring)
-    rely = y / float(coordheight)
-    pixels = height * rely
-    return pixels
 
-def px_to_x(columndist, width, coordwidth):
-    relcol = columndist / float(width)
-    x = coordwidth * relcol
-    return x
+# Internals only
 
-def px_to_y(rowdist, height, coordheight):
-    relrow = rowdist / float(height)
-    y = coordheight * relrow
-    return y
+def _split(diststring):
+    # returns the number and unit of a distance string
+    match = DISTPATTERN.match(diststring)
+    if not match:
+        raise Exception("Unable to parse distance string: %s" % diststring)
+    numstring,unit = match.groups()
+    if INTPATTERN.match(numstring):
+        num = int(numstring)
+    else:
+        num = float(numstring)
+    return num,unit
 
-##def x_to_px(diststring, x2px_func):
-##    diststring = diststring.replace("x", "")
-##    xdist = eval(diststring)
-##    pixels = x2px_func(xdist)
-##    return pixels
-##
-##def y_to_px(diststring, y2px_func):
-##    diststring = diststring.replace("y", "")
-##    ydist = eval(diststring)
-##    pixels = y2px_func(ydist)
-##    return pixels
+def _parse_number(diststring, unit):
+    # returns the number of a distance string with a known unit suffix
+    num,_ = _split(diststring.replace(unit, ""))
+    return num
 
-def parse_diststring(diststring, ppi=None, canvassize=None, coordsize=None):
-    """
-    Assuming distances are formatted as strings with a unit suffix, converts them
-    to pixels. 
-    """
-    unit = diststring.lstrip('0123456789.-')
-    
+def _convert(num, unit, ppi=None, canvassize=None, coordsize=None):
+    # converts a number in the given unit to pixels
     if unit == "px":
-        return px_to_px(diststring)
+        return num
 
     elif unit == "pt":
-        return pt_to_px(diststring, ppi)
+        return num / 72.0 * ppi # a type point is one 72th of an inch
 
     elif unit == "in":
-        return in_to_px(diststring, ppi)
+        return num * ppi
 
     elif unit == "mm":
-        return mm_to_px(diststring, ppi)
+        return num * 0.0393700787 * ppi
 
     elif unit == "cm":
-        return cm_to_px(diststring, ppi)
+        return num * 0.393700787 * ppi
 
     elif unit == "x":
         width, height = canvassize
         coordwidth, coordheight = coordsize
-        return x_to_px(diststring, width, coordwidth)
+        return width * (num / float(coordwidth))
 
     elif unit == "y":
         width, height = canvassize
         coordwidth, coordheight = coordsize
-        return y_to_px(diststring, height, coordheight)
+        return height * (num / float(coordheight))
 
     elif "%" in unit:
         # Somehow get size of canvas object and calculate percent of that
@@ -146,48 +78,143 @@ def parse_diststring(diststring, ppi=None, canvassize=None, coordsize=None):
         # At least should have "%w" and "%h", or automatic determine if just "%"
         width, height = canvassize
         if unit == "%w":
-            return percwidth_to_px(diststring, width)
+            return width / 100.0 * num
         elif unit == "%h":
-            return percheight_to_px(diststring, height)
+            return height / 100.0 * num
         elif unit == "%min":
-            return percmin_to_px(diststring, width, height)
+            return min([width,height]) / 100.0 * num
         elif unit == "%max":
-            return percmax_to_px(diststring, width, height)
+            return max([width,height]) / 100.0 * num
         else:
             raise Exception("Percent distances must by %w, %h, %min, or %max, and should be determined relative x or y axis in advance")
 
     else:
-        raise Exception("Unable to parse distance string: %s" % diststring)
+        raise Exception("Unable to parse distance unit: %s" % unit)
+
+def _cachekey(dist, ppi, default_unit, canvassize, coordsize):
+    if canvassize is not None: canvassize = tuple(canvassize)
+    if coordsize is not None: coordsize = tuple(coordsize)
+    return (dist, ppi, default_unit, canvassize, coordsize)
+
+
+
+# Unit converters
+
+def px_to_px(diststring):
+    pixels = _parse_number(diststring, "px")
+    return pixels
+
+def pt_to_px(diststring, ppi):
+    point = _parse_number(diststring, "pt")
+    return _convert(point, "pt", ppi)
+
+def in_to_px(diststring, ppi):
+    inches = _parse_number(diststring, "in")
+    return _convert(inches, "in", ppi)
+
+def mm_to_px(diststring, ppi):
+    mm = _parse_number(diststring, "mm")
+    return _convert(mm, "mm", ppi)
+
+def cm_to_px(diststring, ppi):
+    cm = _parse_number(diststring, "cm")
+    return _convert(cm, "cm", ppi)
+
+def percwidth_to_px(diststring, width):
+    perc = _parse_number(diststring, "%w")
+    return _convert(perc, "%w", canvassize=(width,None))
+
+def percheight_to_px(diststring, height):
+    perc = _parse_number(diststring, "%h")
+    return _convert(perc, "%h", canvassize=(None,height))
+
+def percmin_to_px(diststring, width, height):
+    perc = _parse_number(diststring, "%min")
+    return _convert(perc, "%min", canvassize=(width,height))
+
+def percmax_to_px(diststring, width, height):
+    perc = _parse_number(diststring, "%max")
+    return _convert(perc, "%max", canvassize=(width,height))
+
+def x_to_px(diststring, width, coordwidth):
+    x = _parse_number(diststring, "x")
+    return _convert(x, "x", canvassize=(width,None), coordsize=(coordwidth,None))
+
+def y_to_px(diststring, height, coordheight):
+    y = _parse_number(diststring, "y")
+    return _convert(y, "y", canvassize=(None,height), coordsize=(None,coordheight))
+
+def px_to_x(columndist, width, coordwidth):
+    relcol = columndist / float(width)
+    x = coordwidth * relcol
+    return x
+
+def px_to_y(rowdist, height, coordheight):
+    relrow = rowdist / float(height)
+    y = coordheight * relrow
+    return y
+
+
+
+# User functions
+
+def parse_diststring(diststring, ppi=None, canvassize=None, coordsize=None):
+    """
+    Assuming distances are formatted as strings with a unit suffix, converts them
+    to pixels. Results are cached, so parsing the same distance again is fast.
+    """
+    key = _cachekey(diststring, ppi, None, canvassize, coordsize)
+    pixels = CACHE.get(key)
+    if pixels is None:
+        num,unit = _split(diststring)
+        pixels = _convert(num, unit, ppi, canvassize, coordsize)
+        CACHE.put(key, pixels)
+    return pixels
 
 def parse_dist(dist, ppi=None, default_unit=None, canvassize=None, coordsize=None):
     """
     Includes preprocessing step that makes sure the distance is formatted as a
     unit string before it converts it to pixels with the parse_diststring() method.
-    Can be either nr in text, or pure nr. 
+    Can be either nr in text, or pure nr.
+    """
+    if isinstance(dist, basestring):
+        key = _cachekey(dist, ppi, default_unit, canvassize, coordsize)
+        pixels = CACHE.get(key)
+        if pixels is None:
+            num,unit = _split(dist)
+            # if no unit was specified, use default unit of the canvas
+            # ...which should be supplied from the canvas.default_unit attribute
+            # ...as set by canvas.set_default_unit("cm")
+            pixels = _convert(num, unit or default_unit, ppi, canvassize, coordsize)
+            CACHE.put(key, pixels)
+    else:
+        # pure nr, no need to parse or cache
+        pixels = _convert(dist, default_unit, ppi, canvassize, coordsize)
+    return pixels
+
+def parse_dists(dists, ppi=None, default_unit=None, canvassize=None, coordsize=None):
     """
-    
-    try:
-        # if no unit was specified, use default unit of the canvas
-        # ...which should be supplied from the canvas.default_unit attribute
-        # ...as set by canvas.set_default_unit("cm")
-        float(dist)
-        diststring = str(dist)
-        diststring += default_unit
-
-    except:
-        diststring = dist
-
-    pixels = parse_diststring(diststring, ppi, canvassize, coordsize)
+    Same as parse_dist(), but converts a whole sequence of distances to pixels at once.
+    Returns an array of float pixel values, or a NumPy float array if the input is
+    a NumPy array.
+    """
+    if not isinstance(dists, basestring) and type(dists).__module__ == "numpy" \
+       and dists.dtype.kind in "iuf":
+        # numeric numpy array, all units are linear so multiply with the pixel size of 1 unit
+        factor = parse_dist(1.0, ppi, default_unit, canvassize, coordsize)
+        return dists * factor
+    pixels = array("d", (parse_dist(dist, ppi, default_unit, canvassize, coordsize)
+                         for dist in dists))
     return pixels
 
 def split_unit(value_or_str):
+    """
+    Splits a distance string into its number and unit suffix, eg "2cm"
+    becomes (2, "cm"). Non-string values are returned with a unit of None.
+    """
     if isinstance(value_or_str, basestring):
-        # from right to left, find index of first digit
-        for i,val in reversed(enumerate(value_or_str)):
-            if val.isdigit():
-                break
-        # return everything from left up to that point
-        return eval(value_or_str[:i]), value_or_str[i:]
+        num,unit = _split(value_or_str)
+        return num, unit or None
     else:
         return value_or_str, None
 
@@ -0,0 +1,142 @@
+import unittest
+
+import PIL, PIL.Image, PIL.ImageEnhance, PIL.ImageOps
+
+import pyagg
+from pyagg import colorhelper
+
+def matches(pixel, color, tolerance, metric):
+    # the expected result of a color match, one pixel at a time
+    diffs = [abs(v - c) for v,c in zip(pixel[:3], color)]
+    if metric == 'average':
+        return sum(diffs) / 3.0 <= 255 * tolerance
+    elif metric == 'euclidean':
+        return sum(d*d for d in diffs) ** 0.5 <= 255 * tolerance
+    else:
+        return max(diffs) <= 255 * tolerance
+
+def make_image():
+    img = PIL.Image.new('RGBA', (64, 64))
+    img.putdata([(x*4, y*4, (x*y) % 256, 255) for y in range(64) for x in range(64)])
+    return img
+
+class TestColorMask(unittest.TestCase):
+
+    def check(self, tolerance, metric):
+        img = make_image()
+        color = (100, 120, 60)
+        mask = colorhelper.color_mask(img, color, tolerance, metric)
+        self.assertEqual(mask.mode, 'L')
+        expected = [255 if matches(pixel, color, tolerance, metric) else 0 for pixel in img.getdata()]
+        self.assertEqual(list(mask.getdata()), expected)
+
+    def test_exact(self):
+        for metric in colorhelper.METRICS:
+            self.check(0, metric)
+
+    def test_small_tolerance(self):
+        for metric in colorhelper.METRICS:
+            self.check(0.05, metric)
+
+    def test_large_tolerance(self):
+        for metric in colorhelper.METRICS:
+            self.check(0.3, metric)
+            self.check(1, metric)
+
+    def test_strips(self):
+        # the same when matched a few rows at a time
+        chunksize = colorhelper.CHUNKSIZE
+        colorhelper.CHUNKSIZE = 64 * 5
+        try:
+            self.check(0.3, 'euclidean')
+            self.check(0.05, 'average')
+        finally:
+            colorhelper.CHUNKSIZE = chunksize
+
+    def test_rgb(self):
+        img = make_image()
+        mask = colorhelper.color_mask(img.convert('RGB'), (100, 120, 60), 0.1)
+        self.assertEqual(list(mask.getdata()), list(colorhelper.color_mask(img, (100, 120, 60), 0.1).getdata()))
+
+    def test_metric(self):
+        self.assertRaises(Exception, colorhelper.color_mask, make_image(), (0,0,0), 0.1, 'manhattan')
+
+class TestCanvasColors(unittest.TestCase):
+
+    def test_transparent_color(self):
+        canvas = pyagg.Canvas(100, 100, background=(255,255,255,128))
+        canvas.draw_box(bbox=[0,0,50,100], fillcolor=(250,0,0), outlinecolor=None)
+        canvas.transparent_color((255,0,0), tolerance=0.05, metric='channel')
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((10,50))[3], 0)
+        # other pixels keep their transparency
+        self.assertEqual(img.getpixel((90,50)), (255,255,255,128))
+
+    def test_replace_color(self):
+        canvas = pyagg.Canvas(100, 100, background='white')
+        canvas.draw_box(bbox=[0,0,50,100], fillcolor=(250,0,0), outlinecolor=None)
+        canvas.replace_color((255,0,0), (0,0,255), tolerance=0.05)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((10,50)), (0,0,255,255))
+        self.assertEqual(img.getpixel((90,50)), (255,255,255,255))
+
+class TestAdjustments(unittest.TestCase):
+
+    def canvas(self, mode='RGB'):
+        canvas = pyagg.Canvas(120, 80, background='white', mode=mode)
+        canvas.draw_box(bbox=[0,0,60,80], fillcolor=(200,50,10), outlinecolor=None)
+        canvas.draw_circle(xy=(70,40), fillsize=30, fillcolor=(20,90,160,200), outlinecolor=None)
+        return canvas
+
+    def test_same_as_pil(self):
+        canvas = self.canvas()
+        img = canvas.get_image().copy()
+        canvas.brightness(1.3).contrast(0.7).invert().brightness(0.9)
+        expected = PIL.ImageEnhance.Brightness(img).enhance(1.3)
+        expected = PIL.ImageEnhance.Contrast(expected).enhance(0.7)
+        expected = PIL.ImageOps.invert(expected)
+        expected = PIL.ImageEnhance.Brightness(expected).enhance(0.9)
+        self.assertEqual(list(canvas.get_image().getdata()), list(expected.getdata()))
+
+    def test_many_colors(self):
+        # too many colors to find the mean contrast color without applying the brightness first
+        img = make_image().convert('RGB').resize((300, 300))
+        canvas = pyagg.canvas.from_image(img.copy())
+        canvas.brightness(1.2).contrast(1.5)
+        expected = PIL.ImageEnhance.Contrast(PIL.ImageEnhance.Brightness(img).enhance(1.2)).enhance(1.5)
+        self.assertEqual(list(canvas.get_image().getdata()), list(expected.getdata()))
+
+    def test_lazy(self):
+        canvas = self.canvas('RGBA')
+        img = canvas.get_image()
+        canvas.brightness(0.5).invert().transparency(100)
+        # nothing is applied until the image is needed
+        self.assertIs(canvas._img, img)
+        self.assertEqual(canvas.get_image().getpixel((10,10)), (155,230,250,100))
+
+    def test_img_attribute(self):
+        # reading the image directly also applies the pending adjustments
+        canvas = self.canvas('RGBA')
+        canvas.transparency(100)
+        self.assertEqual(canvas.img.getpixel((10,10))[3], 100)
+        self.assertIsNone(canvas._adjustments)
+
+    def test_draw_after(self):
+        # drawing is not affected by earlier adjustments
+        canvas = self.canvas()
+        canvas.invert()
+        canvas.draw_box(bbox=[0,0,20,20], fillcolor=(10,20,30), outlinecolor=None)
+        canvas.invert()
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((10,10)), (245,235,225))
+        self.assertEqual(img.getpixel((10,60)), (200,50,10))
+
+    def test_text(self):
+        canvas = pyagg.Canvas(100, 100, background='white', mode='RGB')
+        canvas.draw_text('X', xy=(50,50), textsize=40, textcolor=(0,0,0))
+        canvas.invert()
+        self.assertEqual(canvas.get_image().getpixel((0,0)), (0,0,0))
+        self.assertIn((255,255,255), [color for count,color in canvas.get_image().getcolors(10000)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import random
+import os
+import tempfile
+import pickle
+
+import pyagg
+from pyagg import displaylist
+
+# drawing
+
+def draw(canvas):
+    random.seed(1)
+    canvas.geographic_space()
+    for _ in range(30):
+        x,y = random.uniform(-170,170), random.uniform(-80,80)
+        canvas.draw_circle(xy=(x,y), fillsize='2%w')
+        canvas.draw_polygon([(x,y),(x+30,y),(x+15,y+20)], fillcolor=(0,0,255,100))
+    canvas.draw_line([(-100,-50),(0,0),(100,-50)], fillsize='1%w', fillcolor='red')
+    canvas.draw_points([(10,10),(20,20)], fillsize='1%w', fillcolor='green')
+    canvas.draw_text('Replay', xy=(0,0), textsize=20)
+    canvas.draw_geojson({'type':'Polygon', 'coordinates':[[(-50,-50),(50,-50),(50,50),(-50,50),(-50,-50)],
+                                                           [(-10,-10),(10,-10),(10,10),(-10,10),(-10,-10)]]},
+                        fillcolor=(255,0,0,100))
+    features = [{'type':'Feature', 'properties':{'n':i},
+                 'geometry':{'type':'Point', 'coordinates':(i*10, i*5)}}
+                for i in range(10)]
+    canvas.draw_geojson_collection(features, style=lambda f: {'fillcolor':(f['properties']['n']*20,0,0)})
+
+class TestDisplayList(unittest.TestCase):
+
+    def test_replay_same_as_drawing(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        draw(canvas)
+        recording = pyagg.Canvas(300, 200, background='white')
+        dlist = recording.start_recording()
+        draw(recording)
+        self.assertIs(recording.stop_recording(), dlist)
+        replayed = dlist.replay(pyagg.Canvas(300, 200, background='white'))
+        expected = list(canvas.get_image().getdata())
+        self.assertEqual(list(recording.get_image().getdata()), expected)
+        self.assertEqual(list(replayed.get_image().getdata()), expected)
+
+    def test_random_colors(self):
+        # default colors are decided when recorded, not when replayed
+        canvas = pyagg.Canvas(100, 100, background='white')
+        dlist = canvas.start_recording()
+        canvas.draw_circle(xy=(50,50), fillsize='20%w')
+        canvas.stop_recording()
+        img1 = dlist.replay(pyagg.Canvas(100, 100, background='white')).get_image()
+        img2 = dlist.replay(pyagg.Canvas(100, 100, background='white')).get_image()
+        self.assertEqual(list(img1.getdata()), list(img2.getdata()))
+
+    def test_replay_other_size(self):
+        canvas = pyagg.Canvas(600, 400, background='white')
+        draw(canvas)
+        recording = pyagg.Canvas(300, 200, background='white')
+        dlist = recording.start_recording(draw=False)
+        draw(recording)
+        recording.stop_recording()
+        replayed = dlist.replay(pyagg.Canvas(600, 400, background='white'))
+        self.assertEqual(list(replayed.get_image().getdata()), list(canvas.get_image().getdata()))
+
+    def test_no_draw(self):
+        canvas = pyagg.Canvas(100, 100, background='white')
+        dlist = canvas.start_recording(draw=False)
+        draw(canvas)
+        canvas.stop_recording()
+        self.assertTrue(len(dlist))
+        self.assertEqual(canvas.get_image().getcolors(), [(100*100, (255,255,255,255))])
+        # coordinate changes still take effect
+        self.assertEqual(canvas.coordspace_bbox[0], -180)
+
+    def test_compact(self):
+        canvas = pyagg.Canvas(100, 100)
+        dlist = canvas.start_recording(draw=False)
+        draw(canvas)
+        canvas.stop_recording()
+        ops = [name for name,args,kwargs in dlist]
+        self.assertEqual(ops[0], 'geographic_space')
+        # geojson is recorded as the shapes it draws, and the collection as a single operation
+        self.assertEqual(ops[-2], 'draw_polygon')
+        self.assertEqual(ops[-1], 'draw_geojson_collection')
+        self.assertTrue(all(isinstance(args[0], displaylist.CoordRef)
+                            for name,args,kwargs in dlist if name in displaylist.COORDOPS))
+        # polygon exteriors and holes
+        self.assertEqual(len(dlist.coords), 30*3*2 + 3*2 + 2*2 + 5*2 + 5*2)
+
+    def test_save_load(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        dlist = canvas.start_recording()
+        draw(canvas)
+        canvas.stop_recording()
+        filepath = os.path.join(tempfile.mkdtemp(), 'drawing.pkl')
+        dlist.save(filepath)
+        loaded = displaylist.load(filepath)
+        self.assertEqual(len(loaded), len(dlist))
+        replayed = loaded.replay(pyagg.Canvas(300, 200, background='white'))
+        self.assertEqual(list(replayed.get_image().getdata()), list(canvas.get_image().getdata()))
+
+    def test_pickle_paste(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        dlist = canvas.start_recording()
+        pasted = pyagg.Canvas(50, 50, background='red')
+        canvas.paste(pasted, xy=(10,10))
+        canvas.paste_many([(pasted, (100,10))])
+        canvas.stop_recording()
+        # later drawing on the pasted canvas is not recorded
+        pasted.draw_box(bbox=[0,0,100,100], fillcolor='blue')
+        loaded = pickle.loads(pickle.dumps(dlist))
+        replayed = loaded.replay(pyagg.Canvas(300, 200, background='white'))
+        self.assertEqual(list(replayed.get_image().getdata()), list(canvas.get_image().getdata()))
+        self.assertEqual(replayed.get_image().getpixel((20,20))[:3], (255,0,0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+import pyagg
+from pyagg import fonthelper, cachehelper
+from pyagg import canvas as canvasmodule
+
+class TestFontCache(unittest.TestCase):
+
+    def setUp(self):
+        fonthelper.clear_font_cache()
+
+    def test_load_font(self):
+        path = fonthelper.get_fontpath('DejaVu Sans')
+        font = fonthelper.load_font(path, 20)
+        self.assertIs(fonthelper.load_font(path, 20), font)
+        self.assertIsNot(fonthelper.load_font(path, 21), font)
+        stats = fonthelper.FONTCACHE.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_clear(self):
+        path = fonthelper.get_fontpath('DejaVu Sans')
+        fonthelper.load_font(path, 20)
+        fonthelper.clear_font_cache()
+        self.assertEqual(len(fonthelper.FONTCACHE), 0)
+        self.assertEqual(fonthelper.FONTCACHE.hits, 0)
+
+    def test_draw_text_reuses_fonts(self):
+        canvas = pyagg.Canvas(200, 100)
+        for i in range(20):
+            canvas.draw_text(str(i), xy=(i*10,50), textsize=10)
+        self.assertEqual(fonthelper.FONTCACHE.misses, 1)
+        self.assertEqual(fonthelper.FONTCACHE.hits, 19)
+
+class TestFontSize(unittest.TestCase):
+
+    def setUp(self):
+        fonthelper.clear_font_cache()
+
+    def test_fontmetrics(self):
+        path = fonthelper.get_fontpath('DejaVu Sans')
+        metrics = fonthelper.get_fontmetrics(path)
+        self.assertEqual(metrics['unitsperem'], 2048)
+        self.assertTrue(metrics['ascent'] > 0 > metrics['descent'])
+
+    def test_fontsize_for_height(self):
+        path = fonthelper.get_fontpath('DejaVu Sans')
+        for height in (5, 12, 31, 100):
+            size = fonthelper.fontsize_for_height(path, height)
+            measured = fonthelper.load_font(path, size).getsize('H')[1]
+            self.assertTrue(0.9 <= measured / float(height) <= 1.1)
+
+    def test_relative_textsize(self):
+        # textsize in percent of the canvas is found with a single font load
+        canvas = pyagg.Canvas(1000, 500)
+        options = canvas._check_text_options({'textsize':'10%h'})
+        self.assertEqual(fonthelper.FONTCACHE.misses, 1)
+        path = fonthelper.get_fontpath('DejaVu Sans')
+        measured = fonthelper.load_font(path, options['textsize']).getsize('H')[1]
+        self.assertTrue(45 <= measured <= 55)
+
+    def test_bbox_text(self):
+        canvas = pyagg.Canvas(400, 300)
+        canvas.draw_text('a somewhat long text that needs to be wrapped over several lines',
+                         bbox=[50,50,350,250], textsize=10)
+        # the reference size and the fitted size
+        self.assertTrue(fonthelper.FONTCACHE.misses <= 3)
+        # text is inside the padded bbox
+        xmin,ymin,xmax,ymax = canvas.get_image().convert('L').point(lambda v: 255-v).getbbox()
+        self.assertTrue(xmin >= 50 + 15 and xmax <= 350 - 15)
+        self.assertTrue(ymin >= 50 + 10 and ymax <= 250 - 10)
+        # and fills most of it
+        self.assertTrue(ymax - ymin >= 0.6 * 180)
+
+class TestFontIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.indexpath = os.path.join(self.tempdir, 'cache', 'fontindex.json')
+        self.fontfolder = os.path.join(self.tempdir, 'fonts')
+        os.mkdir(self.fontfolder)
+        self.folders = fonthelper.SYSFONTFOLDERS[fonthelper.OSSYSTEM]
+        fonthelper.SYSFONTFOLDERS[fonthelper.OSSYSTEM] = [self.fontfolder]
+        # count font files read
+        self.read = []
+        self.get_fontname = fonthelper.get_fontname
+        def get_fontname(filepath):
+            self.read.append(filepath)
+            return self.get_fontname(filepath)
+        fonthelper.get_fontname = get_fontname
+
+    def tearDown(self):
+        fonthelper.get_fontname = self.get_fontname
+        fonthelper.SYSFONTFOLDERS[fonthelper.OSSYSTEM] = self.folders
+        fonthelper.load_sysfonts(indexpath=False)
+        shutil.rmtree(self.tempdir)
+
+    def test_lazy_import(self):
+        code = 'import pyagg; from pyagg import fonthelper; print(fonthelper.SYSFONTS is None)'
+        out = subprocess.check_output([sys.executable, '-c', code],
+                                      cwd=os.path.dirname(os.path.dirname(os.path.abspath(pyagg.__file__))))
+        self.assertEqual(out.strip(), b'True')
+
+    def test_index(self):
+        fonts = fonthelper.load_sysfonts(indexpath=self.indexpath)
+        self.assertTrue(os.path.exists(self.indexpath))
+        self.assertTrue(self.read)
+        self.assertTrue('dejavu sans' in fonts)
+        # unchanged files are not read again
+        del self.read[:]
+        self.assertEqual(fonthelper.load_sysfonts(indexpath=self.indexpath), fonts)
+        self.assertEqual(self.read, [])
+
+    def test_index_changed(self):
+        fonthelper.load_sysfonts(indexpath=self.indexpath)
+        # only new font files are read
+        del self.read[:]
+        newpath = os.path.join(self.fontfolder, 'Copy.ttf')
+        shutil.copy(fonthelper.get_fontpath('DejaVu Sans'), newpath)
+        fonthelper.load_sysfonts(indexpath=self.indexpath)
+        self.assertEqual(self.read, [newpath])
+        with open(self.indexpath) as fileobj:
+            index = json.load(fileobj)
+        self.assertEqual(index['files'][newpath]['fontname'], 'DejaVu Sans')
+        # and removed ones are forgotten
+        os.remove(newpath)
+        fonthelper.load_sysfonts(indexpath=self.indexpath)
+        with open(self.indexpath) as fileobj:
+            index = json.load(fileobj)
+        self.assertFalse(newpath in index['files'])
+
+    def test_corrupt_index(self):
+        os.mkdir(os.path.dirname(self.indexpath))
+        with open(self.indexpath, 'w') as fileobj:
+            fileobj.write('{not json')
+        fonts = fonthelper.load_sysfonts(indexpath=self.indexpath)
+        self.assertTrue('dejavu sans' in fonts)
+
+class TestLabelCache(unittest.TestCase):
+
+    def setUp(self):
+        canvasmodule.LABELCACHE.clear()
+
+    def draw(self, canvas):
+        for i in range(10):
+            canvas.draw_text('Label', xy=(10+i*8, 50), textsize=12, textcolor=(i*20,0,0), anchor='center')
+            canvas.draw_text('Label', xy=(10+i*8, 20), textsize=12, rotate=45)
+
+    def test_hits(self):
+        canvas = pyagg.Canvas(200, 100)
+        canvas.percent_space()
+        self.draw(canvas)
+        stats = canvasmodule.LABELCACHE.stats()
+        # one mask for all colors, and one rotated image
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual((stats['hits'], stats['misses']), (18, 2))
+        self.assertTrue(stats['bytes'] > 0)
+
+    def test_same_as_uncached(self):
+        canvas = pyagg.Canvas(200, 100, background='white')
+        canvas.percent_space()
+        self.draw(canvas)
+        canvasmodule.LABELCACHE.maxsize = 0
+        canvasmodule.LABELCACHE.clear()
+        try:
+            uncached = pyagg.Canvas(200, 100, background='white')
+            uncached.percent_space()
+            self.draw(uncached)
+            self.assertEqual(len(canvasmodule.LABELCACHE), 0)
+        finally:
+            canvasmodule.LABELCACHE.maxsize = 4096
+        self.assertEqual(list(canvas.get_image().getdata()), list(uncached.get_image().getdata()))
+
+    def test_maxbytes(self):
+        cache = cachehelper.LRUCache(maxsize=10, maxbytes=100)
+        cache.put('a', 1, nbytes=60)
+        cache.put('b', 2, nbytes=30)
+        cache.put('c', 3, nbytes=30)
+        self.assertFalse('a' in cache)
+        self.assertEqual(cache.nbytes, 60)
+        cache.put('d', 4, nbytes=200)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
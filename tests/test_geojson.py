@@ -0,0 +1,153 @@
+
+import unittest
+import random
+
+import pyagg
+from pyagg import geomhelper
+
+# collections
+
+def square(x, y, size):
+    return [(x,y),(x+size,y),(x+size,y+size),(x,y+size),(x,y)]
+
+class TestGeojsonCollection(unittest.TestCase):
+
+    def create_canvas(self):
+        canvas = pyagg.Canvas(200, 200, background='white')
+        canvas.custom_space(0, 0, 100, 100)
+        return canvas
+
+    def test_grouped(self):
+        canvas = self.create_canvas()
+        features = [{'type':'Feature', 'properties':{'color':color},
+                     'geometry':{'type':'Polygon', 'coordinates':[square(x, 10, 10)]}}
+                    for x,color in [(10,'red'),(30,'blue'),(50,'red')]]
+        features.append({'type':'Feature', 'properties':{'color':'blue'},
+                         'geometry':{'type':'Point', 'coordinates':(80,80)}})
+        groups = canvas.draw_geojson_collection(features,
+                                                style=lambda f: {'fillcolor':f['properties']['color'],
+                                                                 'outlinecolor':None,
+                                                                 'fillsize':'3%w'})
+        self.assertEqual([(g['geometry'],g['features']) for g in groups],
+                         [('polygon',2), ('polygon',1), ('point',1)])
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(15,15))[:3], (255,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(35,15))[:3], (0,0,255))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(55,15))[:3], (255,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(80,80))[:3], (0,0,255))
+        canvas.save('outputs/geojson_collection.png')
+
+    def test_holes(self):
+        canvas = self.create_canvas()
+        # hole with the same ring direction as the exterior
+        poly = {'type':'Polygon', 'coordinates':[square(10, 10, 80), square(40, 40, 20)]}
+        canvas.draw_geojson_collection([poly], style={'fillcolor':'red', 'outlinecolor':None})
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(20,20))[:3], (255,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(50,50))[:3], (255,255,255))
+
+    def test_skip_and_collection(self):
+        canvas = self.create_canvas()
+        collection = {'type':'FeatureCollection',
+                      'features':[{'type':'Feature', 'properties':{'draw':draw},
+                                   'geometry':{'type':'LineString', 'coordinates':[(10,y),(90,y)]}}
+                                  for draw,y in [(True,20),(False,50)]]}
+        groups = canvas.draw_geojson_collection(collection,
+                                                style=lambda f: {'fillcolor':'black', 'fillsize':'2px'} if f['properties']['draw'] else None)
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0]['features'], 1)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(50,20))[:3], (0,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(50,50))[:3], (255,255,255))
+
+# culling
+
+class TestCulling(unittest.TestCase):
+
+    def create_canvas(self):
+        canvas = pyagg.Canvas(200, 200, background='white')
+        canvas.custom_space(0, 0, 100, 100)
+        canvas.zoom_bbox(0, 0, 50, 50)
+        return canvas
+
+    def test_culled(self):
+        canvas = self.create_canvas()
+        inside = {'type':'Polygon', 'coordinates':[square(10, 10, 10)]}
+        outside = {'type':'Polygon', 'coordinates':[square(70, 70, 10)]}
+        # bbox member is used instead of the coordinates
+        outside_bbox = {'type':'Feature', 'bbox':[70,70,80,80],
+                        'geometry':{'type':'Point', 'coordinates':(10,10)}}
+        for geoj in (inside, outside, outside_bbox):
+            canvas.draw_geojson(geoj, fillcolor='red')
+        self.assertEqual(canvas.cullstats['drawn'], 1)
+        self.assertEqual(canvas.cullstats['culled'], 2)
+
+    def test_culled_without_styles(self):
+        # the cull margin does not make a style or decide a random color
+        canvas = self.create_canvas()
+        outside = {'type':'Polygon', 'coordinates':[square(70, 70, 10)]}
+        state = random.getstate()
+        canvas.draw_geojson(outside)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(len(canvas._styles), 0)
+        self.assertEqual(canvas.cullstats['culled'], 1)
+
+    def test_not_culled(self):
+        canvas = self.create_canvas()
+        outside = {'type':'Polygon', 'coordinates':[square(70, 70, 10)]}
+        canvas.draw_geojson(outside, cull=False, fillcolor='red')
+        self.assertEqual(canvas.cullstats['culled'], 0)
+
+    def test_clipped(self):
+        canvas = self.create_canvas()
+        line = {'type':'LineString', 'coordinates':[(-50,25),(25,25),(150,25)]}
+        poly = {'type':'Polygon', 'coordinates':[square(40, 40, 100)]}
+        canvas.draw_geojson(line, clip=True, fillcolor='black', fillsize='2px')
+        canvas.draw_geojson(poly, clip=True, fillcolor='red', outlinecolor=None)
+        self.assertEqual(canvas.cullstats['clipped'], 2)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(10,25))[:3], (0,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(45,45))[:3], (255,0,0))
+        canvas.save('outputs/geojson_clipped.png')
+
+    def test_collection(self):
+        canvas = self.create_canvas()
+        features = [{'type':'Point', 'coordinates':(x,x)} for x in range(0,100,10)]
+        groups = canvas.draw_geojson_collection(features, style={'fillcolor':'red'})
+        self.assertEqual(groups[0]['features'], 6)
+        self.assertEqual(canvas.cullstats['culled'], 4)
+
+# simplification
+
+class TestSimplify(unittest.TestCase):
+
+    def test_simplify_line(self):
+        line = [(x/100.0, 0.001*(x % 2)) for x in range(1001)]
+        simple = geomhelper.simplify_line(line, 0.01)
+        self.assertEqual(simple, [line[0], line[-1]])
+
+    def test_rings_kept(self):
+        canvas = pyagg.Canvas(100, 100, background='white')
+        canvas.custom_space(0, 0, 10000, 10000)
+        # the hole is too small to see and is dropped, the tiny polygon is kept
+        poly = {'type':'MultiPolygon', 'coordinates':[[square(1000, 1000, 8000), square(5000, 5000, 10)],
+                                                       [square(100, 100, 10)]]}
+        simple = geomhelper.simplify_geom(poly, canvas._simplify_tolerance('auto'))
+        self.assertEqual(len(simple['coordinates'][0]), 1)
+        self.assertEqual(simple['coordinates'][1], poly['coordinates'][1])
+
+    def test_same_image(self):
+        coords = [(x/10.0, 50 + 0.0001*(x % 3)) for x in range(100, 900)]
+        images = []
+        for simplify in (None, 'auto'):
+            canvas = pyagg.Canvas(200, 200, background='white')
+            canvas.custom_space(0, 0, 100, 100)
+            canvas.draw_line(coords, simplify=simplify, fillcolor='black', fillsize='2px')
+            images.append(canvas.get_image().convert('L').getdata())
+        # only slight antialiasing differences
+        diffs = [abs(v1-v2) for v1,v2 in zip(*images)]
+        self.assertLess(max(diffs), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+
+import PIL, PIL.Image, PIL.ImageDraw
+
+import pyagg
+from pyagg import gradienthelper, geomhelper
+
+RED_BLUE = [(255,0,0), (0,0,255)]
+
+def canvas():
+    canvas = pyagg.Canvas(200, 100, background=(255,255,255))
+    canvas.pixel_space()
+    canvas.set_default_unit('px')
+    return canvas
+
+class TestPositions(unittest.TestCase):
+
+    def test_linear(self):
+        positions = gradienthelper.linear_positions((100,10), (0,0), (100,0))
+        values = [positions.getpixel((x,5)) for x in range(100)]
+        self.assertEqual(values, sorted(values))
+        self.assertLessEqual(values[0], 2)
+        self.assertGreaterEqual(values[-1], 252)
+
+    def test_linear_clamped(self):
+        positions = gradienthelper.linear_positions((100,10), (25,0), (75,0))
+        self.assertEqual(positions.getpixel((10,5)), 0)
+        self.assertEqual(positions.getpixel((90,5)), 255)
+
+    def test_radial(self):
+        positions = gradienthelper.radial_positions((100,100), (50,50), 40)
+        self.assertLessEqual(positions.getpixel((50,50)), 4)
+        self.assertEqual(positions.getpixel((95,50)), 255)
+        self.assertAlmostEqual(positions.getpixel((70,50)), 128, delta=4)
+        self.assertAlmostEqual(positions.getpixel((50,30)), 128, delta=4)
+
+    def test_path_beveled(self):
+        # a sharp turn beyond the miter limit, the bevel is covered without gaps
+        coords = [(10,50), (60,50), (10,60)]
+        left,right,starts = geomhelper.stroke_line(coords, [5,5,5], starts=True)
+        self.assertGreater(len(left) + len(right), 6)
+        positions = gradienthelper.path_positions((100,100), coords, left, right, starts)
+        mask = PIL.Image.new('L', (100,100), 0)
+        PIL.ImageDraw.Draw(mask).polygon(left + right[::-1], fill=255)
+        gaps = [(x,y) for y in range(100) for x in range(16,100)
+                if mask.getpixel((x,y)) and not positions.getpixel((x,y))]
+        self.assertEqual(gaps, [])
+
+    def test_path_is_continuous(self):
+        coords = [(10,50), (60,50), (60,90)]
+        left,right,starts = geomhelper.stroke_line(coords, [5,5,5], starts=True)
+        positions = gradienthelper.path_positions((100,100), coords, left, right, starts)
+        along = [positions.getpixel((x,50)) for x in range(12,60)]
+        along += [positions.getpixel((60,y)) for y in range(51,88)]
+        self.assertEqual(along, sorted(along))
+        self.assertAlmostEqual(positions.getpixel((60,50)), 255 * 50 / 90.0, delta=4)
+        self.assertEqual(positions.getpixel((30,20)), 0)
+
+class TestDrawGradient(unittest.TestCase):
+
+    def test_endpoints_and_smoothness(self):
+        c = canvas()
+        c.draw_gradient([(0,50),(200,50)], RED_BLUE, 20, outlinecolor=None)
+        img = c.get_image()
+        reds = [img.getpixel((x,50))[0] for x in range(200)]
+        blues = [img.getpixel((x,50))[2] for x in range(200)]
+        self.assertEqual(reds, sorted(reds, reverse=True))
+        self.assertEqual(blues, sorted(blues))
+        self.assertGreaterEqual(reds[0], 250)
+        self.assertGreaterEqual(blues[-1], 250)
+        # no seams, each pixel differs only slightly from the next
+        self.assertLessEqual(max(a - b for a,b in zip(reds, reds[1:])), 3)
+        # outside the band is untouched
+        self.assertEqual(img.getpixel((100,30))[:3], (255,255,255))
+
+    def test_steps(self):
+        c = canvas()
+        c.draw_gradient([(0,50),(200,50)], RED_BLUE, 20, steps=4, outlinecolor=None)
+        img = c.get_image()
+        colors = set(img.getpixel((x,50))[:3] for x in range(2,198))
+        self.assertEqual(len(colors), 4)
+
+    def test_along_path(self):
+        c = canvas()
+        c.draw_gradient([(10,20),(100,80),(190,20)], RED_BLUE, 10, outlinecolor=None)
+        img = c.get_image()
+        red,green,blue = img.getpixel((100,80))[:3]
+        self.assertAlmostEqual(red, 127, delta=3)
+        self.assertAlmostEqual(blue, 127, delta=3)
+        self.assertEqual(green, 0)
+        self.assertEqual(img.getpixel((100,20))[:3], (255,255,255))
+
+    def test_fill(self):
+        fill = pyagg.canvas.Gradient(RED_BLUE).fill("radial")
+        img = fill(100,100).get_image()
+        self.assertGreaterEqual(img.getpixel((50,50))[0], 250)
+        self.assertGreaterEqual(img.getpixel((0,0))[2], 250)
+
+class TestGradientLUT(unittest.TestCase):
+
+    def test_lut(self):
+        lut = pyagg.Gradient([(255,0,0), (0,0,255,0)]).lut()
+        self.assertEqual(len(lut), 256)
+        self.assertEqual(lut[0], (255,0,0,255))
+        self.assertEqual(lut[-1], (0,0,255,0))
+        self.assertEqual(lut[128], (127,0,128,127))
+        self.assertEqual(len(pyagg.Gradient(RED_BLUE).lut_bytes(size=1024)), 4096)
+
+    def test_cached(self):
+        lut = pyagg.Gradient(RED_BLUE).lut(size=100)
+        self.assertIs(pyagg.Gradient([[255,0,0], [0,0,255]]).lut(size=100), lut)
+        self.assertIsNot(pyagg.Gradient(RED_BLUE).lut(size=100, steps=3), lut)
+
+    def test_steps(self):
+        lut = pyagg.Gradient(RED_BLUE).lut(steps=3)
+        self.assertEqual(sorted(set(lut)), [(0,0,255,255), (128,0,128,255), (255,0,0,255)])
+        self.assertEqual(lut[0], (255,0,0,255))
+        self.assertEqual(lut[-1], (0,0,255,255))
+
+    def test_map_sequence(self):
+        colors = pyagg.Gradient(RED_BLUE).map([10, 20, 15, 100], vmin=10, vmax=20)
+        self.assertEqual(colors[0], (255,0,0,255))
+        self.assertEqual(colors[1], (0,0,255,255))
+        self.assertEqual(colors[3], (0,0,255,255))
+        self.assertAlmostEqual(colors[2][0], 127, delta=1)
+
+    def test_map_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('numpy is not installed')
+        values = np.array([[0, 5], [10, np.nan]])
+        colors = pyagg.Gradient(RED_BLUE).map(values)
+        self.assertEqual(colors.shape, (2,2,4))
+        self.assertEqual(colors.dtype, np.uint8)
+        self.assertEqual(tuple(colors[0,0]), (255,0,0,255))
+        self.assertEqual(tuple(colors[1,0]), (0,0,255,255))
+        self.assertEqual(tuple(colors[1,1]), (0,0,0,0))
+        expected = pyagg.Gradient(RED_BLUE).map([0, 5, 10])
+        self.assertEqual([tuple(c) for c in colors.reshape(-1,4)[:3].tolist()], expected)
+
+    def test_map_image(self):
+        img = PIL.Image.new('F', (3,1))
+        img.putdata([-1.0, 0.5, 2.0])
+        colored = pyagg.Gradient(RED_BLUE).map(img, vmin=0, vmax=1)
+        self.assertEqual(colored.mode, 'RGBA')
+        self.assertEqual(colored.getpixel((0,0)), (255,0,0,255))
+        self.assertEqual(colored.getpixel((2,0)), (0,0,255,255))
+
+    def test_color_remap(self):
+        c = pyagg.Canvas(10, 10, background=(0,0,0,100))
+        c.color_remap([(255,0,0), (0,0,255)])
+        self.assertEqual(c.get_image().getpixel((5,5)), (255,0,0,100))
+
+if __name__ == '__main__':
+    unittest.main()
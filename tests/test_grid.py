@@ -0,0 +1,76 @@
+import unittest
+
+import PIL, PIL.ImageChops
+
+import pyagg
+
+def canvas():
+    canvas = pyagg.Canvas(100, 100, background=(255,255,255))
+    canvas.custom_space(0, 0, 100, 100)
+    return canvas
+
+class TestDrawGrid(unittest.TestCase):
+
+    def test_lines(self):
+        c = canvas()
+        c.draw_grid(20, 20, fillcolor=(255,0,0), fillsize='2px')
+        img = c.get_image()
+        self.assertEqual(img.getpixel((20,50))[:3], (255,0,0))
+        self.assertEqual(img.getpixel((50,40))[:3], (255,0,0))
+        self.assertEqual(img.getpixel((30,50))[:3], (255,255,255))
+
+    def test_origin(self):
+        c = canvas()
+        c.draw_grid(20, 20, origin=(5,5), fillcolor=(255,0,0), fillsize='2px')
+        img = c.get_image()
+        self.assertEqual(img.getpixel((25,50))[:3], (255,0,0))
+        self.assertEqual(img.getpixel((20,50))[:3], (255,255,255))
+
+    def test_minor(self):
+        c = canvas()
+        c.draw_grid(50, 50, xminor=10, yminor=10, fillcolor=(255,0,0), fillsize='2px',
+                    minoroptions={'fillcolor':(0,0,255), 'fillsize':'2px'})
+        img = c.get_image()
+        self.assertEqual(img.getpixel((10,25))[:3], (0,0,255))
+        # major lines are drawn on top of the minor ones
+        self.assertEqual(img.getpixel((50,25))[:3], (255,0,0))
+
+    def test_single_path(self):
+        # same result as drawing each line on its own
+        c = canvas()
+        c.draw_grid(10, 25, fillcolor=(0,0,0), fillsize='1px')
+        expected = canvas()
+        for x in range(0, 101, 10):
+            expected.draw_line([(x,0),(x,100)], fillcolor=(0,0,0), fillsize='1px', outlinecolor=None)
+        for y in range(0, 101, 25):
+            expected.draw_line([(0,y),(100,y)], fillcolor=(0,0,0), fillsize='1px', outlinecolor=None)
+        # except where lines cross, which the single path only covers once
+        box = (0,30,100,45)
+        diff = PIL.ImageChops.difference(c.get_image().crop(box), expected.get_image().crop(box))
+        self.assertLessEqual(max(hi for lo,hi in diff.getextrema()), 2)
+
+    def test_labels(self):
+        c = canvas()
+        c.draw_grid(50, 50, labels=True, labelformat='.1f', labeloptions={'textcolor':(255,0,0)})
+        img = c.get_image()
+        # labels of x along the bottom, and of y along the left edge
+        bottom = img.crop((40,80,70,100))
+        left = img.crop((0,40,30,60))
+        self.assertIn((255,0,0), [px[:3] for px in bottom.getdata()])
+        self.assertIn((255,0,0), [px[:3] for px in left.getdata()])
+
+    def test_bad_interval(self):
+        with self.assertRaises(Exception):
+            canvas().draw_grid(0, 10)
+
+    def test_tiled(self):
+        c = canvas()
+        c.draw_grid(15, 15, xminor=5, labels=True)
+        tiled = pyagg.TiledCanvas(100, 100, background=(255,255,255), tilesize=32)
+        tiled.custom_space(0, 0, 100, 100)
+        tiled.draw_grid(15, 15, xminor=5, labels=True)
+        diff = PIL.ImageChops.difference(c.get_image(), tiled.get_image())
+        self.assertIsNone(diff.getbbox())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+import subprocess
+
+import pyagg
+
+# Import time budget for 'import pyagg', in microseconds as reported by python -X importtime.
+# Increase only when a new startup cost is deliberate.
+IMPORT_BUDGET = 400000
+
+# Modules that should only be imported when first used
+DEFERRED = ['tkinter', 'Tkinter', 'PIL.ImageTk', 'PIL.ImageOps', 'PIL.ImageMath', 'PIL.ImageEnhance',
+            'multiprocessing', 'numpy', 'pyagg.graph', 'pyagg.legend', 'pyagg.tiled', 'pyagg.parallel',
+            'pyagg.gridinterp']
+
+ROOTFOLDER = os.path.dirname(os.path.dirname(os.path.abspath(pyagg.__file__)))
+
+def run(code, *flags):
+    args = [sys.executable] + list(flags) + ['-c', code]
+    proc = subprocess.Popen(args, cwd=ROOTFOLDER, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out,err = proc.communicate()
+    return out.decode('utf8'), err.decode('utf8')
+
+class TestImport(unittest.TestCase):
+
+    def test_deferred(self):
+        out,err = run('import sys, pyagg; print(",".join(sorted(sys.modules)))')
+        imported = set(out.strip().split(','))
+        self.assertEqual([name for name in DEFERRED if name in imported], [])
+
+    def test_lazy_attributes(self):
+        out,err = run('import sys, pyagg; pyagg.TiledCanvas; pyagg.render_tiles; pyagg.LineGraph; '
+                      'print("pyagg.tiled" in sys.modules, "pyagg.graph" in sys.modules)')
+        self.assertEqual(out.strip(), 'True True')
+        self.assertTrue('TiledCanvas' in dir(pyagg))
+        self.assertRaises(AttributeError, getattr, pyagg, 'nonexistent')
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'requires python -X importtime')
+    def test_import_time(self):
+        # best of a few runs, since the first may have to compile or read from a cold disk
+        times = []
+        for _ in range(3):
+            out,err = run('import pyagg', '-X', 'importtime')
+            for line in err.splitlines():
+                fields = [field.strip() for field in line.split('|')]
+                if len(fields) == 3 and fields[2] == 'pyagg':
+                    times.append(int(fields[1]))
+        self.assertTrue(min(times) < IMPORT_BUDGET,
+                        'import pyagg took %s us, over the budget of %s us' % (min(times), IMPORT_BUDGET))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import random
+
+import pyagg
+from pyagg import labelhelper
+
+class TestGridIndex(unittest.TestCase):
+
+    def test_intersects(self):
+        index = labelhelper.GridIndex(cellsize=10)
+        index.insert([5, 5, 25, 15])
+        self.assertEqual(len(index), 1)
+        self.assertTrue(index.intersects([20, 10, 40, 40]))
+        self.assertTrue(index.intersects([-10, -10, 100, 100]))
+        self.assertFalse(index.intersects([25, 5, 40, 15])) # only touching
+        self.assertFalse(index.intersects([50, 50, 60, 60]))
+
+    def test_candidate_box(self):
+        self.assertEqual(labelhelper.candidate_box(100, 100, 40, 10, 'ne', gap=2), [102, 88, 142, 98])
+        self.assertEqual(labelhelper.candidate_box(100, 100, 40, 10, 'w', gap=2), [58, 95, 98, 105])
+        self.assertEqual(labelhelper.candidate_box(100, 100, 40, 10, 'center'), [80, 95, 120, 105])
+        self.assertEqual(labelhelper.candidate_box(100, 100, 40, 10, 'center', gap=5), [80, 95, 120, 105])
+
+class TestPlaceLabels(unittest.TestCase):
+
+    def test_no_overlap(self):
+        random.seed(1)
+        canvas = pyagg.Canvas(400, 300)
+        canvas.percent_space()
+        items = [('Label%d' % i, (random.uniform(0,100), random.uniform(0,100))) for i in range(500)]
+        result = canvas.place_labels(items, textsize=8)
+        self.assertEqual(result['placed'] + result['dropped'], 500)
+        self.assertTrue(0 < result['placed'] < 500)
+        self.assertEqual(len([pos for pos in result['positions'] if pos]), result['placed'])
+        self.assertEqual(len(canvas._textqueue), result['placed'])
+
+    def test_priority(self):
+        canvas = pyagg.Canvas(200, 100)
+        canvas.percent_space()
+        items = [('Low', (50,50)), ('High', (50,50))]
+        result = canvas.place_labels(items, candidates=['ne'], priority=lambda item: len(item[0]), textsize=8)
+        self.assertEqual(result['positions'], [None, 'ne'])
+        self.assertEqual((result['placed'], result['dropped']), (1, 1))
+
+    def test_candidates(self):
+        canvas = pyagg.Canvas(200, 100)
+        canvas.percent_space()
+        items = [('First', (50,50)), ('Second', (50,50)), ('Third', (50,50))]
+        result = canvas.place_labels(items, candidates=['ne','sw'], textsize=8)
+        self.assertEqual(result['positions'], ['ne', 'sw', None])
+
+    def test_outside(self):
+        canvas = pyagg.Canvas(200, 100)
+        canvas.percent_space()
+        result = canvas.place_labels([('Edge', (99,50)), ('Outside', (150,50))], candidates=['e'], textsize=8)
+        self.assertEqual(result['dropped'], 2)
+
+    def test_drawn_inside_box(self):
+        canvas = pyagg.Canvas(200, 100, background='white', mode='RGB')
+        canvas.percent_space()
+        result = canvas.place_labels([('Label', (50,50), {'textsize':10})], candidates=['se'], gap='4px')
+        self.assertEqual(result['placed'], 1)
+        xmin,ymin,xmax,ymax = canvas.get_image().convert('L').point(lambda v: 255-v).getbbox()
+        # label is to the lower right of the point
+        self.assertTrue(100 + 4 <= xmin <= 100 + 12)
+        self.assertTrue(50 + 4 <= ymin <= 50 + 12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@
 import unittest
 
 import pyagg
+from pyagg import geomhelper
 
 # base class
 
@@ -194,6 +195,59 @@ class TestSmoothVolumeLineOutlineOnly(BaseTestCases.DrawLines):
         extra = {'smooth':True, 'volume':volume, 'fillcolor':None, 'outlinecolor':'black'}
         self.kwargs.update(extra)
 
+# stroking
+
+class TestStrokeLine(unittest.TestCase):
+
+    def test_straight(self):
+        left,right = geomhelper.stroke_line([(0,0),(10,0),(20,0)], [2,2,2])
+        self.assertEqual(left, [(0,-2),(10,-2),(20,-2)])
+        self.assertEqual(right, [(0,2),(10,2),(20,2)])
+
+    def test_miter(self):
+        # right turn in pixel space, so the left side is on the outside
+        left,right = geomhelper.stroke_line([(0,0),(10,0),(10,10)], [1,1,1])
+        self.assertEqual(left[1], (11,-1))
+        self.assertEqual(right[1], (9,1))
+
+    def test_bevel(self):
+        left,right = geomhelper.stroke_line([(0,0),(10,0),(10,10)], [1,1,1], join='bevel')
+        self.assertEqual(left[1:3], [(10,-1),(11,0)])
+        self.assertEqual(right[1], (9,1))
+
+    def test_starts(self):
+        left,right,starts = geomhelper.stroke_line([(0,0),(10,0),(10,10),(20,10)], [1,1,1,1],
+                                                   join='bevel', starts=True)
+        # the beveled outer side has two points at each turn
+        self.assertEqual(starts, [(0,0),(1,1),(3,2),(4,4)])
+        self.assertEqual(len(left), 5)
+        self.assertEqual(len(right), 5)
+
+    def test_round(self):
+        left,right = geomhelper.stroke_line([(0,0),(10,0),(10,10)], [5,5,5], join='round')
+        self.assertTrue(len(left) > 4)
+        for x,y in left[1:-1]:
+            self.assertAlmostEqual(((x-10)**2 + y**2) ** 0.5, 5)
+
+    def test_miterlimit(self):
+        # sharp turns are beveled instead of making long spikes
+        left,right = geomhelper.stroke_line([(0,0),(10,0),(0,1)], [1,1,1])
+        self.assertTrue(all(x < 12 for x,y in left + right))
+
+    def test_volume_sequence(self):
+        canvas = pyagg.Canvas(100, 100, background='white')
+        canvas.draw_line([(10,50),(50,50),(50,50),(90,50)], volume=[2,20,20,2], fillcolor='black', outlinecolor=None)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((50,42)), (0,0,0,255))
+        self.assertEqual(img.getpixel((15,42)), (255,255,255,255))
+        self.assertRaises(Exception, canvas.draw_line, [(10,50),(90,50)], volume=[2,20,20])
+
+    def test_smooth(self):
+        points = geomhelper.smooth_line([(0,0),(10,0),(10,10)])
+        self.assertEqual(points[0], (0,0))
+        self.assertEqual(points[-1], (10,10))
+        self.assertTrue(len(points) > 4)
+
 
 if __name__ == '__main__':
     unittest.main()
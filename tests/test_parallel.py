@@ -0,0 +1,87 @@
+
+import unittest
+import io
+import os
+import random
+
+import PIL.Image
+
+import pyagg
+
+# drawing functions must be importable by the worker processes
+
+def draw_world(canvas):
+    canvas.draw_box(bbox=[-180,-90,180,90], fillcolor='lightblue', outlinecolor=None)
+    canvas.draw_circle(xy=(0,0), fillsize='20%w') # random color
+    canvas.draw_line([(-180,-90),(180,90)], fillsize='2px', fillcolor='black')
+
+def draw_styled(canvas, styles):
+    canvas.draw_box(bbox=[-180,-90,180,90], style=styles['sea'])
+    canvas.draw_circle(xy=(0,0), style=styles['land'])
+
+def draw_broken(canvas):
+    xmin,ytop,xmax,ybottom = canvas.coordspace_bbox
+    if xmin < 0:
+        raise Exception('broken tile')
+    draw_world(canvas)
+
+extents = [((1,0,0), [-180,0,0,90]),
+           ((1,1,0), [0,0,180,90]),
+           ((1,0,1), [-180,-90,0,0]),
+           ((1,1,1), [0,-90,180,0])]
+
+class TestRenderTiles(unittest.TestCase):
+
+    def test_png_bytes(self):
+        results = pyagg.render_tiles(draw_world, extents, workers=2, width=64, height=64)
+        self.assertEqual([r['key'] for r in results], [key for key,bbox in extents])
+        for result in results:
+            self.assertIsNone(result['error'])
+            self.assertGreaterEqual(result['time'], 0)
+            img = PIL.Image.open(io.BytesIO(result['data']))
+            self.assertEqual(img.size, (64,64))
+
+    def test_deterministic(self):
+        single = pyagg.render_tiles(draw_world, extents, workers=1, width=64, height=64)
+        multi = pyagg.render_tiles(draw_world, extents, workers=3, width=64, height=64)
+        self.assertEqual([r['data'] for r in single], [r['data'] for r in multi])
+
+    def test_directory(self):
+        results = pyagg.render_tiles(draw_world, extents, workers=2, width=64, height=64,
+                                     outdir='outputs/tiles')
+        for result in results:
+            z,x,y = result['key']
+            self.assertEqual(result['path'], os.path.join('outputs/tiles', str(z), str(x), '%s.png' % y))
+            self.assertTrue(os.path.exists(result['path']))
+
+    def test_errors_isolated(self):
+        results = pyagg.render_tiles(draw_broken, extents, workers=2, width=64, height=64)
+        errors = [r['key'] for r in results if r['error']]
+        self.assertEqual(errors, [(1,0,0), (1,0,1)])
+        self.assertIn('broken tile', results[0]['error'])
+        self.assertIsNotNone(results[1]['data'])
+
+    def test_styles(self):
+        styles = {'sea':{'fillcolor':'lightblue', 'outlinecolor':None}, 'land':{'fillsize':'20%w'}}
+        single = pyagg.render_tiles(draw_styled, extents, workers=1, width=64, height=64, styles=styles)
+        multi = pyagg.render_tiles(draw_styled, extents, workers=2, width=64, height=64, styles=styles)
+        for result in single:
+            self.assertIsNone(result['error'])
+        # the random color of the land style is the same in every worker
+        self.assertEqual([r['data'] for r in single], [r['data'] for r in multi])
+
+    def test_bad_font(self):
+        # fails up front instead of in the worker initializers
+        with self.assertRaises(Exception):
+            pyagg.render_tiles(draw_world, extents, workers=2, width=64, height=64, font='no such font')
+
+    def test_single_worker_keeps_state(self):
+        random.seed(123)
+        expected = random.random()
+        random.seed(123)
+        pyagg.render_tiles(draw_world, extents, workers=1, width=64, height=64)
+        self.assertEqual(random.random(), expected)
+        self.assertEqual(pyagg.parallel._WORKER, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import PIL, PIL.Image
+
+import pyagg
+
+def symbol():
+    img = PIL.Image.new('RGBA', (20, 10), (255,0,0,128))
+    img.paste((0,0,255,255), (0,0,10,10))
+    return img
+
+class TestPaste(unittest.TestCase):
+
+    def test_same_as_full_composite(self):
+        canvas = pyagg.Canvas(100, 80, background=(0,255,0,200))
+        canvas.draw_box(bbox=[0,0,50,80], fillcolor=(10,20,30,100), outlinecolor=None)
+        before = canvas.get_image().copy()
+        canvas.paste(symbol(), (30,40), anchor='center')
+        full = PIL.Image.new('RGBA', before.size)
+        full.paste(symbol(), (20,35))
+        expected = PIL.Image.alpha_composite(before, full)
+        self.assertEqual(list(canvas.get_image().getdata()), list(expected.getdata()))
+
+    def test_edges(self):
+        canvas = pyagg.Canvas(50, 50, background=(255,255,255,255))
+        for xy in [(-10,-5), (45,45), (-30,10), (100,100)]:
+            canvas.paste(symbol(), xy)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((0,0)), (255,127,127,255))
+        self.assertEqual(img.getpixel((9,4)), (255,127,127,255))
+        self.assertEqual(img.getpixel((0,5)), (255,255,255,255))
+        self.assertEqual(img.getpixel((49,49)), (0,0,255,255))
+        self.assertEqual(img.getpixel((25,25)), (255,255,255,255))
+
+    def test_rgb_canvas(self):
+        canvas = pyagg.Canvas(50, 50, background='white', mode='RGB')
+        canvas.paste(symbol(), (0,0))
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((5,5)), (0,0,255))
+        self.assertEqual(img.getpixel((15,5)), (255,127,127))
+
+    def test_paste_many(self):
+        items = [(symbol(), (x*10, y*10)) for x in range(-1,10) for y in range(-1,10)]
+        canvas = pyagg.Canvas(100, 100, background=(0,0,0,0))
+        for image,xy in items:
+            canvas.paste(image, xy, anchor='center')
+        many = pyagg.Canvas(100, 100, background=(0,0,0,0))
+        many.paste_many(items, anchor='center')
+        self.assertEqual(list(many.get_image().getdata()), list(canvas.get_image().getdata()))
+
+    def test_grid_paste(self):
+        canvas = pyagg.Canvas(100, 100, background='white')
+        canvas.grid_paste([pyagg.Canvas(50, 50, background='red')] * 4)
+        img = canvas.get_image()
+        self.assertEqual(img.getcolors(), [(100*100, (255,0,0,255))])
+
+if __name__ == '__main__':
+    unittest.main()
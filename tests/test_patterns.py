@@ -0,0 +1,137 @@
+import unittest
+import pickle
+
+import PIL, PIL.Image, PIL.ImageChops
+
+import pyagg
+from pyagg import patternhelper
+
+BOX = [(10,10),(90,10),(90,90),(10,90)]
+
+def canvas():
+    canvas = pyagg.Canvas(100, 100, background=(255,255,255))
+    canvas.pixel_space()
+    canvas.set_default_unit('px')
+    return canvas
+
+def solid(color):
+    def picture(width, height):
+        return pyagg.canvas.from_image(PIL.Image.new('RGBA', (width,height), color))
+    return picture
+
+class TestPatterns(unittest.TestCase):
+
+    def test_hatch_tiles(self):
+        for kind in patternhelper.HATCHES:
+            tile = patternhelper.hatch_tile(kind, spacing=8)
+            self.assertEqual(tile.size, (8,8))
+            lo,hi = tile.getchannel('A').getextrema()
+            self.assertEqual(lo, 0, kind)
+            self.assertGreater(hi, 100, kind)
+        tile = patternhelper.hatch_tile('horizontal', spacing=8)
+        self.assertEqual(tile.getchannel('A').getextrema(), (0,255))
+        with self.assertRaises(Exception):
+            patternhelper.hatch_tile('zigzag')
+
+    def test_tile_image(self):
+        tile = patternhelper.hatch_tile('cross', spacing=5)
+        img = patternhelper.tile_image(tile, (23,12))
+        self.assertEqual(img.size, (23,12))
+        self.assertEqual(img.crop((5,5,10,10)).tobytes(), tile.tobytes())
+
+    def test_hatch_cached(self):
+        pattern = pyagg.Pattern.hatch('diagonal', color=(255,0,0), spacing=6)
+        self.assertIs(pyagg.Pattern.hatch('diagonal', color=(255,0,0), spacing=6), pattern)
+        self.assertIsNot(pyagg.Pattern.hatch('diagonal', color=(255,0,0), spacing=7), pattern)
+
+    def test_image_aligned(self):
+        pattern = pyagg.Pattern.hatch('diagonal', spacing=7)
+        whole = pattern.image(0, 0, 50, 50)
+        part = pattern.image(13, 20, 30, 25)
+        self.assertEqual(part.tobytes(), whole.crop((13,20,43,45)).tobytes())
+
+    def test_retained_size_bounded(self):
+        pattern = pyagg.Pattern.hatch('diagonal', spacing=7)
+        whole = pattern.image(3, 5, 1000, 800)
+        self.assertEqual(whole.size, (1000,800))
+        self.assertEqual(whole.crop((200,300,230,325)).tobytes(), pattern.image(203, 305, 30, 25).tobytes())
+        # only a block of whole tiles is kept, not the filled region
+        width,height = pattern._tiled.size
+        self.assertLessEqual(width, pyagg.canvas.PATTERNBLOCK + 7)
+        self.assertLessEqual(height, pyagg.canvas.PATTERNBLOCK + 7)
+        self.assertEqual((width % 7, height % 7), (0,0))
+        self.assertEqual(pattern.nbytes, 4 * (7*7 + width*height))
+
+    def test_pickle(self):
+        pattern = pyagg.Pattern.hatch('dots')
+        pattern.image(0, 0, 100, 100)
+        copy = pickle.loads(pickle.dumps(pattern))
+        self.assertIsNone(copy._tiled)
+        self.assertEqual(copy.tile.tobytes(), pattern.tile.tobytes())
+
+class TestPatternFills(unittest.TestCase):
+
+    def test_pattern_fill(self):
+        c = canvas()
+        c.draw_polygon(BOX, fillcolor=pyagg.Pattern.hatch('horizontal', color=(255,0,0), spacing=10, linewidth=2),
+                       outlinecolor=None)
+        img = c.get_image()
+        # lines through the middle of each tile, within the polygon only
+        self.assertEqual(img.getpixel((50,35))[:3], (255,0,0))
+        self.assertEqual(img.getpixel((50,40))[:3], (255,255,255))
+        self.assertEqual(img.getpixel((5,35))[:3], (255,255,255))
+
+    def test_pattern_mask(self):
+        c = canvas()
+        c.draw_polygon(BOX, fillcolor=(0,0,255), fillmask=pyagg.Pattern.hatch('vertical', spacing=10, linewidth=2),
+                       outlinecolor=None)
+        img = c.get_image()
+        self.assertEqual(img.getpixel((35,50))[:3], (0,0,255))
+        self.assertEqual(img.getpixel((40,50))[:3], (255,255,255))
+
+    def test_picture_fill(self):
+        c = canvas()
+        c.draw_polygon(BOX, fillcolor=solid((0,255,0,255)), outlinecolor=None)
+        img = c.get_image()
+        self.assertEqual(img.getpixel((50,50))[:3], (0,255,0))
+        self.assertEqual(img.getpixel((5,5))[:3], (255,255,255))
+
+    def test_fillmask_function(self):
+        def leftmask(width, height):
+            mask = PIL.Image.new('L', (width,height), 0)
+            mask.paste(255, (0, 0, width // 2, height))
+            return pyagg.canvas.from_image(mask)
+        c = canvas()
+        c.draw_polygon(BOX, fillcolor=(255,0,0), fillmask=leftmask, outlinecolor=None)
+        img = c.get_image()
+        self.assertEqual(img.getpixel((30,50))[:3], (255,0,0))
+        self.assertEqual(img.getpixel((70,50))[:3], (255,255,255))
+
+    def test_collection_same_as_polygons(self):
+        pattern = pyagg.Pattern.hatch('diagonalcross', color=(0,0,0), spacing=6)
+        feats = []
+        for x in range(0, 100, 20):
+            ring = [(x,0),(x+20,0),(x+20,100),(x,100),(x,0)]
+            feats.append({'type':'Feature', 'properties':{},
+                          'geometry':{'type':'Polygon', 'coordinates':[ring]}})
+        batched = canvas()
+        batched.draw_geojson_collection(feats, fillcolor=pattern, outlinecolor=None)
+        single = canvas()
+        for feat in feats:
+            single.draw_polygon(feat['geometry']['coordinates'][0], fillcolor=pattern, outlinecolor=None)
+        # the same except for antialiasing along the shared edges
+        box = (22,0,38,100)
+        diff = PIL.ImageChops.difference(batched.get_image().crop(box), single.get_image().crop(box))
+        self.assertIsNone(diff.getbbox())
+
+    def test_recorded(self):
+        c = canvas()
+        rec = c.start_recording()
+        c.draw_polygon(BOX, fillcolor=pyagg.Pattern.hatch('cross', spacing=5))
+        c.stop_recording()
+        replayed = rec.replay(canvas())
+        diff = PIL.ImageChops.difference(c.get_image(), replayed.get_image())
+        self.assertIsNone(diff.getbbox())
+
+if __name__ == '__main__':
+    unittest.main()
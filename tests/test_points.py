@@ -0,0 +1,102 @@
+
+import unittest
+
+import pyagg
+
+# base class
+
+class BaseTestCases:
+
+    class DrawPoints(unittest.TestCase):
+        width = 200
+        height = 200
+        points = [(x,y) for x in range(10,100,20) for y in range(10,100,20)]
+        kwargs = {'fillsize':'3%w', 'fillcolor':'yellow', 'outlinecolor':'black'}
+        output_prefix = 'points'
+
+        def create_canvas(self):
+            self.canvas = pyagg.Canvas(self.width, self.height, background='gray')
+            self.canvas.percent_space()
+
+        def save_canvas(self, name):
+            print('save',self.output_prefix,name)
+            self.canvas.save('outputs/{}_{}.png'.format(self.output_prefix, name))
+
+        def test_circle(self):
+            self.create_canvas()
+            print(self.kwargs)
+            self.canvas.draw_points(self.points, shape='circle', **self.kwargs)
+            self.save_canvas('circle')
+
+        def test_box(self):
+            self.create_canvas()
+            print(self.kwargs)
+            self.canvas.draw_points(self.points, shape='box', **self.kwargs)
+            self.save_canvas('box')
+
+        def test_triangle(self):
+            self.create_canvas()
+            print(self.kwargs)
+            self.canvas.draw_points(self.points, shape='triangle', **self.kwargs)
+            self.save_canvas('triangle')
+
+        def test_same_as_single(self):
+            # batched drawing should look the same as drawing each point
+            for shape in ('circle','box','triangle'):
+                self.create_canvas()
+                self.canvas.draw_points(self.points, shape=shape, **self.kwargs)
+                batched = self.canvas.get_image()
+                self.create_canvas()
+                for xy in self.points:
+                    getattr(self.canvas, 'draw_'+shape)(xy=xy, **self.kwargs)
+                single = self.canvas.get_image()
+                self.assertEqual(list(batched.getdata()), list(single.getdata()))
+
+# options
+
+class TestPointsScalar(BaseTestCases.DrawPoints):
+
+    def __init__(self, *args, **kwargs):
+        super(BaseTestCases.DrawPoints, self).__init__(*args, **kwargs)
+        self.output_prefix += '_scalar'
+
+class TestPointsAnchor(BaseTestCases.DrawPoints):
+
+    def __init__(self, *args, **kwargs):
+        super(BaseTestCases.DrawPoints, self).__init__(*args, **kwargs)
+        self.output_prefix += '_anchor'
+        self.kwargs = self.kwargs.copy()
+        extra = {'anchor':'nw'}
+        self.kwargs.update(extra)
+
+class TestPointsPerPoint(unittest.TestCase):
+
+    def test_perpoint_options(self):
+        canvas = pyagg.Canvas(200, 200, background='gray')
+        canvas.percent_space()
+        points = [(20,50),(50,50),(80,50)]
+        canvas.draw_points(points,
+                           fillsize=['2%w','5%w','8%w'],
+                           fillcolor=['red',(0,255,0),'blue'],
+                           outlinewidth=['1px','2px','3px'])
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(20,50))[:3], (255,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(50,50))[:3], (0,255,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(80,50))[:3], (0,0,255))
+        canvas.save('outputs/points_perpoint.png')
+
+    def test_flat_coords(self):
+        canvas = pyagg.Canvas(200, 200, background='gray')
+        canvas.percent_space()
+        canvas.draw_points([20,50, 80,50], fillsize='5%w', fillcolor='red')
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(80,50))[:3], (255,0,0))
+
+    def test_wrong_length(self):
+        canvas = pyagg.Canvas(200, 200)
+        with self.assertRaises(Exception):
+            canvas.draw_points([(20,50),(80,50)], fillsize=['2%w'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+
+import unittest
+
+import pyagg
+
+# styles
+
+class TestMakeStyle(unittest.TestCase):
+
+    def create_canvas(self):
+        canvas = pyagg.Canvas(200, 200, background='gray')
+        canvas.percent_space()
+        return canvas
+
+    def test_cached(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillsize='3%w', fillcolor='red', outlinecolor='black')
+        same = canvas.make_style(outlinecolor='black', fillcolor='red', fillsize='3%w')
+        self.assertIs(style, same)
+        self.assertAlmostEqual(style['fillsize'], 6)
+        self.assertIsNotNone(style.pen)
+        self.assertIsNotNone(style.brush)
+
+    def test_immutable(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillcolor='red')
+        with self.assertRaises(AttributeError):
+            style.pen = None
+
+    def test_invalidated(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillsize=3)
+        canvas.set_default_unit('px')
+        reparsed = canvas.make_style(fillsize=3)
+        self.assertIsNot(style, reparsed)
+        self.assertAlmostEqual(style['fillsize'], 6)
+        self.assertAlmostEqual(reparsed['fillsize'], 3)
+
+    def test_to_options(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillsize='3%w', outlinecolor='black')
+        options = style.to_options()
+        self.assertEqual(options['fillsize'], '3%w')
+        self.assertEqual(options['fillcolor'], style['fillcolor'])
+        self.assertEqual(canvas.make_style(**options)['fillcolor'], style['fillcolor'])
+        self.assertAlmostEqual(style.to_options(resolve_sizes=True)['fillsize'], 6)
+
+    def test_same_as_options(self):
+        kwargs = {'fillsize':'3%w', 'fillcolor':'yellow', 'outlinecolor':'black'}
+        for shape in ('circle','box','triangle'):
+            canvas = self.create_canvas()
+            style = canvas.make_style(**kwargs)
+            getattr(canvas, 'draw_'+shape)(xy=(50,50), style=style)
+            styled = canvas.get_image()
+            canvas = self.create_canvas()
+            getattr(canvas, 'draw_'+shape)(xy=(50,50), **kwargs)
+            plain = canvas.get_image()
+            self.assertEqual(list(styled.getdata()), list(plain.getdata()))
+
+    def test_override(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillsize='5%w', fillcolor='red')
+        canvas.draw_circle(xy=(30,50), style=style)
+        canvas.draw_circle(xy=(70,50), style=style, fillcolor='blue')
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel(canvas.coord2pixel(30,50))[:3], (255,0,0))
+        self.assertEqual(img.getpixel(canvas.coord2pixel(70,50))[:3], (0,0,255))
+        canvas.save('outputs/styles_override.png')
+
+    def test_stale_style(self):
+        canvas = self.create_canvas()
+        style = canvas.make_style(fillsize='5%w', fillcolor='red')
+        canvas.custom_space(0, 0, 200, 200)
+        canvas.draw_circle(xy=(100,100), style=style)
+        img = canvas.get_image()
+        self.assertEqual(img.getpixel((100,100))[:3], (255,0,0))
+
+
+if __name__ == '__main__':
+    unittest.main()
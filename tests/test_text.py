@@ -0,0 +1,104 @@
+import unittest
+
+import pyagg
+
+def draw(canvas):
+    canvas.percent_space()
+    for i in range(10):
+        canvas.draw_box(xy=(10+i*8, 50), fillsize='5%w', fillcolor=(0,0,255))
+        canvas.draw_text('Label', xy=(10+i*8, 50), textsize=12, textcolor=(255,0,0))
+
+def draw_labels(canvas):
+    canvas.percent_space()
+    canvas.draw_box(bbox=[0,0,100,100], fillcolor=(0,0,255))
+    for i in range(10):
+        canvas.draw_text('Label', xy=(10+i*8, 50), textsize=12, textcolor=(255,0,0))
+
+def colors(canvas):
+    return set(color for count,color in canvas.get_image().getcolors(10000))
+
+class TestDeferredText(unittest.TestCase):
+
+    def test_shape_covers_text(self):
+        canvas = pyagg.Canvas(200, 100, background='white')
+        canvas.percent_space()
+        canvas.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+        canvas.draw_box(bbox=[0,0,100,100], fillcolor=(0,0,255))
+        self.assertFalse((255,0,0,255) in colors(canvas))
+
+    def test_immediate(self):
+        canvas = pyagg.Canvas(200, 100, background='white', defer_text=False)
+        canvas.percent_space()
+        canvas.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+        canvas.draw_box(xy=(50,50), fillsize='45%w', fillcolor=(0,0,255))
+        self.assertFalse((255,0,0,255) in colors(canvas))
+
+    def test_flush(self):
+        canvas = pyagg.Canvas(200, 100, background='white')
+        canvas.percent_space()
+        canvas.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+        canvas.flush()
+        canvas.draw_box(xy=(50,50), fillsize='45%w', fillcolor=(0,0,255))
+        self.assertFalse((255,0,0,255) in colors(canvas))
+
+    def test_same_as_immediate(self):
+        for func in (draw, draw_labels):
+            deferred = pyagg.Canvas(200, 100, background='white')
+            func(deferred)
+            immediate = pyagg.Canvas(200, 100, background='white', defer_text=False)
+            func(immediate)
+            self.assertEqual(deferred.get_image().tobytes(), immediate.get_image().tobytes())
+
+    def test_single_drawer_update(self):
+        canvas = pyagg.Canvas(200, 100)
+        updates = []
+        update_drawer_img = canvas.update_drawer_img
+        def counted():
+            updates.append(1)
+            update_drawer_img()
+        canvas.update_drawer_img = counted
+        draw_labels(canvas)
+        self.assertEqual(len(canvas._textqueue), 10)
+        canvas.get_image()
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(canvas._textqueue, [])
+
+    def test_drawn_before_shapes(self):
+        canvas = pyagg.Canvas(200, 100)
+        draw(canvas)
+        # only the last label is still queued
+        self.assertEqual(len(canvas._textqueue), 1)
+
+    def test_composites_cover_text(self):
+        # the same layering for solid and textured fills, and pasted images
+        hatch = pyagg.Pattern.hatch('cross', color=(0,0,255), spacing=4, linewidth=4)
+        for fill in ((0,0,255), hatch, 'paste'):
+            canvas = pyagg.Canvas(200, 100, background='white')
+            canvas.percent_space()
+            canvas.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+            if fill == 'paste':
+                canvas.paste(pyagg.Canvas(200, 100, background=(0,0,255)))
+            else:
+                canvas.draw_polygon([(0,0),(100,0),(100,100),(0,100)], fillcolor=fill)
+            self.assertEqual(canvas._textqueue, [], fill)
+            self.assertFalse((255,0,0,255) in colors(canvas), fill)
+
+    def test_image_ops_flush(self):
+        canvas = pyagg.Canvas(200, 100, background='white', mode='RGB')
+        canvas.percent_space()
+        canvas.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+        canvas.invert()
+        self.assertTrue((0,255,255) in colors(canvas))
+
+    def test_tiled_flush(self):
+        canvas = pyagg.Canvas(200, 100, background='white')
+        tiled = pyagg.TiledCanvas(200, 100, background='white', tilesize=64)
+        for c in (canvas, tiled):
+            c.percent_space()
+            c.draw_text('Label', xy=(50,50), textsize=12, textcolor=(255,0,0))
+            c.flush()
+            c.draw_box(xy=(50,50), fillsize='10%w', fillcolor=(0,0,255))
+        self.assertEqual(list(canvas.get_image().getdata()), list(tiled.get_image().getdata()))
+
+if __name__ == '__main__':
+    unittest.main()
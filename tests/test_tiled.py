@@ -0,0 +1,84 @@
+
+import unittest
+import random
+
+import PIL.Image
+
+import pyagg
+
+# drawing
+
+def draw(canvas):
+    random.seed(1)
+    canvas.geographic_space()
+    for _ in range(50):
+        x,y = random.uniform(-170,170), random.uniform(-80,80)
+        canvas.draw_circle(xy=(x,y), fillsize='2%w')
+        canvas.draw_polygon([(x,y),(x+30,y),(x+15,y+20)], fillcolor=(0,0,255,100))
+    canvas.draw_triangle(xy=(90,45), fillsize='5%w', direction=90)
+    canvas.draw_text('Tiles', xy=(0,0), textsize=20)
+    canvas.percent_space()
+    canvas.draw_box(xy=(50,50), fillsize='10%w', fillcolor='red')
+    canvas.draw_points([(10,10),(20,20)], fillsize=['1%w','2%w'], fillcolor='green')
+    canvas.paste(pyagg.Canvas(30, 30, background='yellow'), xy=(25,75), anchor='center')
+
+def maxdiff(img1, img2):
+    return max(max(abs(v1-v2) for v1,v2 in zip(p1,p2))
+               for p1,p2 in zip(img1.getdata(), img2.getdata()))
+
+class TestTiledCanvas(unittest.TestCase):
+
+    def test_same_as_canvas(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        draw(canvas)
+        tiled = pyagg.TiledCanvas(300, 200, background='white', tilesize=64)
+        draw(tiled)
+        self.assertEqual(list(canvas.get_image().getdata()), list(tiled.get_image().getdata()))
+
+    def test_tiles(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        draw(canvas)
+        tiled = pyagg.TiledCanvas(300, 200, background='white', tilesize=(128,64))
+        draw(tiled)
+        tiles = list(tiled.iter_tiles())
+        self.assertEqual(len(tiles), 3*4)
+        full = canvas.get_image()
+        for x,y,tile in tiles:
+            expected = full.crop((x, y, x+tile.size[0], y+tile.size[1]))
+            # only slight antialiasing differences at the tile edges
+            self.assertLessEqual(maxdiff(tile, expected), 2)
+
+    def test_save_png(self):
+        tiled = pyagg.TiledCanvas(300, 200, background='white', tilesize=64)
+        draw(tiled)
+        tiled.save('outputs/tiled.png')
+        saved = PIL.Image.open('outputs/tiled.png')
+        self.assertEqual(saved.mode, 'RGBA')
+        self.assertEqual(saved.size, (300,200))
+        self.assertLessEqual(maxdiff(saved, tiled.get_image()), 2)
+
+    def test_zoom(self):
+        canvas = pyagg.Canvas(300, 200, background='white')
+        tiled = pyagg.TiledCanvas(300, 200, background='white', tilesize=64)
+        for c in (canvas, tiled):
+            c.geographic_space()
+            c.zoom_in(2)
+            c.zoom_factor(-1.5, center=(20,10))
+            c.zoom_bbox(-90, -45, 90, 45)
+            c.draw_circle(xy=(10,10), fillsize='5%w', fillcolor='red')
+        self.assertEqual(tiled.coordspace_bbox, canvas.coordspace_bbox)
+        # only the coordinate system is zoomed, so compare just the drawn circle, since the
+        # zoomed out margins of the regular canvas are transparent instead of the background
+        x,y = canvas.coord2pixel(10,10)
+        box = (int(x)-5, int(y)-5, int(x)+5, int(y)+5)
+        self.assertEqual(canvas.get_image().crop(box).tobytes(), tiled.get_image().crop(box).tobytes())
+        self.assertEqual(tiled.get_image().getpixel((int(x),int(y)))[:3], (255,0,0))
+
+    def test_unsupported(self):
+        tiled = pyagg.TiledCanvas(300, 200)
+        with self.assertRaises(Exception):
+            tiled.blur()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+
+import unittest
+from array import array
+
+import pyagg
+
+# transforms
+
+class TestCoordsToPixels(unittest.TestCase):
+
+    def create_canvas(self):
+        canvas = pyagg.Canvas(200, 100)
+        canvas.custom_space(-180, 90, 180, -90)
+        return canvas
+
+    def test_same_as_single(self):
+        canvas = self.create_canvas()
+        coords = [(-180,90),(0,0),(45.5,-30.25),(180,-90)]
+        pixels = canvas.coords2pixels(coords)
+        self.assertEqual(len(pixels), 8)
+        for (x,y),px,py in zip(coords, pixels[0::2], pixels[1::2]):
+            self.assertEqual(canvas.coord2pixel(x,y), (int(px),int(py)))
+
+    def test_flat_and_array(self):
+        canvas = self.create_canvas()
+        flat = [0,0, 90,45]
+        pixels = canvas.coords2pixels(flat)
+        self.assertEqual(pixels, [100.0,50.0, 150.0,25.0])
+        pixels = canvas.coords2pixels(array('d', flat))
+        self.assertIsInstance(pixels, array)
+        self.assertEqual(list(pixels), [100.0,50.0, 150.0,25.0])
+
+    def test_roundtrip(self):
+        canvas = self.create_canvas()
+        flat = [10.5,20.25, -33,-44]
+        coords = canvas.pixels2coords(canvas.coords2pixels(flat))
+        for v1,v2 in zip(flat, coords):
+            self.assertAlmostEqual(v1, v2)
+
+    def test_numpy(self):
+        try:
+            import numpy as np
+        except ImportError:
+            self.skipTest('numpy not installed')
+        canvas = self.create_canvas()
+        coords = np.array([[0,0],[90,45]])
+        pixels = canvas.coords2pixels(coords)
+        self.assertEqual(pixels.shape, (2,2))
+        self.assertEqual(pixels.tolist(), [[100.0,50.0],[150.0,25.0]])
+
+    def test_inverse_invalidated(self):
+        canvas = self.create_canvas()
+        self.assertEqual(canvas.pixel2coord(100,50), (0,0))
+        canvas.custom_space(0, 0, 200, 100)
+        self.assertEqual(canvas.pixel2coord(100,50), (100,50))
+        self.assertEqual(canvas.pixels2coords([100,50]), [100,50])
+
+
+if __name__ == '__main__':
+    unittest.main()
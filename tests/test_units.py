@@ -0,0 +1,63 @@
+
+import unittest
+
+from pyagg import units
+
+# parsing
+
+class TestParseDist(unittest.TestCase):
+    ppi = 96
+    canvassize = (200,100)
+    coordsize = (50,25)
+
+    def parse(self, dist, default_unit='px'):
+        return units.parse_dist(dist, ppi=self.ppi, default_unit=default_unit,
+                                canvassize=self.canvassize, coordsize=self.coordsize)
+
+    def test_pixels(self):
+        self.assertEqual(self.parse('12px'), 12)
+        self.assertEqual(self.parse('-1.5px'), -1.5)
+        self.assertEqual(self.parse(12), 12)
+        self.assertEqual(self.parse('12'), 12)
+
+    def test_real_world(self):
+        self.assertAlmostEqual(self.parse('1in'), 96)
+        self.assertAlmostEqual(self.parse('72pt'), 96)
+        self.assertAlmostEqual(self.parse('2.54cm'), 96, places=4)
+        self.assertAlmostEqual(self.parse('25.4mm'), 96, places=4)
+        self.assertAlmostEqual(self.parse('1e-1in'), 9.6)
+
+    def test_percent(self):
+        self.assertAlmostEqual(self.parse('10%w'), 20)
+        self.assertAlmostEqual(self.parse('10%h'), 10)
+        self.assertAlmostEqual(self.parse('10%min'), 10)
+        self.assertAlmostEqual(self.parse('10%max'), 20)
+        self.assertAlmostEqual(self.parse(10, default_unit='%w'), 20)
+
+    def test_coordinates(self):
+        self.assertAlmostEqual(self.parse('5x'), 20)
+        self.assertAlmostEqual(self.parse('5y'), 20)
+
+    def test_invalid(self):
+        for dist in ('12', '12km', '10%', '1+1px', '__import__("os")px'):
+            with self.assertRaises(Exception):
+                units.parse_diststring(dist, ppi=self.ppi, canvassize=self.canvassize)
+
+    def test_cache_depends_on_canvas(self):
+        self.assertAlmostEqual(self.parse('10%w'), 20)
+        self.canvassize = (400,100)
+        self.assertAlmostEqual(self.parse('10%w'), 40)
+
+    def test_parse_dists(self):
+        pixels = units.parse_dists(['1px', '10%w', 3], ppi=self.ppi, default_unit='px',
+                                   canvassize=self.canvassize, coordsize=self.coordsize)
+        self.assertEqual(list(pixels), [1, 20, 3])
+
+    def test_split_unit(self):
+        self.assertEqual(units.split_unit('2.5cm'), (2.5, 'cm'))
+        self.assertEqual(units.split_unit('3'), (3, None))
+        self.assertEqual(units.split_unit(3), (3, None))
+
+
+if __name__ == '__main__':
+    unittest.main()